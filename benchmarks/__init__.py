@@ -0,0 +1 @@
+"""Benchmarks for the Python side of the compressor (run them with `python -m benchmarks.<name>`)."""
@@ -0,0 +1,62 @@
+"""Helpers to generate tiny synthetic video clips for the benchmarks."""
+
+from __future__ import annotations
+
+import random
+from fractions import Fraction
+from typing import TYPE_CHECKING
+
+import av
+import numpy as np
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def generate_clip(  # noqa: PLR0913 - clip parameters
+    path: Path,
+    *,
+    seconds: float,
+    fps: int = 30,
+    size: int = 64,
+    variable_frame_rate: bool = False,
+    codec: str = 'mpeg4',
+) -> Path:
+    """
+    Generate a small video clip with a noise picture.
+
+    With `variable_frame_rate` the interval between frames randomly varies
+    around `1 / fps`, like in screen or phone recordings.
+    """
+    rng = random.Random(42)  # noqa: S311 - not for security purposes
+
+    with av.open(str(path), mode='w') as container:
+        stream = container.add_stream(codec, rate=fps)
+        stream.width = size
+        stream.height = size
+        stream.pix_fmt = 'yuv420p'
+        stream.codec_context.time_base = Fraction(1, 1000)
+
+        picture = np.random.default_rng(42).integers(
+            0,
+            255,
+            (size, size, 3),
+            dtype=np.uint8,
+        )
+        frame = av.VideoFrame.from_ndarray(picture, format='rgb24')
+
+        pts = 0
+        frame_interval_ms = 1000 / fps
+        while pts < seconds * 1000:
+            frame.pts = pts
+            frame.time_base = Fraction(1, 1000)
+            container.mux(stream.encode(frame))
+
+            interval = frame_interval_ms
+            if variable_frame_rate:
+                interval *= rng.uniform(0.5, 1.5)
+            pts += max(1, round(interval))
+
+        container.mux(stream.encode(None))
+
+    return path
@@ -0,0 +1,143 @@
+"""
+End-to-end throughput benchmark of the batch compression.
+
+Drives thousands of tiny clips through the real discovery, probing and
+CompressionManager with the HandbrakeCLI stand-in (see `fake_handbrakecli.py`),
+so the scheduling overhead can be measured without spending encoder time.
+
+Usage:
+    python -m benchmarks.e2e_throughput --files 5000 --jobs 8 --encode-seconds 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.clips import generate_clip
+from handbrake_batch_compressor.src.cli.option_types import (
+    EffectiveCompressionBehavior,
+    IneffectiveCompressionBehavior,
+)
+from handbrake_batch_compressor.src.compression.compression_manager import (
+    CompressionManager,
+    CompressionManagerOptions,
+)
+from handbrake_batch_compressor.src.compression.handbrake_compressor import (
+    HandbrakeCompressor,
+)
+from handbrake_batch_compressor.src.utils.files import get_video_files_by_directory
+from handbrake_batch_compressor.src.utils.smart_filters import SmartFilter
+from handbrake_batch_compressor.src.utils.video_files_classifier import (
+    VideoFilesClassifier,
+)
+
+FAKE_HANDBRAKECLI = Path(__file__).with_name('fake_handbrakecli.py')
+
+_FILES_PER_DIRECTORY = 100
+
+
+def prepare_videos(root: Path, files: int) -> None:
+    """Copy a tiny clip `files` times into a tree of directories."""
+    clip = generate_clip(root / 'clip.mp4', seconds=1)
+    for i in range(files):
+        directory = root / 'videos' / f'd{i // _FILES_PER_DIRECTORY:04d}'
+        directory.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(clip, directory / f'video_{i:06d}.mp4')
+
+
+def fake_startup_seconds(command: list[str]) -> float:
+    """Return how long the stand-in takes to start (it's an overhead of the benchmark itself)."""
+    started = time.perf_counter()
+    subprocess.run([*command, '--version'], check=True, capture_output=True)  # noqa: S603 - the command is built by the benchmark
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--jobs', type=int, default=8)
+    parser.add_argument('--probe-lookahead', type=int, default=16)
+    parser.add_argument('--encode-seconds', type=float, default=0.2)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--crash-rate', type=float, default=0.0)
+    parser.add_argument('--stall-rate', type=float, default=0.0)
+    parser.add_argument('--stall-seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    command = [
+        sys.executable,
+        str(FAKE_HANDBRAKECLI),
+        f'--fake-seconds={args.encode_seconds}',
+        f'--fake-fail-rate={args.fail_rate}',
+        f'--fake-crash-rate={args.crash_rate}',
+        f'--fake-stall-rate={args.stall_rate}',
+        f'--fake-stall-seconds={args.stall_seconds}',
+    ]
+
+    with tempfile.TemporaryDirectory(prefix='handbrake-e2e-') as tmp_dir:
+        root = Path(tmp_dir)
+        prepare_videos(root, args.files)
+
+        # errors.log is written to the working directory
+        cwd = Path.cwd()
+        os.chdir(root)
+
+        classifier = VideoFilesClassifier('compressing', 'compressed')
+        manager = CompressionManager(
+            classifier.unprocessed_files(
+                get_video_files_by_directory(root / 'videos'),
+            ),
+            compressor=HandbrakeCompressor(handbrakecli_command=shlex.join(command)),
+            smart_filter=SmartFilter(),
+            options=CompressionManagerOptions(
+                skip_failed_files=True,
+                jobs=args.jobs,
+                probe_lookahead=args.probe_lookahead,
+                ineffective_compression_behavior=IneffectiveCompressionBehavior.keep_both,
+                effective_compression_behavior=EffectiveCompressionBehavior.keep_both,
+            ),
+        )
+
+        started = time.perf_counter()
+        try:
+            asyncio.run(manager.compress_all_videos())
+        finally:
+            os.chdir(cwd)
+        elapsed = time.perf_counter() - started
+
+        compressed = sum(1 for _ in (root / 'videos').rglob('*.compressed.mp4'))
+        startup = fake_startup_seconds(command)
+
+    # The best possible time if only the encodes (and starting of the stand-in) took time,
+    # starting of the stand-in is CPU bound, so it's limited by the count of CPUs
+    ideal = args.files * max(
+        (args.encode_seconds + startup) / args.jobs,
+        startup / (os.cpu_count() or 1),
+    )
+
+    print(f'Files: {args.files}, jobs: {args.jobs}, encode: {args.encode_seconds}s')  # noqa: T201
+    print(f'{"compressed":<24} {compressed:>10}')  # noqa: T201
+    print(f'{"wall time, s":<24} {elapsed:>10.2f}')  # noqa: T201
+    print(f'{"throughput, files/s":<24} {args.files / elapsed:>10.1f}')  # noqa: T201
+    print(f'{"ideal time, s":<24} {ideal:>10.2f}')  # noqa: T201
+    print(f'{"efficiency":<24} {ideal / elapsed * 100:>9.1f}%')  # noqa: T201
+    print(  # noqa: T201
+        f'{"overhead per file, ms":<24} {(elapsed - ideal) * args.jobs / args.files * 1000:>10.1f}',
+    )
+
+
+if __name__ == '__main__':
+    main()
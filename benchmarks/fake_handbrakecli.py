@@ -0,0 +1,178 @@
+r"""
+Stand-in for HandbrakeCLI to test the batch compression without real encoding.
+
+It replays the HandbrakeCLI output (`\r`-delimited progress on stdout, service
+info and warnings on stderr) and grows a sparse output file of the configured
+size ratio. Failures, stalls and crashes are simulated for a random share of
+the videos (the choice depends only on the input name and the seed, so the
+same videos fail in every run).
+
+Options of the stand-in start with `--fake-`, all other options (e.g. the ones
+from `--handbrakecli-options`) are ignored.
+
+Usage:
+    export HANDBRAKE_BATCH_COMPRESSOR_HANDBRAKECLI="python benchmarks/fake_handbrakecli.py --fake-seconds 2"
+    handbrake-batch-compressor -t ./videos
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+_SCAN_INFO = """\
+[00:00:00] Compile-time hardening features are enabled
+[00:00:00] hb_init: starting libhb thread
+[00:00:00] thread 1 started ("libhb")
+HandBrake 1.8.2 (2024081400) - Linux x86_64 - https://handbrake.fr
+4 CPUs detected
+Opening {input}...
+[00:00:00] CPU: Fake CPU
+[00:00:00] hb_scan: path={input}, title_index=1
+[00:00:00] scan: decoding previews for title 1
+[00:00:00] scan: 10 previews, 1920x1080, 29.970 fps, autocrop = 0/0/0/0, aspect 16:9, PAR 1:1
++ title 1:
+  + stream: {input}
+  + duration: 00:10:00
+  + size: 1920x1080, pixel aspect: 1/1, display aspect: 1.78, 29.970 fps
+[00:00:00] Starting work at: Mon Jan  1 00:00:00 2024
+[00:00:00] 1 job(s) to process
+[00:00:00] Starting Task: Encoding Pass
+"""
+
+_WARNING = '[00:00:01] Warning: decavcodec: frame {frame} is damaged, skipping\n'
+
+_FAILURE = """\
+[00:00:00] libhb: scan thread found 0 valid title(s)
+No title found.
+
+HandBrake has exited.
+"""
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    """Parse the options of the stand-in ignoring the HandbrakeCLI ones."""
+    parser = argparse.ArgumentParser(description=__doc__, allow_abbrev=False)
+    parser.add_argument('-i', '--input', type=Path)
+    parser.add_argument('-o', '--output', type=Path)
+    parser.add_argument('--version', action='store_true')
+    parser.add_argument(
+        '--fake-seconds',
+        type=float,
+        default=0.5,
+        help='duration of every encode',
+    )
+    parser.add_argument(
+        '--fake-updates',
+        type=int,
+        default=100,
+        help='progress lines per encode',
+    )
+    parser.add_argument(
+        '--fake-ratio',
+        type=float,
+        default=0.5,
+        help='output size / input size',
+    )
+    parser.add_argument(
+        '--fake-warnings',
+        type=float,
+        default=0.1,
+        help='share of the progress updates followed by a warning on stderr',
+    )
+    parser.add_argument('--fake-fail-rate', type=float, default=0.0)
+    parser.add_argument('--fake-crash-rate', type=float, default=0.0)
+    parser.add_argument('--fake-stall-rate', type=float, default=0.0)
+    parser.add_argument(
+        '--fake-stall-seconds',
+        type=float,
+        default=5.0,
+        help='how long a stalled encode produces no output',
+    )
+    parser.add_argument('--fake-seed', type=int, default=42)
+
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def progress_line(progress: float, fps: float, eta_seconds: int) -> str:
+    """Format the progress like HandbrakeCLI does."""
+    return (
+        f'Encoding: task 1 of 1, {progress:.2f} % ({fps:.2f} fps, avg {fps:.2f} fps, '
+        f'ETA {eta_seconds // 3600:02d}h{eta_seconds // 60 % 60:02d}m{eta_seconds % 60:02d}s)\r'
+    )
+
+
+def encode(args: argparse.Namespace) -> int:
+    """Simulate the encoding and return the exit code."""
+    rng = random.Random(f'{args.fake_seed}:{args.input.name}')  # noqa: S311 - not for security purposes
+    fails = rng.random() < args.fake_fail_rate
+    crashes_at = rng.uniform(0.1, 0.9) if rng.random() < args.fake_crash_rate else None
+    stalls_at = rng.uniform(0.1, 0.9) if rng.random() < args.fake_stall_rate else None
+
+    sys.stderr.write(_SCAN_INFO.format(input=args.input))
+    sys.stderr.flush()
+
+    if fails or not args.input.exists():
+        sys.stderr.write(_FAILURE)
+        return 3
+
+    output_size = int(args.input.stat().st_size * args.fake_ratio)
+    updates = max(1, args.fake_updates)
+    interval = args.fake_seconds / updates
+    fps = 30 * updates / max(args.fake_seconds, 1e-3)
+
+    with args.output.open('wb') as output:
+        for i in range(updates + 1):
+            progress = i / updates
+
+            if crashes_at is not None and progress >= crashes_at:
+                sys.stderr.write('Segmentation fault (core dumped)\n')
+                sys.stderr.flush()
+                output.flush()
+                os._exit(139)
+
+            if stalls_at is not None and progress >= stalls_at:
+                stalls_at = None
+                time.sleep(args.fake_stall_seconds)
+
+            # Sparse files are cheap even for thousands of large "videos"
+            output.truncate(int(output_size * progress))
+
+            sys.stdout.write(
+                progress_line(progress * 100, fps, int((updates - i) * interval)),
+            )
+            sys.stdout.flush()
+            if rng.random() < args.fake_warnings:
+                sys.stderr.write(_WARNING.format(frame=i))
+                sys.stderr.flush()
+
+            if i < updates:
+                time.sleep(interval)
+
+    sys.stdout.write('\nEncode done!\n')
+    sys.stderr.write('[00:00:02] libhb: work result = 0\n\nEncode done!\n')
+    return 0
+
+
+def main() -> int:
+    """Run the stand-in and return the exit code."""
+    args = parse_args(sys.argv[1:])
+
+    if args.version:
+        sys.stdout.write('HandBrake 1.8.2 (fake)\n')
+        return 0
+
+    if args.input is None or args.output is None:
+        sys.stderr.write('Missing input or output.\n')
+        return 1
+
+    return encode(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Benchmark of the frame rate estimation for VFR videos.
+
+Compares the sampled estimator with the previous one, which demuxed the
+whole video, by time and bytes read from the file.
+
+Usage:
+    python -m benchmarks.fps_estimation --minutes 120
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import itertools
+import tempfile
+import time
+from fractions import Fraction
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import av
+
+from benchmarks.clips import generate_clip
+from handbrake_batch_compressor.src.utils.ffmpeg_helpers import (
+    DEFAULT_FPS_PACKET_BUDGET,
+    estimate_fps_from_timestamps,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from av.container.input import InputContainer
+    from av.video.stream import VideoStream
+
+
+class CountingReader(io.RawIOBase):
+    """File wrapper which counts how many bytes were read through it."""
+
+    def __init__(self, path: Path) -> None:
+        self._file = path.open('rb')
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: bytearray) -> int:  # type: ignore[override]
+        size = self._file.readinto(buffer)
+        self.bytes_read += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def legacy_estimate_fps_from_timestamps(
+    container: InputContainer,
+    stream: VideoStream,
+) -> Fraction | None:
+    """Demux every packet of the video (the previous implementation)."""
+    timestamps: list[Fraction] = [
+        Fraction(packet.pts, packet.time_base.denominator)
+        for packet in container.demux(stream)
+        if packet.pts is not None and packet.time_base is not None
+    ]
+
+    if len(timestamps) > 1:
+        intervals = [j - i for i, j in itertools.pairwise(timestamps)]
+        avg_interval = sum(intervals, start=Fraction(0)) / len(intervals)
+        return Fraction(1, avg_interval) if avg_interval > 0 else None
+
+    return None
+
+
+def measure(
+    clip: Path,
+    estimate: Callable[[InputContainer, VideoStream], float | Fraction | None],
+) -> tuple[float, int, float | None]:
+    """Return the elapsed time, bytes read and the estimated FPS."""
+    reader = CountingReader(clip)
+    with av.open(reader) as container:
+        reader.bytes_read = 0  # don't count reading of the header
+        started = time.perf_counter()
+        fps = estimate(container, container.streams.video[0])
+        elapsed = time.perf_counter() - started
+
+    return elapsed, reader.bytes_read, float(fps) if fps is not None else None
+
+
+def main() -> None:
+    """Run the benchmark on a generated VFR clip."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--minutes', type=float, default=30)
+    parser.add_argument('--packet-budget', type=int, default=DEFAULT_FPS_PACKET_BUDGET)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        clip = generate_clip(
+            Path(tmp_dir) / 'vfr.mp4',
+            seconds=args.minutes * 60,
+            variable_frame_rate=True,
+        )
+
+        results = {
+            'full demux (legacy)': measure(clip, legacy_estimate_fps_from_timestamps),
+            f'sampled ({args.packet_budget} packets)': measure(
+                clip,
+                lambda container, stream: estimate_fps_from_timestamps(
+                    container,
+                    stream,
+                    args.packet_budget,
+                ),
+            ),
+        }
+
+    print(f'VFR clip: {args.minutes} minutes')  # noqa: T201
+    for name, (elapsed, bytes_read, fps) in results.items():
+        print(  # noqa: T201
+            f'{name:<30} {elapsed * 1000:>10.1f} ms {bytes_read / 1024:>12.0f} KB read   fps={fps:.3f}',
+        )
+
+
+if __name__ == '__main__':
+    main()
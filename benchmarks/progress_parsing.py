@@ -0,0 +1,116 @@
+"""
+Benchmark of the HandbrakeCLI progress parsing and dispatching.
+
+Compares the single precompiled pattern with the previous implementation
+(several uncompiled searches and a pydantic model) and shows how many
+progress bar updates the dispatcher lets through.
+
+Usage:
+    python -m benchmarks.progress_parsing --updates 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import re
+import time
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel
+
+from benchmarks.traces import handbrakecli_progress_trace
+from handbrake_batch_compressor.src.cli.handbrake_cli_output_capturer import (
+    ProgressDispatcher,
+    parse_handbrake_cli_output,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+class LegacyHandbrakeProgressInfo(BaseModel):
+    """The previous pydantic model of the progress."""
+
+    progress: float | None
+    fps_current: float | None
+    fps_average: float | None
+    eta: datetime.timedelta | None
+
+
+def legacy_parse_handbrake_cli_output(line: str) -> LegacyHandbrakeProgressInfo:
+    """Parse the line with several searches (the previous implementation)."""
+    progress_match = re.search(r'(\d+\.\d+) %', line)
+    progress = float(progress_match.group(1)) if progress_match else None
+
+    fps_current_match = re.search(r'([\d.]+) fps', line)
+    fps_current = float(fps_current_match.group(1)) if fps_current_match else None
+
+    fps_avg_match = re.search(r'avg ([\d.]+) fps', line)
+    fps_avg = float(fps_avg_match.group(1)) if fps_avg_match else None
+
+    eta_match = re.search(r'ETA (\d+h\d+m\d+s)', line)
+    eta = None
+    if eta_match:
+        h, m, s = map(int, re.findall(r'\d+', eta_match.group(1)))
+        eta = datetime.timedelta(hours=h, minutes=m, seconds=s)
+
+    return LegacyHandbrakeProgressInfo(
+        progress=progress,
+        fps_current=fps_current,
+        fps_average=fps_avg,
+        eta=eta,
+    )
+
+
+def measure(chunks: list[str], parse: Callable[[str], object]) -> float:
+    """Return microseconds per parsed chunk."""
+    started = time.perf_counter()
+    for chunk in chunks:
+        parse(chunk)
+    return (time.perf_counter() - started) / len(chunks) * 1_000_000
+
+
+def main() -> None:
+    """Run the benchmark on a generated trace of a single encode."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--updates', type=int, default=100_000)
+    parser.add_argument('--encode-seconds', type=float, default=600)
+    parser.add_argument('--max-updates-per-second', type=float, default=4)
+    args = parser.parse_args()
+
+    chunks = handbrakecli_progress_trace(args.updates)
+
+    legacy = measure(chunks, legacy_parse_handbrake_cli_output)
+    current = measure(chunks, parse_handbrake_cli_output)
+
+    # Replay the trace as if it was spread over the encode time
+    now = 0.0
+    delivered = 0
+
+    def count(_: object) -> None:
+        nonlocal delivered
+        delivered += 1
+
+    dispatcher = ProgressDispatcher(count, args.max_updates_per_second)
+    time_monotonic = time.monotonic
+    time.monotonic = lambda: now
+    try:
+        for chunk in chunks:
+            now += args.encode_seconds / len(chunks)
+            dispatcher(parse_handbrake_cli_output(chunk))
+        dispatcher.flush()
+    finally:
+        time.monotonic = time_monotonic
+
+    print(f'Trace: {len(chunks)} progress chunks')  # noqa: T201
+    print(f'{"legacy parsing":<30} {legacy:>8.2f} us/chunk')  # noqa: T201
+    print(f'{"precompiled parsing":<30} {current:>8.2f} us/chunk')  # noqa: T201
+    print(  # noqa: T201
+        f'{"dispatched updates":<30} {delivered:>8} of {len(chunks)} '
+        f'({args.max_updates_per_second}/s over {args.encode_seconds:.0f}s)',
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark of the CLI startup time.
+
+The tool is often called from scripts (e.g. cron), so `--version`, `--guide`
+and `--help` should answer right away. Every case is run in a new interpreter
+a few times and the best and median wall times are reported along with the bare
+interpreter startup. The software check is measured with and without the tools
+cache, and the heaviest imports of the CLI (by `python -X importtime`) are listed
+to spot the ones which should be imported lazily.
+
+Usage:
+    python -m benchmarks.startup --runs 20 --top 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from handbrake_batch_compressor.src.utils.third_party_installers import (
+    InstallCommand,
+    Software,
+    ToolsCache,
+)
+
+ENTRY_POINT = (
+    'from handbrake_batch_compressor.src.cli.entry_point import bootstrap; bootstrap()'
+)
+
+CASES = {
+    'interpreter': ['-c', 'pass'],
+    '--version': ['-c', ENTRY_POINT, '--version'],
+    '--guide': ['-c', ENTRY_POINT, '--guide'],
+    '--help': ['-c', ENTRY_POINT, '--help'],
+    'import main': ['-c', 'import handbrake_batch_compressor.main'],
+}
+
+
+def run_seconds(args: list[str]) -> float:
+    """Return how long a new interpreter takes to run with the arguments."""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, *args], check=True, capture_output=True)  # noqa: S603 - the command is built by the benchmark
+    return time.perf_counter() - started
+
+
+def software_check_seconds(runs: int, *, cached: bool) -> list[float]:
+    """Check the software (the interpreter itself stands in for ffmpeg) with or without the cache."""
+    with tempfile.TemporaryDirectory() as workdir:
+        cache = ToolsCache(Path(workdir) / 'tools.json')
+        software = Software(
+            install_cmd=InstallCommand(win='', linux='', mac=''),
+            check_cmd=f'{Path(sys.executable).name} --version',
+            cache=cache if cached else None,
+        )
+        # The first check fills the cache
+        software.is_installed()
+
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            software.is_installed()
+            timings.append(time.perf_counter() - started)
+        return timings
+
+
+def heaviest_imports(top: int) -> list[tuple[int, str]]:
+    """Return the modules with the largest cumulative import time (in microseconds) of the CLI."""
+    output = subprocess.run(  # noqa: S603 - the command is built by the benchmark
+        [sys.executable, '-X', 'importtime', *CASES['import main']],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+
+    imports = []
+    for line in output.splitlines():
+        # import time: self [us] | cumulative | imported package
+        columns = line.split('|')
+        if len(columns) == 3 and columns[1].strip().isdigit():  # noqa: PLR2004 - the columns of the line
+            imports.append((int(columns[1]), columns[2].strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def print_timings(name: str, timings: list[float]) -> None:
+    """Print the best and median timings in milliseconds."""
+    print(  # noqa: T201
+        f'{name:<24} {min(timings) * 1000:>10.1f} {statistics.median(timings) * 1000:>10.1f}',
+    )
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f'{"case":<24} {"best, ms":>10} {"median, ms":>10}')  # noqa: T201
+    for name, case in CASES.items():
+        # The first run warms up the file system caches
+        run_seconds(case)
+        print_timings(name, [run_seconds(case) for _ in range(args.runs)])
+
+    print_timings(
+        'software check',
+        software_check_seconds(args.runs, cached=False),
+    )
+    print_timings(
+        'software check, cached',
+        software_check_seconds(args.runs, cached=True),
+    )
+
+    print(f'\nHeaviest imports of the CLI:\n{"module":<64} {"ms":>8}')  # noqa: T201
+    for cumulative, module in heaviest_imports(args.top):
+        print(f'{module:<64} {cumulative / 1000:>8.1f}')  # noqa: T201
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+"""
+Benchmark suite of the orchestration hot paths.
+
+Every stage is run on synthetic data (directory trees of empty files, tiny
+PyAV clips and HandbrakeCLI output traces), so it works offline. For every
+stage the best time of a few runs and the peak of Python memory allocations
+(tracemalloc, measured in a separate run) are reported.
+
+The generated data is kept in `--workdir`, so the next runs (e.g. on another
+commit) measure exactly the same input.
+
+Usage:
+    python -m benchmarks.suite --entries 1000000 --output before.json
+    git checkout feature-branch
+    python -m benchmarks.suite --entries 1000000 --output after.json --compare before.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from benchmarks.clips import generate_clip
+from benchmarks.traces import handbrakecli_progress_trace, load_trace
+from benchmarks.trees import generate_tree
+from handbrake_batch_compressor.src.cli.handbrake_cli_output_capturer import (
+    parse_handbrake_cli_output,
+)
+from handbrake_batch_compressor.src.compression.compression_statistics import (
+    CompressionStatistics,
+)
+from handbrake_batch_compressor.src.utils.ffmpeg_helpers import (
+    VideoProperties,
+    VideoResolution,
+    get_video_properties,
+)
+from handbrake_batch_compressor.src.utils.files import (
+    get_video_files_by_directory,
+    get_video_files_paths,
+)
+from handbrake_batch_compressor.src.utils.smart_filters import SmartFilter
+from handbrake_batch_compressor.src.utils.video_files_classifier import (
+    VideoFilesClassifier,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+@dataclass
+class Stage:
+    """A benchmarked function, it returns how many items it has processed."""
+
+    name: str
+    run: Callable[[], int]
+
+
+@dataclass
+class StageResult:
+    """Measurements of a stage."""
+
+    name: str
+    items: int
+    seconds: float
+    peak_memory_bytes: int
+
+    @property
+    def microseconds_per_item(self) -> float:
+        return self.seconds / max(self.items, 1) * 1_000_000
+
+
+def measure(stage: Stage, repeat: int) -> StageResult:
+    """Return the best time of `repeat` runs and the peak memory of another run."""
+    seconds = float('inf')
+    items = 0
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        items = stage.run()
+        seconds = min(seconds, time.perf_counter() - started)
+
+    # tracemalloc slows the code down, so the memory is measured separately
+    gc.collect()
+    tracemalloc.start()
+    try:
+        stage.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return StageResult(
+        name=stage.name,
+        items=items,
+        seconds=seconds,
+        peak_memory_bytes=peak,
+    )
+
+
+def discovery_stages(tree: Path) -> list[Stage]:
+    """Walk the tree and sort out the found videos like the main does."""
+
+    def discover() -> int:
+        return sum(1 for _ in get_video_files_paths(tree))
+
+    def classify() -> int:
+        classifier = VideoFilesClassifier('compressing', 'compressed')
+        return sum(
+            1 for _ in classifier.unprocessed_files(get_video_files_by_directory(tree))
+        )
+
+    return [
+        Stage('discovery', discover),
+        Stage('classification', classify),
+    ]
+
+
+def probe_stages(clips_dir: Path, clips: int) -> list[Stage]:
+    """Probe CFR and VFR clips (the VFR ones need FPS estimation)."""
+    clips_dir.mkdir(parents=True, exist_ok=True)
+
+    def clip_paths(kind: str, *, variable_frame_rate: bool) -> list[Path]:
+        paths = [clips_dir / f'{kind}_{i:03d}.mp4' for i in range(clips)]
+        for path in paths:
+            if not path.exists():
+                generate_clip(
+                    path,
+                    seconds=3,
+                    variable_frame_rate=variable_frame_rate,
+                )
+        return paths
+
+    cfr_clips = clip_paths('cfr', variable_frame_rate=False)
+    vfr_clips = clip_paths('vfr', variable_frame_rate=True)
+
+    def probe(paths: list[Path]) -> Callable[[], int]:
+        return lambda: sum(get_video_properties(path) is not None for path in paths)
+
+    return [
+        Stage('probe_cfr', probe(cfr_clips)),
+        Stage('probe_vfr', probe(vfr_clips)),
+    ]
+
+
+def progress_parsing_stage(trace: list[str]) -> Stage:
+    """Parse every chunk of the HandbrakeCLI output."""
+
+    def parse() -> int:
+        for chunk in trace:
+            parse_handbrake_cli_output(chunk)
+        return len(trace)
+
+    return Stage('progress_parsing', parse)
+
+
+def smart_filter_stage(videos: int) -> Stage:
+    """Filter videos with random properties."""
+    rng = random.Random(42)  # noqa: S311 - not for security purposes
+    resolutions = [
+        VideoResolution(width=w, height=h)
+        for w, h in [(640, 360), (1280, 720), (1920, 1080), (3840, 2160)]
+    ]
+    properties = [
+        VideoProperties(
+            resolution=rng.choice(resolutions),
+            frame_rate=rng.choice([24.0, 25.0, 30.0, 60.0]),
+            bitrate_kbytes=rng.randint(100, 5000),
+            duration_seconds=rng.uniform(10, 7200),
+        )
+        for _ in range(videos)
+    ]
+    smart_filter = SmartFilter(
+        minimal_resolution=resolutions[1],
+        minimal_bitrate_kbytes=1000,
+        minimal_frame_rate=30,
+    )
+
+    def should_compress() -> int:
+        for video_properties in properties:
+            smart_filter.should_compress(video_properties)
+        return len(properties)
+
+    return Stage('smart_filter', should_compress)
+
+
+def statistics_stage(stats_dir: Path, files: int) -> Stage:
+    """Collect statistics of compressed files (sizes are read from the disk)."""
+    stats_dir.mkdir(parents=True, exist_ok=True)
+    pairs = []
+    for i in range(files):
+        original = stats_dir / f'video_{i:06d}.mp4'
+        compressed = stats_dir / f'video_{i:06d}.compressed.mp4'
+        if not compressed.exists():
+            original.write_bytes(b'\0' * (i % 4096 + 1024))
+            compressed.write_bytes(b'\0' * (i % 2048 + 512))
+        pairs.append((original, compressed))
+
+    def add_compression_info() -> int:
+        statistics = CompressionStatistics()
+        for original, compressed in pairs:
+            statistics.add_compression_info(original, compressed)
+        return len(pairs)
+
+    return Stage('statistics', add_compression_info)
+
+
+def current_commit() -> str | None:
+    """Return the short hash of the checked out commit (to tell the results apart)."""
+    try:
+        return subprocess.run(  # noqa: S603 - the command is constant
+            ['git', 'rev-parse', '--short', 'HEAD'],  # noqa: S607 - git from PATH
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: list[StageResult], baseline: dict | None) -> None:
+    """Print the results and their changes relative to the baseline results."""
+    baseline_stages = {} if baseline is None else baseline['stages']
+
+    print(  # noqa: T201
+        f'{"stage":<18} {"items":>9} {"time, ms":>10} {"us/item":>9} {"peak, KB":>10}',
+    )
+    for result in results:
+        line = (
+            f'{result.name:<18} {result.items:>9} {result.seconds * 1000:>10.1f} '
+            f'{result.microseconds_per_item:>9.2f} {result.peak_memory_bytes / 1024:>10.0f}'
+        )
+
+        previous = baseline_stages.get(result.name)
+        if previous is not None:
+            time_change = (result.seconds / previous['seconds'] - 1) * 100
+            memory_change = (
+                result.peak_memory_bytes / max(previous['peak_memory_bytes'], 1) - 1
+            ) * 100
+            line += f'   time {time_change:+6.1f}%   memory {memory_change:+6.1f}%'
+
+        print(line)  # noqa: T201
+
+
+def main() -> None:
+    """Run the benchmark suite."""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--entries', type=int, default=100_000)
+    parser.add_argument('--clips', type=int, default=10)
+    parser.add_argument('--progress-updates', type=int, default=100_000)
+    parser.add_argument('--trace', type=Path, help='recorded HandbrakeCLI stdout')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument(
+        '--workdir',
+        type=Path,
+        default=Path(tempfile.gettempdir()) / 'handbrake-batch-compressor-bench',
+    )
+    parser.add_argument('--output', type=Path, help='save results as JSON')
+    parser.add_argument('--compare', type=Path, help='JSON results to compare with')
+    args = parser.parse_args()
+
+    tree = generate_tree(args.workdir / f'tree_{args.entries}', entries=args.entries)
+    trace = (
+        load_trace(args.trace)
+        if args.trace is not None
+        else handbrakecli_progress_trace(args.progress_updates)
+    )
+
+    stages = [
+        *discovery_stages(tree),
+        *probe_stages(args.workdir / 'clips', args.clips),
+        progress_parsing_stage(trace),
+        smart_filter_stage(args.entries),
+        statistics_stage(args.workdir / 'stats', min(args.entries, 10_000)),
+    ]
+    results = [measure(stage, args.repeat) for stage in stages]
+
+    baseline = (
+        json.loads(args.compare.read_text(encoding='utf-8'))
+        if args.compare is not None
+        else None
+    )
+    print_results(results, baseline)
+
+    if args.output is not None:
+        args.output.write_text(
+            json.dumps(
+                {
+                    'commit': current_commit(),
+                    'python': platform.python_version(),
+                    'entries': args.entries,
+                    'stages': {
+                        result.name: {
+                            'items': result.items,
+                            'seconds': result.seconds,
+                            'peak_memory_bytes': result.peak_memory_bytes,
+                        }
+                        for result in results
+                    },
+                },
+                indent=2,
+            ),
+            encoding='utf-8',
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Helpers to generate HandbrakeCLI output traces for the benchmarks."""
+
+from __future__ import annotations
+
+import random
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def handbrakecli_progress_trace(updates: int = 20_000, seed: int = 42) -> list[str]:
+    r"""
+    Generate `\r`-terminated chunks of HandbrakeCLI stdout for a single encode.
+
+    The chunks follow the HandbrakeCLI format, e.g:
+        Encoding: task 1 of 1, 4.00 % (937.13 fps, avg 955.64 fps, ETA 00h03m22s)
+
+    The first chunks have no statistics, like the real output right after the start.
+    """
+    rng = random.Random(seed)  # noqa: S311 - not for security purposes
+    chunks: list[str] = []
+    average_fps = 0.0
+
+    for i in range(updates):
+        progress = i * 100 / updates
+        if i < updates // 100:
+            chunks.append(f'Encoding: task 1 of 1, {progress:.2f} %\r')
+            continue
+
+        fps = rng.uniform(80, 400)
+        average_fps = fps if average_fps == 0 else average_fps * 0.99 + fps * 0.01
+        eta = int((updates - i) / max(average_fps, 1))
+        chunks.append(
+            f'Encoding: task 1 of 1, {progress:.2f} % ({fps:.2f} fps, avg {average_fps:.2f} fps, '
+            f'ETA {eta // 3600:02d}h{eta // 60 % 60:02d}m{eta % 60:02d}s)\r',
+        )
+
+    chunks.append('Encoding: task 1 of 1, 100.00 % (0 fps, avg 0 fps, ETA 00h00m00s)\r')
+    return chunks
+
+
+def load_trace(path: Path) -> list[str]:
+    r"""
+    Load HandbrakeCLI stdout recorded to a file.
+
+    The output can be recorded like this:
+        HandBrakeCLI -i input.mp4 -o output.mp4 2>/dev/null > trace.txt
+
+    Returns the `\r`-terminated chunks the way they are read by the compressor.
+    """
+    content = path.read_text(encoding='utf-8', errors='replace')
+    return [f'{chunk}\r' for chunk in content.split('\r') if chunk]
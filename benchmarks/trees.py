@@ -0,0 +1,72 @@
+"""Helpers to generate synthetic directory trees for the benchmarks."""
+
+from __future__ import annotations
+
+import os
+import random
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+# Marks a completely generated tree, so it can be reused by the next runs
+_COMPLETE_MARKER = '.tree-complete'
+
+_VIDEO_EXTENSIONS = ['mp4', 'MP4', 'mkv', 'avi', 'mov', 'webm', 'm4v']
+_OTHER_EXTENSIONS = ['jpg', 'srt', 'nfo', 'txt', 'png']
+
+
+def generate_tree(  # noqa: PLR0913 - tree parameters
+    root: Path,
+    *,
+    entries: int,
+    files_per_directory: int = 100,
+    video_share: float = 0.3,
+    compressed_share: float = 0.05,
+    seed: int = 42,
+) -> Path:
+    """
+    Generate a tree of empty files (or reuse the one generated before).
+
+    Directories are nested two levels deep, so the tree looks like a media library:
+        root/d0003/d0003_0001/video_000042.mp4
+
+    `compressed_share` of the videos have a complete (`.compressed.`) counterpart.
+    Incomplete (`.compressing.`) files aren't generated since they are removed
+    during the classification and the tree would change after the first run.
+    """
+    if (root / _COMPLETE_MARKER).exists():
+        return root
+
+    rng = random.Random(seed)  # noqa: S311 - not for security purposes
+    directories = max(1, entries // files_per_directory)
+    top_level = max(1, int(directories**0.5))
+
+    created = 0
+    for i in range(directories):
+        directory = root / f'd{i % top_level:04d}' / f'd{i % top_level:04d}_{i:06d}'
+        directory.mkdir(parents=True, exist_ok=True)
+
+        for j in range(files_per_directory):
+            if created >= entries:
+                break
+
+            if rng.random() < video_share:
+                name = f'video_{j:06d}'
+                extension = rng.choice(_VIDEO_EXTENSIONS)
+                if rng.random() < compressed_share:
+                    _touch(directory / f'{name}.compressed.{extension}')
+                    created += 1
+            else:
+                name = f'file_{j:06d}'
+                extension = rng.choice(_OTHER_EXTENSIONS)
+
+            _touch(directory / f'{name}.{extension}')
+            created += 1
+
+    _touch(root / _COMPLETE_MARKER)
+    return root
+
+
+def _touch(path: Path) -> None:
+    os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o644))
@@ -4,26 +4,38 @@ from __future__ import annotations
 
 import sys
 from pathlib import Path  # noqa: TC003 - is used by typer
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated
 
 import typer
 import typer.rich_utils
 
 from handbrake_batch_compressor.src.cli.cli_guards import (
+    check_cpu_list,
+    check_distributed_mode,
     check_extensions_arguments,
     check_handbrakecli_options,
+    check_stats_export_path,
     check_target_path,
 )
+from handbrake_batch_compressor.src.cli.entry_point import show_version_and_exit
 from handbrake_batch_compressor.src.cli.guide import show_guide_and_exit
 from handbrake_batch_compressor.src.cli.logger import log
-from handbrake_batch_compressor.src.compression.compression_manager import (
-    CompressionManager,
-    CompressionManagerOptions,
+from handbrake_batch_compressor.src.cli.option_types import (
+    DEFAULT_HANDBRAKECLI_COMMAND,
+    DEFAULT_POLL_INTERVAL_SECONDS,
+    DEFAULT_SETTLE_SECONDS,
+    HANDBRAKECLI_COMMAND_ENV,
+    Address,
     EffectiveCompressionBehavior,
     IneffectiveCompressionBehavior,
+    IoPriorityClass,
+    JobOrder,
 )
-from handbrake_batch_compressor.src.compression.handbrake_compressor import (
-    HandbrakeCompressor,
+from handbrake_batch_compressor.src.compression.job_lease import (
+    DEFAULT_LEASE_TIMEOUT_SECONDS,
+)
+from handbrake_batch_compressor.src.compression.stderr_ring_buffer import (
+    DEFAULT_STDERR_TAIL_SIZE,
 )
 from handbrake_batch_compressor.src.errors.cancel_compression_by_user import (
     CompressionCancelledByUserError,
@@ -32,9 +44,33 @@ from handbrake_batch_compressor.src.errors.handbrake_cli_exceptions import (
     CompressionFailedError,
 )
 from handbrake_batch_compressor.src.utils.ffmpeg_helpers import VideoResolution
-from handbrake_batch_compressor.src.utils.files import get_video_files_paths
-from handbrake_batch_compressor.src.utils.smart_filters import SmartFilter
-from handbrake_batch_compressor.src.utils.third_party_installers import setup_software
+from handbrake_batch_compressor.src.utils.files import parse_size
+from handbrake_batch_compressor.src.utils.sharding import Shard
+
+if TYPE_CHECKING:
+    from handbrake_batch_compressor.src.compression.compression_manager import (
+        CompressionManager,
+    )
+    from handbrake_batch_compressor.src.compression.compression_statistics import (
+        CompressionStatistics,
+    )
+    from handbrake_batch_compressor.src.compression.distributed import (
+        Coordinator,
+        EncodeSettings,
+    )
+    from handbrake_batch_compressor.src.compression.handbrake_compressor import (
+        HandbrakeCompressor,
+    )
+    from handbrake_batch_compressor.src.compression.job_lease import JobLeases
+    from handbrake_batch_compressor.src.compression.job_ledger import JobLedger
+    from handbrake_batch_compressor.src.compression.telemetry import Telemetry
+    from handbrake_batch_compressor.src.utils.directory_watcher import (
+        DirectoryWatcher,
+    )
+    from handbrake_batch_compressor.src.utils.probe_cache import ProbeCache
+    from handbrake_batch_compressor.src.utils.video_files_classifier import (
+        VideoFilesClassifier,
+    )
 
 app = typer.Typer(
     no_args_is_help=True,
@@ -43,27 +79,138 @@ app = typer.Typer(
 )
 
 
-def show_version_and_exit() -> None:
-    """Show version and exit."""
-    __version__ = '3.0.0'
-    log.raw_log(f'handbrake-batch-compressor {__version__}')
-    sys.exit(0)
+def log_discovery_summary(classifier: VideoFilesClassifier) -> None:
+    """Log how many video files of each kind were found."""
+    if classifier.found_count == 0:
+        log.success('No video files found. - Nothing to do.')
+        return
+
+    if classifier.shard is not None:
+        log.info(f'Processing only the shard {classifier.shard} of the video files.')
+
+    log.success(f'Found {classifier.found_count} video files.')
+    log.info(f'Found complete files: {classifier.complete_count}')
+    log.info(f'Found incomplete files: {classifier.incomplete_count}')
+    log.info(f'Found unprocessed files: {classifier.unprocessed_count}')
+
+    if classifier.leased_count > 0:
+        log.info(
+            f'Left {classifier.leased_count} incomplete files being compressed by other instances.',
+        )
+
+    removed_count = classifier.incomplete_count - classifier.leased_count
+    if removed_count > 0:
+        log.success(f'Removed {removed_count} incomplete files. 🧹✨')
 
 
-def remove_incomplete_files(incomplete_files: set[Path]) -> None:
-    """Remove incomplete files and update the task queue."""
-    for file in incomplete_files:
-        if file.exists():
-            try:
-                file.unlink()
-            except OSError as e:
-                log.error(f'Failed to remove file {file}: {e}')
-        else:
-            log.error(f'File {file} does not exist, skipping.')
+def open_probe_cache(*, rebuild: bool) -> ProbeCache:
+    """Open the cache of video properties, clearing it if needed."""
+    from handbrake_batch_compressor.src.utils.probe_cache import ProbeCache
+
+    probe_cache = ProbeCache(ProbeCache.default_path())
+    if rebuild:
+        probe_cache.clear()
+        log.info('Probe cache is cleared.')
+    return probe_cache
+
+
+def open_job_ledger(
+    target_path: Path,
+    shard: Shard | None,
+    leases: JobLeases | None,
+) -> JobLedger:
+    """Open the ledger of the compression jobs (of the shard or of this host if leases are used) in the target path."""
+    from handbrake_batch_compressor.src.compression.job_ledger import (
+        JobLedger,
+        JobState,
+    )
+
+    job_ledger = JobLedger(
+        JobLedger.default_path(
+            target_path,
+            shard,
+            host=leases.host if leases is not None else None,
+        ),
+    )
+
+    interrupted_jobs = job_ledger.paths_in_state(JobState.pending)
+    if interrupted_jobs:
+        log.info(f'Resuming {len(interrupted_jobs)} interrupted compressions.')
+
+    return job_ledger
+
+
+def open_telemetry(
+    events: str | None,
+    prometheus_textfile: Path | None,
+) -> Telemetry | None:
+    """Open the sinks of the job events or return None if none of them is enabled."""
+    from handbrake_batch_compressor.src.compression.telemetry import (
+        EventSink,
+        InvalidEventsTargetError,
+        JsonLinesWriter,
+        PrometheusTextfile,
+        Telemetry,
+        open_events_target,
+    )
+
+    sinks: list[EventSink] = []
+
+    if events is not None:
+        try:
+            sinks.append(JsonLinesWriter(open_events_target(events)))
+        except (InvalidEventsTargetError, OSError) as e:
+            log.error(f"Can't open the events target: {e}")
+            sys.exit(1)
+
+    if prometheus_textfile is not None:
+        sinks.append(PrometheusTextfile(prometheus_textfile))
+
+    return Telemetry(sinks) if sinks else None
+
+
+def close_all(
+    *resources: ProbeCache
+    | JobLedger
+    | Telemetry
+    | JobLeases
+    | CompressionStatistics
+    | None,
+) -> None:
+    """Close the resources opened for the batch (the disabled ones are None)."""
+    for resource in resources:
+        if resource is not None:
+            resource.close()
+
+
+async def run_batch(
+    compression_manager: CompressionManager,
+    coordinator: Coordinator | None,
+    watcher: DirectoryWatcher | None,
+) -> None:
+    """
+    Run the batch, handing out the compressions to the workers in the coordinator mode.
+
+    In the watch mode it runs until interrupted.
+    """
+    try:
+        if coordinator is None:
+            await compression_manager.compress_all_videos()
+            return
+
+        await coordinator.start()
+        try:
+            await compression_manager.compress_all_videos()
+        finally:
+            await coordinator.close()
+    finally:
+        # The watcher blocks a discovery thread, which must end before the event loop
+        if watcher is not None:
+            watcher.close()
 
 
 @app.command()
-def main(  # noqa: PLR0913: too many arguments because of typer
+def main(  # noqa: PLR0913, PLR0915 - too many arguments because of typer, the runtime modules are imported in the body
     target_path: Annotated[
         Path | None,
         typer.Option(
@@ -108,6 +255,22 @@ def main(  # noqa: PLR0913: too many arguments because of typer
     #
     # File operation options
     #
+    stats_checkpoint: Annotated[
+        Path | None,
+        typer.Option(
+            '--stats-checkpoint',
+            help='Append statistics of every compressed file to a CSV file along the way, so they survive a crash of a long run.',
+            dir_okay=False,
+        ),
+    ] = None,
+    stats_export: Annotated[
+        Path | None,
+        typer.Option(
+            '--stats-export',
+            help='Export statistics of all the compressed files to a .csv or .npz (numpy arrays by column) file at the end.',
+            dir_okay=False,
+        ),
+    ] = None,
     ineffective_compression_behavior: Annotated[
         IneffectiveCompressionBehavior,
         typer.Option(
@@ -136,6 +299,256 @@ def main(  # noqa: PLR0913: too many arguments because of typer
             help='Skip files that failed to compress, instead of stopping the processing.',
         ),
     ] = False,
+    abort_ineffective_margin: Annotated[
+        float | None,
+        typer.Option(
+            '--abort-ineffective-margin',
+            help='Abort compressions whose output is on track to be larger than the original by more than this margin (in percent), and handle them according to [bold]--ineffective-compression-behavior[/bold].',
+            min=0,
+        ),
+    ] = None,
+    abort_ineffective_min_progress: Annotated[
+        float,
+        typer.Option(
+            '--abort-ineffective-min-progress',
+            help='Progress (in percent) after which the output size projection of [bold]--abort-ineffective-margin[/bold] is trusted.',
+            min=0,
+            max=100,
+        ),
+    ] = 10.0,
+    min_predicted_saving: Annotated[
+        float | None,
+        typer.Option(
+            '--min-predicted-saving',
+            help='Encode a few short samples of every video first and skip the video if the predicted saving (in percent) is below this threshold.',
+        ),
+    ] = None,
+    trial_segments: Annotated[
+        int,
+        typer.Option(
+            '--trial-segments',
+            help='How many samples to encode for [bold]--min-predicted-saving[/bold].',
+            min=1,
+        ),
+    ] = 3,
+    trial_segment_duration: Annotated[
+        float,
+        typer.Option(
+            '--trial-segment-duration',
+            help='Duration of every sample (in seconds) for [bold]--min-predicted-saving[/bold].',
+            min=1,
+        ),
+    ] = 10.0,
+    jobs: Annotated[
+        int,
+        typer.Option(
+            '--jobs',
+            '-j',
+            help='How many videos to compress at the same time (each one with its own HandbrakeCLI process).',
+            min=1,
+        ),
+    ] = 1,
+    probe_lookahead: Annotated[
+        int,
+        typer.Option(
+            '--probe-lookahead',
+            help='How many upcoming videos to probe in background while the current ones are compressed.',
+            min=1,
+        ),
+    ] = 4,
+    order: Annotated[
+        JobOrder,
+        typer.Option(
+            '--order',
+            help='In which order to compress the videos. ([bold]discovery[/bold], [bold]largest_first[/bold], [bold]shortest_first[/bold], [bold]best_savings_rate[/bold])'
+            '\n\n* [bold]discovery[/bold] as they are found.'
+            '\n\n* [bold]largest_first[/bold] the largest files first.'
+            '\n\n* [bold]shortest_first[/bold] the fastest to encode first (by duration, frame rate and resolution).'
+            '\n\n* [bold]best_savings_rate[/bold] the most expected savings per encoding time first (by bitrate).',
+        ),
+    ] = JobOrder.discovery,
+    no_probe_cache: Annotated[
+        bool,
+        typer.Option(
+            '--no-probe-cache',
+            help="Don't use the cache of video properties, probe every video again.",
+        ),
+    ] = False,
+    rebuild_probe_cache: Annotated[
+        bool,
+        typer.Option(
+            '--rebuild-probe-cache',
+            help='Clear the cache of video properties before the compression.',
+        ),
+    ] = False,
+    ledger: Annotated[
+        bool,
+        typer.Option(
+            '--ledger',
+            help='Remember the outcome of every video in a ledger file in the target path, so the next runs skip videos with known outcomes (skipped, failed, ineffective, done) until they change.',
+        ),
+    ] = False,
+    retry_failed: Annotated[
+        bool,
+        typer.Option(
+            '--retry-failed',
+            help='Process again videos which failed in the previous runs according to the [bold]--ledger[/bold].',
+        ),
+    ] = False,
+    shard: Annotated[
+        Shard | None,
+        typer.Option(
+            '--shard',
+            help='Process only one of the disjoint shards of the video files, e.g. [bold]--shard 2/3[/bold] on the second of three hosts sharing the same library. Files are split by their path relative to the target path, so the hosts need no coordination.',
+            parser=Shard.parse_shard,
+            metavar='<INDEX>/<COUNT>',
+        ),
+    ] = None,
+    leases: Annotated[
+        bool,
+        typer.Option(
+            '--leases',
+            help='Let several instances (on the same or different hosts) compress the same target path at the same time: every compression holds a lease file next to its output, so the instances pick different videos and remove only incomplete files of dead instances.',
+        ),
+    ] = False,
+    lease_timeout: Annotated[
+        int,
+        typer.Option(
+            '--lease-timeout',
+            help='Seconds without a heartbeat after which a lease of another instance is considered dead and can be taken over (clocks of the hosts must be in sync).',
+            min=10,
+        ),
+    ] = DEFAULT_LEASE_TIMEOUT_SECONDS,
+    stderr_tail_size: Annotated[
+        int,
+        typer.Option(
+            '--stderr-tail-size',
+            help='How many KB of the latest HandbrakeCLI stderr output to keep for [bold]errors.log[/bold] while a video is compressed.',
+            min=1,
+        ),
+    ] = DEFAULT_STDERR_TAIL_SIZE // 1024,
+    min_free_space: Annotated[
+        int | None,
+        typer.Option(
+            '--min-free-space',
+            help='Free disk space to keep on every volume (e.g. 10GB): compressions whose estimated output would take more wait until other ones finish (or the space is freed). Use 0 to only prevent running out of space.',
+            parser=parse_size,
+            metavar='<SIZE>',
+        ),
+    ] = None,
+    nice: Annotated[
+        int | None,
+        typer.Option(
+            '--nice',
+            help='CPU priority of HandbrakeCLI (from -20 to 19, the higher the lower the priority).',
+            min=-20,
+            max=19,
+        ),
+    ] = None,
+    ionice: Annotated[
+        IoPriorityClass | None,
+        typer.Option(
+            '--ionice',
+            help='I/O scheduling class of HandbrakeCLI on Linux ([bold]idle[/bold] to use the disk only when no one else needs it).',
+        ),
+    ] = None,
+    ionice_level: Annotated[
+        int | None,
+        typer.Option(
+            '--ionice-level',
+            help='I/O priority level for [bold]--ionice best_effort[/bold] (from 0 to 7, the higher the lower the priority).',
+            min=0,
+            max=7,
+        ),
+    ] = None,
+    cpus: Annotated[
+        str | None,
+        typer.Option(
+            '--cpus',
+            help='CPU cores to run HandbrakeCLI on (e.g. 0-3,6), they are split evenly between the [bold]--jobs[/bold].',
+            metavar='<CPU LIST>',
+        ),
+    ] = None,
+    encoder_threads: Annotated[
+        int | None,
+        typer.Option(
+            '--encoder-threads',
+            help='Limit of the encoder threads of every HandbrakeCLI process (x264 and x265 encoders, given with [bold]--encoder[/bold] in the HandbrakeCLI options).',
+            min=1,
+        ),
+    ] = None,
+    handbrakecli_command: Annotated[
+        str,
+        typer.Option(
+            '--handbrakecli-command',
+            help='Command to run HandbrakeCLI (e.g. a path to another binary).',
+            envvar=HANDBRAKECLI_COMMAND_ENV,
+        ),
+    ] = DEFAULT_HANDBRAKECLI_COMMAND,
+    coordinator_address: Annotated[
+        Address | None,
+        typer.Option(
+            '--coordinator',
+            help='Run as the coordinator listening for workers on the address: discover, probe and finalize the videos here, but hand out the compressions to the workers (see [bold]--worker[/bold]). [bold]--jobs[/bold] is the total count of the parallel compressions. Listen only on a trusted network.',
+            parser=Address.parse_address,
+            metavar='<HOST>:<PORT>',
+        ),
+    ] = None,
+    worker_address: Annotated[
+        Address | None,
+        typer.Option(
+            '--worker',
+            help='Run as a worker of the coordinator on the address: compress the videos it hands out, [bold]--jobs[/bold] at the same time. [bold]--target-path[/bold] is the mount of the same library on this machine.',
+            parser=Address.parse_address,
+            metavar='<HOST>:<PORT>',
+        ),
+    ] = None,
+    watch: Annotated[
+        bool,
+        typer.Option(
+            '--watch',
+            help='Keep running after the videos are processed and compress the new videos appearing in the target path (with the same filters and behaviors) until interrupted.',
+        ),
+    ] = False,
+    watch_settle_seconds: Annotated[
+        float,
+        typer.Option(
+            '--watch-settle-seconds',
+            help='Seconds the size and modification time of a new video must stay the same before it is compressed in the [bold]--watch[/bold] mode (so videos still being copied are not taken).',
+            min=0,
+        ),
+    ] = DEFAULT_SETTLE_SECONDS,
+    watch_poll_interval: Annotated[
+        float,
+        typer.Option(
+            '--watch-poll-interval',
+            help='Seconds between rescans of the target path in the [bold]--watch[/bold] mode if it cannot be watched with inotify (e.g. not on Linux).',
+            min=1,
+        ),
+    ] = DEFAULT_POLL_INTERVAL_SECONDS,
+    events: Annotated[
+        str | None,
+        typer.Option(
+            '--events',
+            help='Write job events (queued, started, progress, finished, skipped, failed) as JSON Lines to a file or to an open file descriptor (fd:<number>).',
+            metavar='<PATH | fd:N>',
+        ),
+    ] = None,
+    prometheus_textfile: Annotated[
+        Path | None,
+        typer.Option(
+            '--prometheus-textfile',
+            help='Periodically write metrics (jobs in flight, queue depth, encode FPS, bytes saved) to a file for the Prometheus node_exporter textfile collector.',
+            dir_okay=False,
+        ),
+    ] = None,
+    keep_full_stderr: Annotated[
+        bool,
+        typer.Option(
+            '--keep-full-stderr',
+            help='Save the full HandbrakeCLI stderr output of failed compressions (gzipped) to the app cache directory, [bold]errors.log[/bold] points to it.',
+        ),
+    ] = False,
     #
     # ---------- Smart Filter options ----------
     #
@@ -198,6 +611,9 @@ def main(  # noqa: PLR0913: too many arguments because of typer
 
     4. Compress files excluding files with resolution and bitrate lower than the specified ones:
     - [bold] ./main.py -t ./videos --filter-min-resolution 720x480 --filter-min-bitrate 100 [/bold]
+
+    5. Compress 4 videos at the same time:
+    - [bold] ./main.py -t ./videos --jobs 4 [/bold]
     """
     if version:
         show_version_and_exit()
@@ -211,50 +627,128 @@ def main(  # noqa: PLR0913: too many arguments because of typer
         log.error('You must specify a target path. (See [bold]--help)[/bold]')
         sys.exit(1)
 
+    # The runtime modules (asyncio, rich live views, HandbrakeCLI runners) are imported
+    # only to run the batch, so `--help` is answered without them
+    import asyncio
+
+    from handbrake_batch_compressor.src.compression.compression_manager import (
+        CompressionManager,
+        CompressionManagerOptions,
+    )
+    from handbrake_batch_compressor.src.compression.compression_statistics import (
+        CompressionStatistics,
+    )
+    from handbrake_batch_compressor.src.compression.disk_space_admission import (
+        DiskSpaceAdmission,
+    )
+    from handbrake_batch_compressor.src.compression.distributed import (
+        Coordinator,
+        EncodeSettings,
+        Worker,
+    )
+    from handbrake_batch_compressor.src.compression.handbrake_compressor import (
+        EarlyAbortOptions,
+        HandbrakeCompressor,
+    )
+    from handbrake_batch_compressor.src.compression.job_lease import JobLeases
+    from handbrake_batch_compressor.src.compression.process_priority import (
+        ProcessPriority,
+        parse_cpu_list,
+    )
+    from handbrake_batch_compressor.src.compression.trial_encoder import (
+        TrialEncoder,
+        TrialOptions,
+    )
+    from handbrake_batch_compressor.src.utils.directory_watcher import (
+        DirectoryWatcher,
+    )
+    from handbrake_batch_compressor.src.utils.files import (
+        get_app_cache_dir,
+        get_video_files_by_directory,
+    )
+    from handbrake_batch_compressor.src.utils.smart_filters import SmartFilter
+    from handbrake_batch_compressor.src.utils.third_party_installers import (
+        setup_software,
+    )
+    from handbrake_batch_compressor.src.utils.video_files_classifier import (
+        VideoFilesClassifier,
+    )
+
     check_target_path(target_path)
     check_extensions_arguments(progress_ext, complete_ext)
     check_handbrakecli_options(handbrakecli_options)
+    check_cpu_list(cpus)
+    check_stats_export_path(stats_export)
+    check_distributed_mode(
+        coordinator_address,
+        worker_address,
+        trial_encoding=min_predicted_saving is not None,
+    )
 
-    setup_software()
+    # A custom HandbrakeCLI command can't be installed,
+    # the coordinator doesn't run HandbrakeCLI at all
+    setup_software(
+        install_handbrake_cli=handbrakecli_command == DEFAULT_HANDBRAKECLI_COMMAND
+        and coordinator_address is None,
+    )
+
+    def make_compressor(settings: EncodeSettings) -> HandbrakeCompressor:
+        return HandbrakeCompressor(
+            handbrakecli_options=settings.handbrakecli_options,
+            early_abort=settings.early_abort,
+            stderr_tail_size=stderr_tail_size * 1024,
+            stderr_spill_dir=get_app_cache_dir() / 'stderr'
+            if keep_full_stderr
+            else None,
+            handbrakecli_command=handbrakecli_command,
+            priority=ProcessPriority(
+                nice=nice,
+                io_class=ionice,
+                io_level=ionice_level,
+                cpus=parse_cpu_list(cpus) if cpus is not None else None,
+                partitions=jobs,
+                encoder_threads=encoder_threads,
+            ),
+        )
+
+    # Encode settings of the workers are sent by the coordinator
+    if worker_address is not None:
+        asyncio.run(
+            Worker(worker_address, target_path, make_compressor, slots=jobs).run(),
+        )
+        return
 
     # All video files, unprocessed, processed and incomplete
+    # Video files are discovered in background and streamed to the compression,
+    # so it starts as soon as the first unprocessed file is found
     log.wait('Collecting all your video files...')
-    video_files = set(get_video_files_paths(target_path))
+    job_leases = JobLeases(timeout_seconds=lease_timeout) if leases else None
+    classifier = VideoFilesClassifier(
+        progress_ext,
+        complete_ext,
+        shard,
+        target_path,
+        leases=job_leases,
+    )
+    # The watcher is started before the discovery, so no new video is missed
+    watcher = (
+        DirectoryWatcher(
+            target_path,
+            settle_seconds=watch_settle_seconds,
+            poll_interval_seconds=watch_poll_interval,
+            accept=classifier.is_unprocessed,
+        )
+        if watch
+        else None
+    )
+    if watcher is not None:
+        watcher.start()
 
-    if len(video_files) == 0:
-        log.success('No video files found. - Nothing to do.')
-        sys.exit(0)
-
-    log.success(f'Found {len(video_files)} video files.')
-
-    complete_files: set[Path] = set()
-    incomplete_files: set[Path] = set()
-    unprocessed_files: set[Path] = set()
-
-    for file in video_files:
-        extensions = {x.replace('.', '') for x in file.suffixes}
-        if complete_ext in extensions:
-            complete_files.add(file)
-        elif progress_ext in extensions:
-            incomplete_files.add(file)
-        else:
-            unprocessed_files.add(file)
-
-    # Remove complete files from unprocessed
-    for original_file in (
-        # filename.complete_ext.ext -> filename.ext
-        x.parent / f'{x.stem.replace(f".{complete_ext}", "")}{x.suffix}'
-        for x in complete_files
-    ):
-        unprocessed_files.discard(original_file)
-
-    log.info(f'Found complete files: {len(complete_files)}')
-    log.info(f'Found incomplete files: {len(incomplete_files)}')
-    log.info(f'Found unprocessed files: {len(unprocessed_files)}')
-
-    if len(incomplete_files) > 0:
-        remove_incomplete_files(incomplete_files)
-        log.success(f'Removed {len(incomplete_files)} incomplete files. 🧹✨')
+    unprocessed_files = classifier.unprocessed_files(
+        get_video_files_by_directory(target_path),
+    )
+    if watcher is not None:
+        unprocessed_files = watcher.watch(unprocessed_files)
 
     smart_filter = SmartFilter(
         minimal_resolution=filter_min_resolution,
@@ -262,21 +756,89 @@ def main(  # noqa: PLR0913: too many arguments because of typer
         minimal_frame_rate=filter_min_frame_rate,
     )
 
+    probe_cache = (
+        None if no_probe_cache else open_probe_cache(rebuild=rebuild_probe_cache)
+    )
+
+    job_ledger = open_job_ledger(target_path, shard, job_leases) if ledger else None
+    telemetry = open_telemetry(events, prometheus_textfile)
+    statistics = CompressionStatistics(checkpoint_path=stats_checkpoint)
+
+    encode_settings = EncodeSettings(
+        handbrakecli_options=handbrakecli_options,
+        early_abort=EarlyAbortOptions(
+            margin_percent=abort_ineffective_margin,
+            min_progress_percent=abort_ineffective_min_progress,
+        )
+        if abort_ineffective_margin is not None
+        else None,
+    )
+    coordinator = (
+        Coordinator(
+            coordinator_address,
+            target_path,
+            handbrakecli_options=encode_settings.handbrakecli_options,
+            early_abort=encode_settings.early_abort,
+        )
+        if coordinator_address is not None
+        else None
+    )
+    compressor = make_compressor(encode_settings)
+
+    trial_encoder = (
+        TrialEncoder(
+            compressor,
+            TrialOptions(
+                segments=trial_segments,
+                segment_seconds=trial_segment_duration,
+                min_predicted_saving_percent=min_predicted_saving,
+            ),
+        )
+        if min_predicted_saving is not None
+        else None
+    )
+
     compression_manager = CompressionManager(
         video_files=unprocessed_files,
-        compressor=HandbrakeCompressor(handbrakecli_options=handbrakecli_options),
+        compressor=coordinator or compressor,
         smart_filter=smart_filter,
         options=CompressionManagerOptions(
             show_stats=show_stats,
             progress_ext=progress_ext,
             complete_ext=complete_ext,
             skip_failed_files=skip_failed_files,
+            jobs=jobs,
+            probe_lookahead=probe_lookahead,
+            retry_failed=retry_failed,
+            order=order,
             ineffective_compression_behavior=ineffective_compression_behavior,
             effective_compression_behavior=effective_compression_behavior,
         ),
+        probe_cache=probe_cache,
+        ledger=job_ledger,
+        trial_encoder=trial_encoder,
+        disk_space=DiskSpaceAdmission(min_free_bytes=min_free_space)
+        if min_free_space is not None
+        else None,
+        telemetry=telemetry,
+        statistics=statistics,
+        leases=job_leases,
+        # Changes of a video in the watch mode are given out once its job is finished
+        on_finished=watcher.release if watcher is not None else None,
     )
 
-    compression_manager.compress_all_videos()
+    try:
+        asyncio.run(run_batch(compression_manager, coordinator, watcher))
+    finally:
+        close_all(probe_cache, job_ledger, telemetry, job_leases, statistics)
+        if stats_export is not None:
+            statistics.export(stats_export)
+
+    log_discovery_summary(classifier)
+    if compression_manager.known_outcomes_count > 0:
+        log.info(
+            f'Skipped {compression_manager.known_outcomes_count} videos with known outcomes from the ledger.',
+        )
 
     log.success('Everything is done! 🎉')
 
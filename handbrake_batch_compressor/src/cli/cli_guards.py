@@ -1,11 +1,18 @@
 """The module provides functions to check if the arguments passed to the CLI are valid."""
 
+from __future__ import annotations
+
 import sys
-from pathlib import Path
 from textwrap import dedent
+from typing import TYPE_CHECKING
 
 from handbrake_batch_compressor.src.cli.logger import log
 
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from handbrake_batch_compressor.src.cli.option_types import Address
+
 
 def check_target_path(target_path: Path) -> None:
     """Check if the target path is a directory and exists otherwise exits."""
@@ -56,3 +63,54 @@ def check_handbrakecli_options(handbrakecli_options: str) -> None:
             ),
         )
         sys.exit(1)
+
+
+def check_cpu_list(cpus: str | None) -> None:
+    """Check if the list of CPU cores is valid (e.g. 0-3,6) otherwise exits."""
+    if cpus is None:
+        return
+
+    # The guards are imported to build the CLI, the runtime modules only when they are used
+    from handbrake_batch_compressor.src.compression.process_priority import (
+        InvalidCpuListError,
+        parse_cpu_list,
+    )
+
+    try:
+        parse_cpu_list(cpus)
+    except InvalidCpuListError as e:
+        log.error(str(e))
+        sys.exit(1)
+
+
+def check_stats_export_path(stats_export: Path | None) -> None:
+    """Check if the statistics can be exported to the file format otherwise exits."""
+    if stats_export is None:
+        return
+
+    from handbrake_batch_compressor.src.compression.compression_statistics import (
+        STATISTICS_EXPORT_FORMATS,
+        UnsupportedExportFormatError,
+    )
+
+    if stats_export.suffix.lower() not in STATISTICS_EXPORT_FORMATS:
+        log.error(str(UnsupportedExportFormatError(stats_export)))
+        sys.exit(1)
+
+
+def check_distributed_mode(
+    coordinator: Address | None,
+    worker: Address | None,
+    *,
+    trial_encoding: bool,
+) -> None:
+    """Check if the coordinator/worker options are compatible otherwise exits."""
+    if coordinator is not None and worker is not None:
+        log.error("A process can't be both the coordinator and a worker.")
+        sys.exit(1)
+
+    if coordinator is not None and trial_encoding:
+        log.error(
+            'Trial encoding ([bold]--min-predicted-saving[/bold]) is not supported in the coordinator mode.',
+        )
+        sys.exit(1)
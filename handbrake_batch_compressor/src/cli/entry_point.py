@@ -0,0 +1,40 @@
+"""
+Entry point of the CLI binary.
+
+Importing the CLI (typer and pydantic) takes a few hundred milliseconds, so `--version`
+and `--guide` are answered before it's imported. The compression modules are imported
+only when the batch runs.
+It matters for scripts calling the tool very often (e.g. from cron).
+"""
+
+from __future__ import annotations
+
+import sys
+
+VERSION = '3.0.0'
+
+_VERSION_OPTIONS = ('--version', '-v')
+_GUIDE_OPTIONS = ('--guide', '-g')
+
+
+def show_version_and_exit() -> None:
+    """Show version and exit."""
+    sys.stdout.write(f'handbrake-batch-compressor {VERSION}\n')
+    sys.exit(0)
+
+
+def bootstrap() -> None:
+    """Answer `--version` and `--guide` right away, otherwise run the CLI."""
+    args = sys.argv[1:]
+    if len(args) == 1 and args[0] in _VERSION_OPTIONS:
+        show_version_and_exit()
+
+    if len(args) == 1 and args[0] in _GUIDE_OPTIONS:
+        # Only the guide is imported (it needs just rich)
+        from handbrake_batch_compressor.src.cli.guide import show_guide_and_exit
+
+        show_guide_and_exit()
+
+    from handbrake_batch_compressor.main import bootstrap as run_cli
+
+    run_cli()
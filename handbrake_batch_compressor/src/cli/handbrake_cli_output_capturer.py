@@ -8,12 +8,26 @@ from __future__ import annotations
 
 import datetime
 import re
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
-from pydantic import BaseModel
+if TYPE_CHECKING:
+    from collections.abc import Callable
 
+# e.g: Encoding: task 1 of 1, 4.00 % (937.13 fps, avg 955.64 fps, ETA 00h03m22s)
+# (the part in the parentheses may be missing or incomplete)
+_PROGRESS_PATTERN = re.compile(
+    r'(?P<progress>\d+\.\d+) %'
+    r'(?: \((?P<fps_current>[\d.]+) fps'
+    r'(?:, avg (?P<fps_average>[\d.]+) fps)?'
+    r'(?:, ETA (?P<hours>\d+)h(?P<minutes>\d+)m(?P<seconds>\d+)s)?)?',
+)
 
-class HandbrakeProgressInfo(BaseModel):
-    """Model representing the progress information captured from Handbrake CLI output."""
+
+@dataclass(slots=True, frozen=True)
+class HandbrakeProgressInfo:
+    """Progress information captured from Handbrake CLI output."""
 
     progress: float | None
     fps_current: float | None
@@ -21,30 +35,74 @@ class HandbrakeProgressInfo(BaseModel):
     eta: datetime.timedelta | None
 
 
-def parse_handbrake_cli_output(line: str) -> HandbrakeProgressInfo:
-    """Parse a line of Handbrake CLI output and returns a HandbrakeProgressInfo object."""
-    # Extract percentage
-    progress_match = re.search(r'(\d+\.\d+) %', line)
-    progress = float(progress_match.group(1)) if progress_match else None
+_NO_PROGRESS = HandbrakeProgressInfo(
+    progress=None,
+    fps_current=None,
+    fps_average=None,
+    eta=None,
+)
 
-    # Get current FPS
-    fps_current_match = re.search(r'([\d.]+) fps', line)
-    fps_current = float(fps_current_match.group(1)) if fps_current_match else None
 
-    # Get Average FPS
-    fps_avg_match = re.search(r'avg ([\d.]+) fps', line)
-    fps_avg = float(fps_avg_match.group(1)) if fps_avg_match else None
+def parse_handbrake_cli_output(line: str) -> HandbrakeProgressInfo:
+    """Parse a line of Handbrake CLI output and returns a HandbrakeProgressInfo object."""
+    match = _PROGRESS_PATTERN.search(line)
+    if match is None:
+        return _NO_PROGRESS
 
-    # Extract ETA
-    eta_match = re.search(r'ETA (\d+h\d+m\d+s)', line)
-    eta = None
-    if eta_match:
-        h, m, s = map(int, re.findall(r'\d+', eta_match.group(1)))
-        eta = datetime.timedelta(hours=h, minutes=m, seconds=s)
+    progress, fps_current, fps_average, hours, minutes, seconds = match.groups()
 
     return HandbrakeProgressInfo(
-        progress=progress,
-        fps_current=fps_current,
-        fps_average=fps_avg,
-        eta=eta,
+        progress=float(progress),
+        fps_current=float(fps_current) if fps_current is not None else None,
+        fps_average=float(fps_average) if fps_average is not None else None,
+        eta=datetime.timedelta(
+            hours=int(hours),
+            minutes=int(minutes),
+            seconds=int(seconds),
+        )
+        if hours is not None
+        else None,
     )
+
+
+class ProgressDispatcher:
+    """
+    Coalesces progress updates to deliver at most `max_updates_per_second` of them.
+
+    Updates arriving in between are not queued, only the latest one is kept
+    and delivered with the next allowed update (or by `flush()`).
+
+    Usage example:
+        dispatcher = ProgressDispatcher(update_progress_bar, max_updates_per_second=2)
+        await compressor.compress(input_video, output_video, on_update=dispatcher)
+        dispatcher.flush()
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[HandbrakeProgressInfo], None],
+        max_updates_per_second: float,
+    ) -> None:
+        self.callback = callback
+        self.min_interval = 1 / max_updates_per_second
+
+        self._last_dispatch = float('-inf')
+        self._pending: HandbrakeProgressInfo | None = None
+
+    def __call__(self, info: HandbrakeProgressInfo) -> None:
+        """Deliver the update if enough time has passed or keep it as pending."""
+        now = time.monotonic()
+        if now - self._last_dispatch < self.min_interval:
+            self._pending = info
+            return
+
+        self._pending = None
+        self._last_dispatch = now
+        self.callback(info)
+
+    def flush(self) -> None:
+        """Deliver the pending update if any."""
+        if self._pending is not None:
+            info, self._pending = self._pending, None
+            self._last_dispatch = time.monotonic()
+            self.callback(info)
@@ -0,0 +1,112 @@
+"""
+The module provides the types and defaults of the CLI options.
+
+Typer needs them to build the command (and its `--help`), so they are kept apart
+from the modules using them, which import HandbrakeCLI runners, asyncio, rich live
+views and numpy. Those are imported only when the command actually runs.
+"""
+
+from __future__ import annotations
+
+from enum import Enum
+
+from pydantic import BaseModel
+
+# Allows to run another HandbrakeCLI binary or a stand-in (e.g. in benchmarks)
+HANDBRAKECLI_COMMAND_ENV = 'HANDBRAKE_BATCH_COMPRESSOR_HANDBRAKECLI'
+DEFAULT_HANDBRAKECLI_COMMAND = 'handbrakecli'
+
+DEFAULT_SETTLE_SECONDS = 10.0
+DEFAULT_POLL_INTERVAL_SECONDS = 30.0
+
+
+class IneffectiveCompressionBehavior(str, Enum):
+    """
+    Option to choose how to handle ineffective compressions (when compressed file is larger).
+
+    mark_original - Mark the original file as compressed.
+    delete_compressed - Delete the larger file and mark the other one as compressed.
+    keep_both - Keep both files in any case.
+    """
+
+    mark_original = 'mark_original'
+    delete_compressed = 'delete_compressed'
+    keep_both = 'keep_both'
+
+
+class EffectiveCompressionBehavior(str, Enum):
+    """
+    Option to choose how to handle effective compressions (when compressed file is smaller).
+
+    delete_original - Delete the original file.
+    keep_both - Keep both files in any case.
+    """
+
+    delete_original = 'delete_original'
+    keep_both = 'keep_both'
+
+
+class JobOrder(str, Enum):
+    """
+    Option to choose the order of the compressions.
+
+    discovery - In the order the videos are found.
+    largest_first - The largest files first.
+    shortest_first - The videos which are the fastest to encode first (fewest pixels to encode).
+    best_savings_rate - The most saved bytes per second of encoding first (estimated from bitrate).
+    """
+
+    discovery = 'discovery'
+    largest_first = 'largest_first'
+    shortest_first = 'shortest_first'
+    best_savings_rate = 'best_savings_rate'
+
+
+class IoPriorityClass(str, Enum):
+    """
+    I/O scheduling class of HandbrakeCLI (Linux only).
+
+    idle - Get disk time only when no other process needs it.
+    best_effort - The default class (the level can be lowered with `io_level`).
+    """
+
+    idle = 'idle'
+    best_effort = 'best_effort'
+
+
+class InvalidAddressError(ValueError):
+    """Exception raised for an invalid network address."""
+
+    def __init__(self, address: str) -> None:
+        super().__init__(
+            f'Invalid address: {address} (the right format is <HOST>:<PORT>, e.g. 0.0.0.0:7420)',
+        )
+
+
+class Address(BaseModel):
+    """
+    Network address of the coordinator.
+
+    Usage example:
+        address = Address.parse_address('192.168.1.10:7420')
+    """
+
+    host: str
+    port: int
+
+    def __str__(self) -> str:
+        """Address representation e.g: 192.168.1.10:7420."""
+        return f'{self.host}:{self.port}'
+
+    @staticmethod
+    def parse_address(address: str) -> Address:
+        host, separator, port = address.rpartition(':')
+        try:
+            result = Address(host=host.strip('[]'), port=int(port))
+        except ValueError:
+            raise InvalidAddressError(address) from None
+
+        if not separator or not host or not 0 <= result.port <= 65535:  # noqa: PLR2004 - the largest port
+            raise InvalidAddressError(address)
+
+        return result
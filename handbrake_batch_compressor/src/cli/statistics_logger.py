@@ -10,12 +10,50 @@ from handbrake_batch_compressor.src.utils.files import human_readable_size
 
 if TYPE_CHECKING:
     from handbrake_batch_compressor.src.cli.logger import AppLogger
+    from handbrake_batch_compressor.src.compression.batch_throughput import (
+        BatchThroughput,
+    )
     from handbrake_batch_compressor.src.compression.compression_statistics import (
         CompressionStatistics,
         FileStatistics,
     )
 
 
+def human_readable_duration(seconds: float) -> str:
+    """
+    Format the duration in hours, minutes and seconds.
+
+    e.g: 1h 02m 03s, 5m 03s, 12s
+    """
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+
+    if hours:
+        return f'{hours}h {minutes:02d}m {seconds:02d}s'
+    if minutes:
+        return f'{minutes}m {seconds:02d}s'
+    return f'{seconds}s'
+
+
+def _encode_speed_info(
+    encode_seconds: float | None,
+    encode_speed: float | None,
+    fps_average: float | None,
+) -> str:
+    """Format the encode time and speed, e.g: ` in 5m 03s (avg 250.0 fps, 3.1x realtime)`."""
+    if encode_seconds is None:
+        return ''
+
+    details: list[str] = []
+    if fps_average is not None:
+        details.append(f'avg {fps_average:.1f} fps')
+    if encode_speed is not None:
+        details.append(f'{encode_speed:.1f}x realtime')
+
+    info = f' in {human_readable_duration(encode_seconds)}'
+    return f'{info} ({", ".join(details)})' if details else info
+
+
 class StatisticsLogger:
     """
     A class for logging compression statistics.
@@ -47,8 +85,18 @@ class StatisticsLogger:
 
         # Log the message, adjusting for file path if necessary
         if info:
+            predicted = (
+                f' (predicted: {(info.predicted_ratio - 1) * 100:+.0f}%)'
+                if info.predicted_ratio is not None
+                else ''
+            )
+            speed = _encode_speed_info(
+                info.encode_seconds,
+                info.encode_speed,
+                info.fps_average,
+            )
             self.log.success(
-                f'Compressed {info.path.name} (size: {init_size} -> {final_size}) {compression_rate}',
+                f'Compressed {info.path.name} (size: {init_size} -> {final_size}) {compression_rate}{escape(predicted)}{escape(speed)}',
                 highlight=False,
             )
         else:
@@ -60,3 +108,29 @@ class StatisticsLogger:
                 self.log.info(
                     f'Skipped {self.statistics.overall_stats.files_skipped} files',
                 )
+            overall = self.statistics.overall_stats
+            if overall.media_seconds:
+                speed = _encode_speed_info(
+                    overall.encode_seconds,
+                    overall.encode_speed,
+                    overall.fps_average,
+                )
+                self.log.info(
+                    f'Encoded {human_readable_duration(overall.media_seconds)} of video{escape(speed)}',
+                )
+            prediction_error = self.statistics.prediction_error_percent
+            if prediction_error is not None:
+                self.log.info(
+                    f'Trial encoding prediction error: {prediction_error:.1f}% on average',
+                )
+
+    def log_batch_throughput(self, throughput: BatchThroughput) -> None:
+        """Log the encode speed of the whole batch (all the jobs together)."""
+        speed = throughput.media_seconds_per_second
+        if speed is None:
+            return
+
+        self.log.info(
+            f'Batch throughput: {human_readable_duration(throughput.encoded_media_seconds)} of video '
+            f'in {human_readable_duration(throughput.elapsed_seconds)} ({speed:.1f}x realtime)',
+        )
@@ -0,0 +1,164 @@
+"""
+The module provides tracking of the encode throughput of the whole batch.
+
+Throughput is measured in media seconds encoded per wall second (summed over
+the parallel jobs), so the time left is estimated from the media duration
+of the videos still waiting to be compressed, not from the count of files.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from handbrake_batch_compressor.src.compression.probe_pipeline import (
+        ProbedVideo,
+    )
+
+
+class BatchThroughput:
+    """
+    Tracks the media duration encoded by the running jobs and estimates the batch ETA.
+
+    Videos are counted when they are discovered, their duration is known once
+    they are probed. The duration of the videos which aren't probed yet is
+    extrapolated from the probed ones.
+
+    Usage example:
+        throughput = BatchThroughput()
+        throughput.add_discovered()
+        throughput.add_probed(probed_video)
+        throughput.start_job(video, media_seconds=600)
+        throughput.update_job(video, progress=50.0)
+        throughput.finish_job(video, completed=True)
+        throughput.eta_seconds  # e.g. 1234.5
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._started_at: float | None = None
+
+        self._discovered = 0
+        self._probed = 0
+        # Media duration of all the probed videos to compress (for extrapolation)
+        self._probed_media_seconds = 0.0
+        # Media duration of the probed videos waiting for a worker
+        self._queued_media_seconds = 0.0
+        # Running jobs: media duration and progress in percents
+        self._running: dict[Path, tuple[float, float]] = {}
+        self._encoded_media_seconds = 0.0
+
+    def add_discovered(self) -> None:
+        """Count a new video found by the discovery."""
+        self._discovered += 1
+
+    def add_probed(self, probed: ProbedVideo) -> None:
+        """Queue the probed video (if it's going to be compressed)."""
+        self._probed += 1
+        media_seconds = _media_seconds(probed)
+        if probed.should_compress and media_seconds is not None:
+            self._probed_media_seconds += media_seconds
+            self._queued_media_seconds += media_seconds
+
+    def skip_probed(self, probed: ProbedVideo) -> None:
+        """Remove the queued video which isn't going to be compressed (e.g. it's leased by another instance)."""
+        media_seconds = _media_seconds(probed)
+        if probed.should_compress and media_seconds is not None:
+            self._queued_media_seconds = max(
+                self._queued_media_seconds - media_seconds,
+                0.0,
+            )
+
+    def start_job(self, video: Path, media_seconds: float | None) -> None:
+        """Move the video from the queue to the running jobs."""
+        if self._started_at is None:
+            self._started_at = self._clock()
+
+        media_seconds = media_seconds or 0.0
+        self._queued_media_seconds = max(
+            self._queued_media_seconds - media_seconds,
+            0.0,
+        )
+        self._running[video] = (media_seconds, 0.0)
+
+    def update_job(self, video: Path, progress: float) -> None:
+        """Update the progress (in percents) of the running job."""
+        if video in self._running:
+            media_seconds, _ = self._running[video]
+            self._running[video] = (media_seconds, progress)
+
+    def finish_job(self, video: Path, *, completed: bool) -> None:
+        """
+        Remove the job from the running ones.
+
+        Media of an uncompleted job (failed, aborted or skipped by the trial)
+        is counted as encoded only up to its last progress.
+        """
+        if video not in self._running:
+            return
+
+        media_seconds, progress = self._running.pop(video)
+        self._encoded_media_seconds += media_seconds * (
+            1.0 if completed else progress / 100
+        )
+
+    @property
+    def elapsed_seconds(self) -> float:
+        """Wall time since the first job has started."""
+        if self._started_at is None:
+            return 0.0
+        return self._clock() - self._started_at
+
+    @property
+    def encoded_media_seconds(self) -> float:
+        """Media duration encoded so far (including the running jobs)."""
+        return self._encoded_media_seconds + sum(
+            media_seconds * progress / 100
+            for media_seconds, progress in self._running.values()
+        )
+
+    @property
+    def media_seconds_per_second(self) -> float | None:
+        """Encode speed of the whole batch (e.g. 3.0 means 3 seconds of video per second)."""
+        elapsed = self.elapsed_seconds
+        encoded = self.encoded_media_seconds
+        if elapsed <= 0 or encoded <= 0:
+            return None
+        return encoded / elapsed
+
+    @property
+    def remaining_media_seconds(self) -> float:
+        """Media duration left to encode: queued, running and not yet probed videos."""
+        running_left = sum(
+            media_seconds * (1 - progress / 100)
+            for media_seconds, progress in self._running.values()
+        )
+
+        not_probed = max(self._discovered - self._probed, 0)
+        average_media_seconds = (
+            self._probed_media_seconds / self._probed if self._probed else 0.0
+        )
+
+        return (
+            self._queued_media_seconds
+            + running_left
+            + not_probed * average_media_seconds
+        )
+
+    @property
+    def eta_seconds(self) -> float | None:
+        """Estimated wall time until the whole batch is encoded or None if unknown yet."""
+        speed = self.media_seconds_per_second
+        if speed is None:
+            return None
+        return self.remaining_media_seconds / speed
+
+
+def _media_seconds(probed: ProbedVideo) -> float | None:
+    if probed.properties is None:
+        return None
+    return probed.properties.duration_seconds
@@ -3,7 +3,10 @@
 from __future__ import annotations
 
 import asyncio
-from enum import Enum
+import contextlib
+import time
+from collections.abc import Sized
+from shlex import split
 from typing import TYPE_CHECKING
 
 from pydantic import BaseModel
@@ -19,56 +22,77 @@ from rich.progress import (
 )
 from rich.rule import Rule
 
+from handbrake_batch_compressor.src.cli.handbrake_cli_output_capturer import (
+    ProgressDispatcher,
+)
 from handbrake_batch_compressor.src.cli.logger import log
-from handbrake_batch_compressor.src.cli.statistics_logger import StatisticsLogger
+from handbrake_batch_compressor.src.cli.option_types import (
+    EffectiveCompressionBehavior,
+    IneffectiveCompressionBehavior,
+    JobOrder,
+)
+from handbrake_batch_compressor.src.cli.statistics_logger import (
+    StatisticsLogger,
+    human_readable_duration,
+)
+from handbrake_batch_compressor.src.compression.batch_throughput import (
+    BatchThroughput,
+)
 from handbrake_batch_compressor.src.compression.compression_statistics import (
     CompressionStatistics,
+    EncodeSpeedStatistics,
+)
+from handbrake_batch_compressor.src.compression.disk_space_admission import (
+    InsufficientDiskSpaceError,
+    estimate_output_size,
 )
+from handbrake_batch_compressor.src.compression.job_ledger import JobState
+from handbrake_batch_compressor.src.compression.job_scheduler import JobScheduler
+from handbrake_batch_compressor.src.compression.probe_pipeline import (
+    ProbedVideo,
+    ProbePipeline,
+)
+from handbrake_batch_compressor.src.compression.telemetry import JobEvent
 from handbrake_batch_compressor.src.errors.cancel_compression_by_user import (
     CompressionCancelledByUserError,
 )
 from handbrake_batch_compressor.src.errors.handbrake_cli_exceptions import (
     CompressionFailedError,
+    CompressionIneffectiveError,
+)
+from handbrake_batch_compressor.src.utils.handbrakecli_options import (
+    target_bitrate_kbits,
 )
-from handbrake_batch_compressor.src.utils.ffmpeg_helpers import get_video_properties
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import Callable, Generator, Iterable
     from pathlib import Path
 
     from handbrake_batch_compressor.src.cli.handbrake_cli_output_capturer import (
         HandbrakeProgressInfo,
     )
+    from handbrake_batch_compressor.src.compression.disk_space_admission import (
+        DiskSpaceAdmission,
+    )
+    from handbrake_batch_compressor.src.compression.distributed import Coordinator
     from handbrake_batch_compressor.src.compression.handbrake_compressor import (
         HandbrakeCompressor,
     )
+    from handbrake_batch_compressor.src.compression.job_lease import JobLeases
+    from handbrake_batch_compressor.src.compression.job_ledger import JobLedger
+    from handbrake_batch_compressor.src.compression.telemetry import Telemetry
+    from handbrake_batch_compressor.src.compression.trial_encoder import (
+        TrialEncoder,
+        TrialPrediction,
+    )
+    from handbrake_batch_compressor.src.utils.ffmpeg_helpers import VideoProperties
+    from handbrake_batch_compressor.src.utils.files import VideoFile
+    from handbrake_batch_compressor.src.utils.probe_cache import ProbeCache
     from handbrake_batch_compressor.src.utils.smart_filters import SmartFilter
 
 
-class IneffectiveCompressionBehavior(str, Enum):
-    """
-    Option to choose how to handle ineffective compressions (when compressed file is larger).
-
-    mark_original - Mark the original file as compressed.
-    delete_compressed - Delete the larger file and mark the other one as compressed.
-    keep_both - Keep both files in any case.
-    """
-
-    mark_original = 'mark_original'
-    delete_compressed = 'delete_compressed'
-    keep_both = 'keep_both'
-
-
-class EffectiveCompressionBehavior(str, Enum):
-    """
-    Option to choose how to handle effective compressions (when compressed file is smaller).
-
-    delete_original - Delete the original file.
-    keep_both - Keep both files in any case.
-    """
-
-    delete_original = 'delete_original'
-    keep_both = 'keep_both'
+# Progress of every job is redrawn at most this often
+PROGRESS_UPDATES_PER_SECOND = 4
 
 
 class CompressionManagerOptions(BaseModel):
@@ -78,6 +102,10 @@ class CompressionManagerOptions(BaseModel):
     progress_ext: str = 'compressing'
     complete_ext: str = 'compressed'
     skip_failed_files: bool = False
+    jobs: int = 1
+    probe_lookahead: int = 4
+    retry_failed: bool = False
+    order: JobOrder = JobOrder.discovery
     ineffective_compression_behavior: IneffectiveCompressionBehavior
     effective_compression_behavior: EffectiveCompressionBehavior
 
@@ -85,34 +113,63 @@ class CompressionManagerOptions(BaseModel):
 class CompressionManager:
     """Manages the batch compression of multiple videos."""
 
-    def __init__(
+    def __init__(  # noqa: PLR0913 - dependencies of the manager
         self,
-        video_files: set[Path],
+        video_files: Iterable[VideoFile],
         *,
-        compressor: HandbrakeCompressor,
+        compressor: HandbrakeCompressor | Coordinator,
         smart_filter: SmartFilter,
         options: CompressionManagerOptions,
+        probe_cache: ProbeCache | None = None,
+        ledger: JobLedger | None = None,
+        trial_encoder: TrialEncoder | None = None,
+        disk_space: DiskSpaceAdmission | None = None,
+        telemetry: Telemetry | None = None,
+        statistics: CompressionStatistics | None = None,
+        leases: JobLeases | None = None,
+        on_finished: Callable[[Path], None] | None = None,
     ) -> None:
+        """`on_finished` is called with the path of every video taken from `video_files` once it's done with."""
         self.video_files = video_files
         self.compressor = compressor
         self.smart_filter = smart_filter
         self.options = options
-
-        self.statistics = CompressionStatistics()
+        self.probe_cache = probe_cache
+        self.ledger = ledger
+        self.trial_encoder = trial_encoder
+        self.disk_space = disk_space
+        self.telemetry = telemetry
+        self.leases = leases
+        self.on_finished = on_finished
+
+        # Count of videos skipped because their outcome is already in the ledger
+        self.known_outcomes_count = 0
+
+        self.statistics = statistics or CompressionStatistics()
         self.statistics_logger = StatisticsLogger(self.statistics, log)
 
-    def compress_all_videos(self) -> None:
-        """Compress all the videos in the given directory."""
-        general_progress = Progress(
+        # Encode speed of all the jobs together, the batch ETA is based on it
+        self.throughput = BatchThroughput()
+
+        self.general_progress = Progress(
             'Compressing videos: {task.description} ([bold blue]{task.completed}/{task.total}[/bold blue])',
             BarColumn(bar_width=None),
             'Time Elapsed: ',
             TimeElapsedColumn(),
+            'Batch ETA: ',
+            '[progress.remaining]{task.fields[eta]}',
             console=log.console,
             transient=True,
         )
+        # Videos may be still being discovered, so the total grows along the way
+        self.all_videos_task = self.general_progress.add_task(
+            description='Compressing videos',
+            total=len(video_files) if isinstance(video_files, Sized) else None,
+            eta='-:--:--',
+        )
 
-        task_progress = Progress(
+        # One row per active compression job
+        self.task_progress = Progress(
             '{task.description}',
             BarColumn(bar_width=None),
             '[progress.percentage]{task.percentage:>3.0f}%',
@@ -121,15 +178,20 @@ class CompressionManager:
             transient=True,
         )
 
-        video_name_max_length = 30
+    async def compress_all_videos(self) -> None:
+        """
+        Compress all the videos in the given directory.
 
+        The whole batch runs on the caller's event loop, so it can be awaited
+        directly by callers who already own one, or started with `asyncio.run`.
+        """
         with Live(
             Align.left(
                 Panel(
                     Group(
-                        general_progress,
+                        self.general_progress,
                         Rule(),
-                        task_progress,
+                        self.task_progress,
                     ),
                 ),
                 vertical='middle',
@@ -139,61 +201,409 @@ class CompressionManager:
             console=log.console,
             transient=True,
         ):
-            all_videos_task = general_progress.add_task(
-                description='Compressing videos',
-                total=len(self.video_files),
+            await self._run_compression_jobs()
+
+        if self.options.show_stats:
+            self.statistics_logger.log_stats()
+            self.statistics_logger.log_batch_throughput(self.throughput)
+
+    async def _run_compression_jobs(self) -> None:
+        """
+        Run up to `options.jobs` compressions at the same time.
+
+        If any of the jobs fails (or the user interrupts the process)
+        all the other jobs are cancelled, so every HandbrakeCLI process is killed
+        and its incomplete output is removed.
+        """
+        # Upcoming videos are probed while the current ones are compressed,
+        # so the workers don't wait for the metadata
+        probe_pipeline = ProbePipeline(
+            self._count_discovered_videos(),
+            self.smart_filter,
+            lookahead=max(self.options.probe_lookahead, self.options.jobs),
+            probe_cache=self.probe_cache,
+            on_probed=self._on_probed,
+        )
+        probe_pipeline.start()
+
+        # Probed videos are reordered by their value unless the discovery order is kept
+        scheduler = (
+            JobScheduler(probe_pipeline, self.options.order)
+            if self.options.order != JobOrder.discovery
+            else None
+        )
+        if scheduler is not None:
+            scheduler.start()
+
+        workers = [
+            asyncio.create_task(
+                self._compression_worker(scheduler or probe_pipeline),
             )
+            for _ in range(self.options.jobs)
+        ]
 
-            for video in self.video_files:
-                video_properties = get_video_properties(video)
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if scheduler is not None:
+                await scheduler.close()
+            await probe_pipeline.close()
+
+    def _count_discovered_videos(self) -> Generator[VideoFile, None, None]:
+        """
+        Pass the videos through, updating the total of the general progress.
+
+        Videos with known outcomes (according to the ledger) are left out.
+        """
+        discovered = 0
+        for video in self.video_files:
+            if self._has_known_outcome(video):
+                self.known_outcomes_count += 1
+                self._finished(video.path)
+                continue
+
+            discovered += 1
+            self.throughput.add_discovered()
+            self.general_progress.update(self.all_videos_task, total=discovered)
+            yield video
+
+    def _on_probed(self, probed: ProbedVideo) -> None:
+        self.throughput.add_probed(probed)
+        self._emit(
+            JobEvent.queued,
+            probed.path,
+            size_bytes=probed.size_bytes,
+            media_seconds=probed.properties.duration_seconds
+            if probed.properties is not None
+            else None,
+            should_compress=probed.should_compress,
+        )
 
-                if video_properties is None:
-                    log.error(
-                        f"""Error getting video properties for {video.name}. The file is probably corrupted. Skipping...""",
-                    )
-                    self.statistics.skip_file(video)
-                    continue
+    def _emit(self, event: JobEvent, video: Path, **fields: object) -> None:
+        if self.telemetry is not None:
+            self.telemetry.emit(event, video, **fields)
 
-                if not self.smart_filter.should_compress(video_properties):
-                    log.info(
-                        f"""Skipping {video.name} because it doesn't meet the smart filter criteria...""",
-                    )
-                    self.statistics.skip_file(video)
-                    continue
+    def _ledger_settings(self, state: JobState) -> str:
+        """Return what the outcome of the job in the given state depends on."""
+        if state == JobState.skipped:
+            if self.trial_encoder is not None:
+                return f'{self.smart_filter.criteria};{self.trial_encoder.options.criteria}'
+            return self.smart_filter.criteria
+        return self.compressor.handbrakecli_options
 
-                shortened_video_name = video.name[:video_name_max_length]
-                shortened_video_name += (
-                    '...' if len(video.name) > video_name_max_length else ''
-                )
+    def _has_known_outcome(self, video: VideoFile) -> bool:
+        if self.ledger is None:
+            return False
 
-                current_compression = task_progress.add_task(
-                    total=100,
-                    description=f'Compressing {shortened_video_name}',
-                )
+        entry = self.ledger.get(video)
+        if entry is None or entry.state == JobState.pending:
+            return False
+        if entry.state == JobState.failed and self.options.retry_failed:
+            return False
+
+        return entry.settings == self._ledger_settings(entry.state)
+
+    def _record_job(self, video: VideoFile, state: JobState) -> None:
+        if self.ledger is not None:
+            self.ledger.record(video, state, self._ledger_settings(state))
 
-                general_progress.update(
-                    all_videos_task,
-                    description=shortened_video_name,
+    async def _compression_worker(
+        self,
+        probed_videos: ProbePipeline | JobScheduler,
+    ) -> None:
+        """Take probed videos one by one until there are no more."""
+        while (probed_video := await probed_videos.get()) is not None:
+            try:
+                await self._process_video(probed_video)
+            finally:
+                self._finished(probed_video.path)
+
+    def _finished(self, video: Path) -> None:
+        if self.on_finished is not None:
+            self.on_finished(video)
+
+    async def _process_video(self, probed_video: ProbedVideo) -> None:
+        """Compress the video if it passed the smart filter or skip it otherwise."""
+        video_file = probed_video.file
+        video = video_file.path
+
+        if probed_video.properties is None:
+            log.error(
+                f"""Error getting video properties for {video.name}. The file is probably corrupted. Skipping...""",
+            )
+            await self._skip_video(video_file, JobState.failed, reason='corrupted')
+            return
+
+        if not probed_video.should_compress:
+            log.info(
+                f"""Skipping {video.name} because it doesn't meet the smart filter criteria...""",
+            )
+            await self._skip_video(
+                video_file,
+                JobState.skipped,
+                reason='smart_filter',
+            )
+            return
+
+        if not await self._acquire_lease(probed_video):
+            return
+
+        try:
+            await self._compress_probed_video(probed_video, probed_video.properties)
+        finally:
+            if self.leases is not None:
+                await asyncio.to_thread(
+                    self.leases.release,
+                    self._in_progress_path(video),
                 )
 
-                self.compress_video(
+    async def _acquire_lease(self, probed_video: ProbedVideo) -> bool:
+        """
+        Acquire the lease of the compression, so other instances don't compress the video.
+
+        If the video is being compressed or has been compressed by another instance,
+        it's left out (it's not recorded to the ledger and statistics of this instance).
+        """
+        if self.leases is None:
+            return True
+
+        video = probed_video.path
+        reason = None
+        if not await asyncio.to_thread(
+            self.leases.acquire,
+            self._in_progress_path(video),
+        ):
+            reason = 'leased'
+        elif not await asyncio.to_thread(self._is_unprocessed, video):
+            await asyncio.to_thread(
+                self.leases.release,
+                self._in_progress_path(video),
+            )
+            reason = 'processed_elsewhere'
+
+        if reason is None:
+            return True
+
+        log.info(
+            f'Skipping {video.name} because it is compressed by another instance...',
+        )
+        self._emit(JobEvent.skipped, video, reason=reason)
+        self.throughput.skip_probed(probed_video)
+        self._update_batch_eta()
+        self.general_progress.update(self.all_videos_task, advance=1)
+        return False
+
+    def _is_unprocessed(self, video: Path) -> bool:
+        """Check if the video is still unprocessed (another instance could finish it after the discovery)."""
+        return (
+            video.exists()
+            and not (
+                video.parent / f'{video.stem}.{self.options.complete_ext}{video.suffix}'
+            ).exists()
+        )
+
+    async def _compress_probed_video(
+        self,
+        probed_video: ProbedVideo,
+        properties: VideoProperties,
+    ) -> None:
+        """Compress the video showing its progress and updating the batch ETA."""
+        video_file = probed_video.file
+        video = video_file.path
+
+        video_name_max_length = 30
+        shortened_video_name = video.name[:video_name_max_length]
+        shortened_video_name += '...' if len(video.name) > video_name_max_length else ''
+
+        current_compression = self.task_progress.add_task(
+            total=100,
+            description=f'Compressing {shortened_video_name}',
+        )
+
+        self.general_progress.update(
+            self.all_videos_task,
+            description=shortened_video_name,
+        )
+
+        self.throughput.start_job(video, properties.duration_seconds)
+        self._emit(
+            JobEvent.started,
+            video,
+            size_bytes=probed_video.size_bytes,
+            media_seconds=properties.duration_seconds,
+        )
+        completed = False
+
+        try:
+            prediction = None
+            if self.trial_encoder is not None:
+                self.task_progress.update(
+                    current_compression,
+                    description=f'{shortened_video_name} - [italic]Trial encoding...[/italic]',
+                )
+                prediction = await self.trial_encoder.predict(
                     video,
-                    on_progress_update=lambda info,
-                    task=current_compression: task_progress.update(
-                        task,
-                        description=f'[italic]FPS: {info.fps_current or ""}[/italic] - [underline] Average FPS: {info.fps_average or ""}',
-                        completed=info.progress,
-                    ),
+                    properties,
+                    video_file.size_bytes,
+                )
+                if prediction is not None and not (
+                    self.trial_encoder.is_worth_compressing(prediction)
+                ):
+                    log.info(
+                        f'Skipping {video.name} because its predicted saving ({prediction.predicted_saving_percent:.0f}%) is below the threshold...',
+                    )
+                    await self._skip_video(
+                        video_file,
+                        JobState.skipped,
+                        reason='predicted_saving',
+                    )
+                    return
+
+            # HandbrakeCLI reports progress much more often than the screen is refreshed
+            def on_progress(info: HandbrakeProgressInfo) -> None:
+                self.task_progress.update(
+                    current_compression,
+                    description=f'{shortened_video_name} - [italic]FPS: {info.fps_current or ""}[/italic] - [underline] Average FPS: {info.fps_average or ""}',
+                    completed=info.progress,
                 )
+                if info.progress is not None:
+                    self.throughput.update_job(video, info.progress)
+                    self._update_batch_eta()
+                    self._emit(
+                        JobEvent.progress,
+                        video,
+                        progress=info.progress,
+                        fps_current=info.fps_current,
+                        fps_average=info.fps_average,
+                    )
+
+            progress_dispatcher = ProgressDispatcher(
+                on_progress,
+                max_updates_per_second=PROGRESS_UPDATES_PER_SECOND,
+            )
 
-                general_progress.update(
-                    all_videos_task,
-                    advance=1,
+            def on_wait_for_disk_space() -> None:
+                log.warning(
+                    f'Not enough free disk space to compress {video.name}, waiting for it...',
+                )
+                self.task_progress.update(
+                    current_compression,
+                    description=f'{shortened_video_name} - [italic]Waiting for free disk space...[/italic]',
                 )
-                task_progress.remove_task(current_compression)
 
-        if self.options.show_stats:
-            self.statistics_logger.log_stats()
+            try:
+                async with self._reserve_disk_space(
+                    video_file,
+                    properties,
+                    prediction,
+                    on_wait=on_wait_for_disk_space,
+                ):
+                    try:
+                        completed = await self.compress_video(
+                            video_file,
+                            predicted_ratio=prediction.predicted_ratio
+                            if prediction
+                            else None,
+                            on_progress_update=progress_dispatcher,
+                            media_seconds=properties.duration_seconds,
+                        )
+                    finally:
+                        # The last progress may be held back by the throttling
+                        progress_dispatcher.flush()
+            except InsufficientDiskSpaceError as e:
+                log.warning(f'Skipping {video.name}: {e}.')
+                self._skip_for_disk_space(video_file)
+                return
+        finally:
+            self.task_progress.remove_task(current_compression)
+            self.throughput.finish_job(video, completed=completed)
+            self._update_batch_eta()
+
+        self.general_progress.update(
+            self.all_videos_task,
+            advance=1,
+        )
+
+    def _update_batch_eta(self) -> None:
+        eta_seconds = self.throughput.eta_seconds
+        self.general_progress.update(
+            self.all_videos_task,
+            eta=human_readable_duration(eta_seconds)
+            if eta_seconds is not None
+            else '-:--:--',
+        )
+
+    def _reserve_disk_space(
+        self,
+        video: VideoFile,
+        properties: VideoProperties,
+        prediction: TrialPrediction | None,
+        on_wait: Callable[[], None],
+    ) -> contextlib.AbstractAsyncContextManager[None]:
+        """
+        Wait until the estimated output fits into the free disk space and reserve it.
+
+        Without the trial prediction the output is expected to be encoded at the
+        bitrate of the HandbrakeCLI options or, if it's not set, to be as large as
+        the original (or as large as the early abort allows).
+        """
+        if self.disk_space is None:
+            return contextlib.nullcontext()
+
+        target_bitrate = None
+        if prediction is not None:
+            ratio = prediction.predicted_ratio
+        else:
+            target_bitrate = target_bitrate_kbits(
+                split(self.compressor.handbrakecli_options),
+            )
+            ratio = (
+                1 + self.compressor.early_abort.margin_percent / 100
+                if self.compressor.early_abort is not None
+                else 1.0
+            )
+
+        return self.disk_space.reserve(
+            self._in_progress_path(video.path),
+            estimate_output_size(video.size_bytes, properties, ratio, target_bitrate),
+            on_wait=on_wait,
+        )
+
+    def _in_progress_path(self, video: Path) -> Path:
+        """filename.ext -> filename.compressing.ext"""
+        return (
+            video.parent / f'{video.stem}.{self.options.progress_ext}{video.suffix}'
+        ).absolute()
+
+    async def _skip_video(
+        self,
+        video: VideoFile,
+        state: JobState,
+        reason: str,
+    ) -> None:
+        """Skip the video without compression, recording the reason to the ledger."""
+        self._emit(
+            JobEvent.failed if state == JobState.failed else JobEvent.skipped,
+            video.path,
+            reason=reason,
+        )
+        await asyncio.to_thread(self._record_job, video, state)
+        self.statistics.skip_file(video.path, file_size=video.size_bytes)
+        self.general_progress.update(self.all_videos_task, advance=1)
+
+    def _skip_for_disk_space(self, video: VideoFile) -> None:
+        """
+        Skip the video which doesn't fit into the free disk space.
+
+        It isn't recorded to the ledger, so it's compressed in the next runs
+        once there is enough space.
+        """
+        self._emit(JobEvent.skipped, video.path, reason='disk_space')
+        self.statistics.skip_file(video.path, file_size=video.size_bytes)
+        self.general_progress.update(self.all_videos_task, advance=1)
 
     def handle_effective_compression(self, video: Path) -> None:
         if (
@@ -208,12 +618,17 @@ class CompressionManager:
         ):
             pass
 
-    def handle_ineffective_compression(self, output_video: Path, video: Path) -> None:
+    def handle_ineffective_compression(
+        self,
+        output_video: Path,
+        video_file: VideoFile,
+    ) -> None:
+        video = video_file.path
         if (
             self.options.ineffective_compression_behavior
             == IneffectiveCompressionBehavior.mark_original
         ):
-            self.statistics.skip_file(video)
+            self.statistics.skip_file(video, file_size=video_file.size_bytes)
             output_video.unlink()
             video.rename(output_video)
             log.info(
@@ -224,7 +639,7 @@ class CompressionManager:
             == IneffectiveCompressionBehavior.delete_compressed
         ):
             output_video.unlink()
-            self.statistics.skip_file(video)
+            self.statistics.skip_file(video, file_size=video_file.size_bytes)
             log.info(
                 f'Skipping ineffective compression: {output_video.name}.',
             )
@@ -234,41 +649,143 @@ class CompressionManager:
         ):
             pass
 
-    def compress_video(
+    def handle_aborted_compression(self, video_file: VideoFile) -> None:
+        """
+        Apply the ineffective compression behavior to an early aborted compression.
+
+        The partial output is already deleted, so there is nothing to keep for keep_both.
+        """
+        video = video_file.path
+        self._emit(JobEvent.skipped, video, reason='ineffective')
+        self._record_job(video_file, JobState.ineffective)
+        self.statistics.skip_file(video, file_size=video_file.size_bytes)
+
+        if (
+            self.options.ineffective_compression_behavior
+            == IneffectiveCompressionBehavior.mark_original
+        ):
+            # filename.ext -> filename.compressed.ext
+            video.rename(
+                video.parent
+                / f'{video.stem}.{self.options.complete_ext}{video.suffix}',
+            )
+            log.info(f'Marking the {video.name} as compressed.')
+
+    async def compress_video(
         self,
-        video: Path,
+        video_file: VideoFile,
         on_progress_update: Callable[[HandbrakeProgressInfo], None] | None = None,
-    ) -> None:
-        """Compresses a single video file using handbrakecli."""
-        # filename.ext -> filename.compressing.ext
-        output_video = (
-            video.parent / f'{video.stem}.{self.options.progress_ext}{video.suffix}'
-        ).absolute()
-
+        predicted_ratio: float | None = None,
+        media_seconds: float | None = None,
+    ) -> bool:
+        """
+        Compresses a single video file using handbrakecli.
+
+        `predicted_ratio` of the trial encoding is saved to the statistics
+        next to the actual one, as well as the encode speed of the video
+        of `media_seconds` duration.
+
+        Returns True if the video was compressed (False if it was skipped).
+        """
+        video = video_file.path
+        output_video = self._in_progress_path(video)
+
+        await asyncio.to_thread(self._record_job, video_file, JobState.pending)
+
+        # The average FPS of the latest progress update is the average of the encode
+        fps_average = None
+
+        def track_fps(info: HandbrakeProgressInfo) -> None:
+            nonlocal fps_average
+            if info.fps_average is not None:
+                fps_average = info.fps_average
+            if on_progress_update is not None:
+                on_progress_update(info)
+
+        started = time.monotonic()
         try:
-            asyncio.run(
-                self.compressor.compress(
-                    video,
-                    output_video,
-                    on_update=on_progress_update or (lambda _: None),
-                ),
+            await self.compressor.compress(
+                video,
+                output_video,
+                on_update=track_fps,
+                input_size_bytes=video_file.size_bytes,
             )
-        except (CompressionFailedError, CompressionCancelledByUserError) as e:
+        except CompressionIneffectiveError as e:
+            log.info(str(e))
+            await asyncio.to_thread(self.handle_aborted_compression, video_file)
+            return False
+        except (
+            CompressionFailedError,
+            CompressionCancelledByUserError,
+            asyncio.CancelledError,
+        ) as e:
             # If the compression failed during encoding - remove the output video
             # because it's useless
             if output_video.exists():
                 output_video.unlink()
 
+            self._emit(
+                JobEvent.failed,
+                video,
+                reason='handbrakecli'
+                if isinstance(e, CompressionFailedError)
+                else 'cancelled',
+            )
+
             if isinstance(e, CompressionFailedError) and self.options.skip_failed_files:
                 log.error(str(e))
                 log.warning(
                     'Skipping the video according to the [bold]--skip-failed-files[/bold] flag',
                 )
-                self.statistics.skip_file(video)
-                return
+                await asyncio.to_thread(
+                    self._record_job,
+                    video_file,
+                    JobState.failed,
+                )
+                self.statistics.skip_file(video, file_size=video_file.size_bytes)
+                return False
 
             raise
 
+        encode_speed = EncodeSpeedStatistics(
+            encode_seconds=time.monotonic() - started,
+            media_seconds=media_seconds,
+            fps_average=fps_average,
+        )
+
+        # The video is already compressed, so even if the batch is cancelled
+        # right now, let the output be marked as completed before stopping
+        finalization = asyncio.ensure_future(
+            asyncio.to_thread(
+                self._finalize_compression,
+                video_file,
+                output_video,
+                predicted_ratio,
+                encode_speed,
+            ),
+        )
+        try:
+            await asyncio.shield(finalization)
+        except asyncio.CancelledError:
+            await finalization
+            raise
+
+        return True
+
+    def _finalize_compression(
+        self,
+        video_file: VideoFile,
+        output_video: Path,
+        predicted_ratio: float | None = None,
+        encode_speed: EncodeSpeedStatistics | None = None,
+    ) -> None:
+        """
+        Mark the output video as completed and apply the compression behaviors.
+
+        It only touches the file system, so it's run in a worker thread.
+        The original video isn't stat()ed, its size is known since the discovery.
+        """
+        video = video_file.path
         completed_stem = output_video.stem.replace(
             self.options.progress_ext,
             self.options.complete_ext,
@@ -277,18 +794,41 @@ class CompressionManager:
             video.parent / f'{completed_stem}{video.suffix}',
         )
 
+        input_size = video_file.size_bytes
+        output_size = output_video.stat().st_size
+
+        # Statistics are collected anyway (to be checkpointed or exported)
+        current_video_stats = self.statistics.add_compression_info(
+            video,
+            output_video,
+            predicted_ratio=predicted_ratio,
+            encode_speed=encode_speed,
+            input_size=input_size,
+            output_size=output_size,
+        )
         if self.options.show_stats:
-            current_video_stats = self.statistics.add_compression_info(
-                video,
-                output_video,
-            )
             self.statistics_logger.log_stats(current_video_stats)
 
         # Now compressed video is marked as completed and we still have the original one
 
-        compression_is_ineffective = output_video.stat().st_size > video.stat().st_size
+        compression_is_ineffective = output_size > input_size
+
+        self._emit(
+            JobEvent.finished,
+            video,
+            input_size_bytes=input_size,
+            output_size_bytes=output_size,
+            effective=not compression_is_ineffective,
+            **(encode_speed.model_dump() if encode_speed is not None else {}),
+        )
+
+        # The outcome is recorded while the original video is still in place
+        self._record_job(
+            video_file,
+            JobState.ineffective if compression_is_ineffective else JobState.done,
+        )
 
         if compression_is_ineffective:
-            self.handle_ineffective_compression(output_video, video)
+            self.handle_ineffective_compression(output_video, video_file)
         else:
             self.handle_effective_compression(video)
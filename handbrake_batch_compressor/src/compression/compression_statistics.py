@@ -4,10 +4,49 @@ The module provides class for tracking statistics about the compression process.
 As such as the number of files processed, their size, how many was skipped, etc.
 """
 
+from __future__ import annotations
+
+import csv
+import math
+import threading
+from array import array
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from pydantic import BaseModel
 
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from typing import TextIO
+
+# Rows of the per-file statistics are checkpointed once this many of them are collected
+DEFAULT_CHECKPOINT_EVERY = 100
+
+# Columns of the per-file statistics (in the exported files)
+STATISTICS_COLUMNS = (
+    'path',
+    'initial_size_bytes',
+    'final_size_bytes',
+    'predicted_ratio',
+    'encode_seconds',
+    'media_seconds',
+    'fps_average',
+)
+_INT_COLUMNS = ('initial_size_bytes', 'final_size_bytes')
+# Optional float columns, None is stored as NaN
+_FLOAT_COLUMNS = ('predicted_ratio', 'encode_seconds', 'media_seconds', 'fps_average')
+
+STATISTICS_EXPORT_FORMATS = ('.csv', '.npz')
+
+
+class UnsupportedExportFormatError(ValueError):
+    """Exception raised for an unknown format of the statistics export."""
+
+    def __init__(self, path: Path) -> None:
+        super().__init__(
+            f'Unsupported statistics export format: {path.name} (use .csv or .npz)',
+        )
+
 
 class SizeDifferenceStatistics(BaseModel):
     """
@@ -68,7 +107,28 @@ class SizeDifferenceStatistics(BaseModel):
         return self.final_size_bytes - self.initial_size_bytes
 
 
-class FileStatistics(SizeDifferenceStatistics):
+class EncodeSpeedStatistics(BaseModel):
+    """
+    Represents how fast the video was encoded.
+
+    encode_seconds - Wall time of the encoding.
+    media_seconds - Duration of the encoded video.
+    fps_average - Average FPS reported by HandbrakeCLI.
+    """
+
+    encode_seconds: float | None = None
+    media_seconds: float | None = None
+    fps_average: float | None = None
+
+    @property
+    def encode_speed(self) -> float | None:
+        """Media seconds encoded per wall second (e.g. 2.0 is twice as fast as realtime)."""
+        if not self.encode_seconds or self.media_seconds is None:
+            return None
+        return self.media_seconds / self.encode_seconds
+
+
+class FileStatistics(SizeDifferenceStatistics, EncodeSpeedStatistics):
     """
     Represents statistics about a single file successfull compression.
 
@@ -77,60 +137,311 @@ class FileStatistics(SizeDifferenceStatistics):
 
     path: Path
 
+    # Output/input size ratio predicted by the trial encoding (if it was used)
+    predicted_ratio: float | None = None
+
+    @property
+    def actual_ratio(self) -> float:
+        """Output/input size ratio of the compression."""
+        return self.final_size_bytes / max(self.initial_size_bytes, 1)
+
     def __hash__(self) -> int:
         """Use path as the hash for set/hash based operations."""
         return hash(self.path)
 
 
-class GeneralStatistics(SizeDifferenceStatistics):
-    """Represents statistics about the complete compression process."""
+class GeneralStatistics(SizeDifferenceStatistics, EncodeSpeedStatistics):
+    """
+    Represents statistics about the complete compression process.
+
+    Encode time and media duration are summed over the compressed files,
+    so the encode speed is the average speed of a single job.
+    The average FPS is weighted by the encode time of the files.
+    """
 
     files_processed: int
     files_skipped: int
 
 
+class FileStatisticsStore:
+    """
+    Keeps the statistics of the compressed files in typed arrays (one per column).
+
+    A run may compress hundreds of thousands of files, so instead of keeping
+    a pydantic object per file, sizes and timings are kept in arrays and
+    directories of the paths are stored once. Rows are appended to the
+    checkpoint CSV file along the way, so they survive a crash of a long run.
+
+    It isn't thread-safe, CompressionStatistics serializes the access.
+
+    Usage example:
+        store = FileStatisticsStore(checkpoint_path=Path('stats.csv'))
+        store.append(file_statistics)
+        store.column('final_size_bytes')  # array('q', [...])
+        store.export(Path('stats.npz'))
+        store.close()
+    """
+
+    def __init__(
+        self,
+        checkpoint_path: Path | None = None,
+        checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+    ) -> None:
+        """Rows are appended to `checkpoint_path` every `checkpoint_every` rows and on close."""
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = max(1, checkpoint_every)
+
+        self._directories: dict[str, int] = {}
+        self._directory_paths: list[str] = []
+        self._directory_index = array('I')
+        self._names: list[str] = []
+        self._int_columns: dict[str, array[int]] = {
+            name: array('q') for name in _INT_COLUMNS
+        }
+        self._float_columns: dict[str, array[float]] = {
+            name: array('d') for name in _FLOAT_COLUMNS
+        }
+        self._checkpointed = 0
+
+    def __len__(self) -> int:
+        """Count of the files."""
+        return len(self._names)
+
+    def __iter__(self) -> Iterator[FileStatistics]:
+        """Iterate over the rows as FileStatistics (created on the fly)."""
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def append(self, file_stat: FileStatistics) -> None:
+        """Add the statistics of a file (and checkpoint the new rows if it's time to)."""
+        directory = str(file_stat.path.parent)
+        if directory not in self._directories:
+            self._directories[directory] = len(self._directory_paths)
+            self._directory_paths.append(directory)
+        self._directory_index.append(self._directories[directory])
+        self._names.append(file_stat.path.name)
+
+        for name, int_column in self._int_columns.items():
+            int_column.append(getattr(file_stat, name))
+        for name, float_column in self._float_columns.items():
+            value: float | None = getattr(file_stat, name)
+            float_column.append(math.nan if value is None else value)
+
+        if len(self) - self._checkpointed >= self.checkpoint_every:
+            self.checkpoint()
+
+    def column(self, name: str) -> array[int] | array[float]:
+        """Return the column of sizes or of optional floats (None is NaN)."""
+        if name in self._int_columns:
+            return self._int_columns[name]
+        return self._float_columns[name]
+
+    def path(self, index: int) -> Path:
+        return Path(
+            self._directory_paths[self._directory_index[index]],
+            self._names[index],
+        )
+
+    def row(self, index: int) -> FileStatistics:
+        ints = self._int_columns
+        floats = {
+            name: None if math.isnan(column[index]) else column[index]
+            for name, column in self._float_columns.items()
+        }
+        # The values are already validated once they were added
+        return FileStatistics.model_construct(
+            path=self.path(index),
+            initial_size_bytes=ints['initial_size_bytes'][index],
+            final_size_bytes=ints['final_size_bytes'][index],
+            predicted_ratio=floats['predicted_ratio'],
+            encode_seconds=floats['encode_seconds'],
+            media_seconds=floats['media_seconds'],
+            fps_average=floats['fps_average'],
+        )
+
+    def checkpoint(self) -> None:
+        """Append the rows collected since the last checkpoint to the checkpoint file."""
+        if self.checkpoint_path is None or self._checkpointed == len(self):
+            return
+
+        is_new = (
+            not self.checkpoint_path.exists()
+            or self.checkpoint_path.stat().st_size == 0
+        )
+        with self.checkpoint_path.open('a', encoding='utf-8', newline='') as f:
+            self._write_csv(f, range(self._checkpointed, len(self)), header=is_new)
+        self._checkpointed = len(self)
+
+    def export(self, path: Path) -> None:
+        """Export all the rows to a CSV or NPZ (numpy arrays by column) file by its suffix."""
+        suffix = path.suffix.lower()
+        if suffix == '.csv':
+            with path.open('w', encoding='utf-8', newline='') as f:
+                self._write_csv(f, range(len(self)), header=True)
+        elif suffix == '.npz':
+            self._export_npz(path)
+        else:
+            raise UnsupportedExportFormatError(path)
+
+    def close(self) -> None:
+        """Checkpoint the remaining rows."""
+        self.checkpoint()
+
+    def _write_csv(self, f: TextIO, rows: range, *, header: bool) -> None:
+        writer = csv.writer(f)
+        if header:
+            writer.writerow(STATISTICS_COLUMNS)
+
+        for i in rows:
+            floats = (column[i] for column in self._float_columns.values())
+            writer.writerow(
+                [
+                    self.path(i),
+                    *(column[i] for column in self._int_columns.values()),
+                    *('' if math.isnan(value) else value for value in floats),
+                ],
+            )
+
+    def _export_npz(self, path: Path) -> None:
+        # numpy is only needed for the export
+        import numpy as np
+
+        ints = self._int_columns
+        floats = self._float_columns
+        # The stubs of numpy leave a part of the signature unknown
+        np.savez_compressed(  # pyright: ignore[reportUnknownMemberType]
+            path,
+            path=np.array([str(self.path(i)) for i in range(len(self))], dtype=str),
+            initial_size_bytes=np.array(ints['initial_size_bytes'], dtype=np.int64),
+            final_size_bytes=np.array(ints['final_size_bytes'], dtype=np.int64),
+            predicted_ratio=np.array(floats['predicted_ratio'], dtype=np.float64),
+            encode_seconds=np.array(floats['encode_seconds'], dtype=np.float64),
+            media_seconds=np.array(floats['media_seconds'], dtype=np.float64),
+            fps_average=np.array(floats['fps_average'], dtype=np.float64),
+        )
+
+
 class CompressionStatistics:
     """The class watches the compression process and tracks statistics about it."""
 
-    def __init__(self) -> None:
+    def __init__(self, checkpoint_path: Path | None = None) -> None:
+        """Per-file statistics are checkpointed to the `checkpoint_path` CSV file (if given)."""
         self._general_stats = GeneralStatistics(
             files_processed=0,
             files_skipped=0,
             final_size_bytes=0,
             initial_size_bytes=0,
         )
-        self.files_statistics: set[FileStatistics] = set()
+        self.files_statistics = FileStatisticsStore(checkpoint_path)
+
+        # Frames and encode time of the files with known FPS (for the weighted average)
+        self._encoded_frames = 0.0
+        self._fps_encode_seconds = 0.0
 
-    def add_compression_info(
+        # Statistics are updated from several compression jobs at the same time
+        self._lock = threading.Lock()
+
+    def add_compression_info(  # noqa: PLR0913 - details of the compression
         self,
         input_file: Path,
         output_file: Path,
+        predicted_ratio: float | None = None,
+        encode_speed: EncodeSpeedStatistics | None = None,
+        *,
+        input_size: int | None = None,
+        output_size: int | None = None,
     ) -> FileStatistics:
-        """Add a new compression info based on the given input and output files."""
-        input_size = input_file.stat().st_size
-        output_size = output_file.stat().st_size
+        """
+        Add a new compression info based on the given input and output files.
 
-        self._general_stats.files_processed += 1
-        self._general_stats.final_size_bytes += output_size
-        self._general_stats.initial_size_bytes += input_size
+        `predicted_ratio` is the output/input ratio predicted before the compression.
+        `encode_speed` describes how fast the file was encoded.
+        The sizes are read from the files unless they are already known.
+        """
+        if input_size is None:
+            input_size = input_file.stat().st_size
+        if output_size is None:
+            output_size = output_file.stat().st_size
 
         file_stat = FileStatistics(
             path=input_file,
             initial_size_bytes=input_size,
             final_size_bytes=output_size,
+            predicted_ratio=predicted_ratio,
+            **(encode_speed.model_dump() if encode_speed is not None else {}),
         )
 
-        self.files_statistics.add(file_stat)
+        with self._lock:
+            self._general_stats.files_processed += 1
+            self._general_stats.final_size_bytes += output_size
+            self._general_stats.initial_size_bytes += input_size
+
+            self._add_encode_speed(file_stat)
+
+            self.files_statistics.append(file_stat)
 
         return file_stat
 
-    def skip_file(self, input_file: Path) -> None:
-        """Skips a file and updates the general statistics."""
-        self._general_stats.files_skipped += 1
-        self._general_stats.initial_size_bytes += input_file.stat().st_size
-        self._general_stats.final_size_bytes += input_file.stat().st_size
+    def _add_encode_speed(self, file_stat: FileStatistics) -> None:
+        """Add the encode speed of the file to the general statistics (under the lock)."""
+        general = self._general_stats
+        encode_seconds = file_stat.encode_seconds
+
+        # Only the files with both values known are counted in the speed
+        if encode_seconds is not None and file_stat.media_seconds is not None:
+            general.encode_seconds = (general.encode_seconds or 0.0) + encode_seconds
+            general.media_seconds = (
+                general.media_seconds or 0.0
+            ) + file_stat.media_seconds
+
+        if encode_seconds and file_stat.fps_average is not None:
+            self._encoded_frames += file_stat.fps_average * encode_seconds
+            self._fps_encode_seconds += encode_seconds
+            general.fps_average = self._encoded_frames / self._fps_encode_seconds
+
+    def skip_file(self, input_file: Path, file_size: int | None = None) -> None:
+        """Skips a file and updates the general statistics (the size is read unless it's known)."""
+        if file_size is None:
+            file_size = input_file.stat().st_size
+
+        with self._lock:
+            self._general_stats.files_skipped += 1
+            self._general_stats.initial_size_bytes += file_size
+            self._general_stats.final_size_bytes += file_size
+
+    @property
+    def prediction_error_percent(self) -> float | None:
+        """
+        Mean absolute error of the predicted output/input ratios (in percentage points).
+
+        None if there are no predictions.
+        """
+        with self._lock:
+            columns = zip(
+                self.files_statistics.column('predicted_ratio'),
+                self.files_statistics.column('initial_size_bytes'),
+                self.files_statistics.column('final_size_bytes'),
+                strict=True,
+            )
+            errors = [
+                abs(predicted_ratio - final_size / max(initial_size, 1)) * 100
+                for predicted_ratio, initial_size, final_size in columns
+                if not math.isnan(predicted_ratio)
+            ]
+
+        return sum(errors) / len(errors) if errors else None
 
     @property
     def overall_stats(self) -> GeneralStatistics:
         """Returns statistics about the complete compression process."""
         return self._general_stats
+
+    def export(self, path: Path) -> None:
+        """Export the per-file statistics to a CSV or NPZ file (by its suffix)."""
+        with self._lock:
+            self.files_statistics.export(path)
+
+    def close(self) -> None:
+        """Checkpoint the per-file statistics collected since the last checkpoint."""
+        with self._lock:
+            self.files_statistics.close()
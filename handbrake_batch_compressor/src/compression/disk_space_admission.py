@@ -0,0 +1,201 @@
+"""
+The module provides an admission control of the compressions by free disk space.
+
+Outputs are written next to the original videos, so several parallel jobs
+(especially with `keep_both`) may fill the volume in the middle of the encodes.
+A job is started only if its estimated output fits into the free space left
+by the other running jobs, otherwise the job waits until the space is freed.
+A job which doesn't fit even if no other job is running is refused.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import itertools
+import os
+import shutil
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+
+from handbrake_batch_compressor.src.utils.files import human_readable_size
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Callable
+    from pathlib import Path
+
+    from handbrake_batch_compressor.src.utils.ffmpeg_helpers import VideoProperties
+
+
+class InsufficientDiskSpaceError(Exception):
+    """Exception raised when the output can't fit into the free space even without other jobs."""
+
+    def __init__(self, output_video: Path, size: int, min_free_bytes: int) -> None:
+        super().__init__(
+            f'The estimated output of {output_video.name} ({human_readable_size(size)}) does not fit into the free disk space keeping {human_readable_size(min_free_bytes)} free',
+        )
+
+
+def estimate_output_size(
+    video_size: int,
+    properties: VideoProperties | None,
+    ratio: float = 1.0,
+    target_bitrate_kbits: int | None = None,
+) -> int:
+    """
+    Estimate the size of the compressed video.
+
+    If the encode options set the bitrate, it's `target_bitrate_kbits` * duration.
+    Otherwise the size of the video stream is taken from bitrate * duration (or the
+    file size if they are unknown) and multiplied by the expected output/input `ratio`.
+    """
+    if (
+        target_bitrate_kbits is not None
+        and properties is not None
+        and properties.duration_seconds is not None
+    ):
+        return int(target_bitrate_kbits * 1000 / 8 * properties.duration_seconds)
+
+    source_size = video_size
+    if properties is not None and properties.duration_seconds is not None:
+        # bitrate_kbytes is in kilobits per second
+        source_size = min(
+            video_size,
+            int(properties.bitrate_kbytes * 1024 / 8 * properties.duration_seconds),
+        )
+
+    return int(max(source_size, 0) * ratio)
+
+
+class DiskSpaceAdmission:
+    """
+    Reserves disk space for the compression jobs.
+
+    Every running job reserves its estimated output size on the filesystem
+    of its output. The space already written by the job is counted as used
+    by the filesystem itself, so only the rest of the estimate stays reserved.
+    A new job is admitted if after all the reservations at least
+    `min_free_bytes` stays free.
+
+    Jobs are admitted one by one in the order they come (per filesystem),
+    so a waiting large job isn't overtaken by the smaller ones. A job which
+    doesn't fit even without the reservations doesn't hold up the others:
+    it waits aside while other jobs run (they may free the space,
+    e.g. by deleting their originals) and is refused once none are left.
+
+    Usage example:
+        admission = DiskSpaceAdmission(min_free_bytes=10 * 1024**3)
+        async with admission.reserve(output_video, estimated_size):
+            await compressor.compress(video, output_video)
+    """
+
+    def __init__(
+        self,
+        min_free_bytes: int = 0,
+        poll_interval_seconds: float = 5.0,
+    ) -> None:
+        self.min_free_bytes = min_free_bytes
+        self.poll_interval_seconds = poll_interval_seconds
+
+        # Running jobs by the filesystem (st_dev): output path -> estimated size
+        self._reservations: dict[int, dict[Path, int]] = {}
+        # Turns of the waiting jobs which fit without the reservations (by the filesystem)
+        self._turns: dict[int, set[int]] = {}
+        self._next_turn = itertools.count()
+        # Replaced on every change, so no waiter misses it
+        self._changed = asyncio.Event()
+
+    @asynccontextmanager
+    async def reserve(
+        self,
+        output_video: Path,
+        size: int,
+        on_wait: Callable[[], None] | None = None,
+    ) -> AsyncGenerator[None, None]:
+        """
+        Wait until the output fits into the free space and keep it reserved.
+
+        `on_wait` is called once if the job has to wait.
+        """
+        directory = output_video.parent
+        device = (await asyncio.to_thread(os.stat, directory)).st_dev
+        reservations = self._reservations.setdefault(device, {})
+        turns = self._turns.setdefault(device, set())
+        turn = next(self._next_turn)
+
+        try:
+            waiting = False
+            while True:
+                changed = self._changed
+                fits, fits_alone = await asyncio.to_thread(
+                    self._fits,
+                    directory,
+                    size,
+                    list(reservations.items()),
+                )
+                if changed is not self._changed:
+                    # Another job is admitted or released during the check
+                    continue
+
+                if fits_alone:
+                    turns.add(turn)
+                    if fits and turn == min(turns):
+                        break
+                else:
+                    turns.discard(turn)
+                    if not reservations:
+                        raise InsufficientDiskSpaceError(
+                            output_video,
+                            size,
+                            self.min_free_bytes,
+                        )
+
+                if not waiting and on_wait is not None:
+                    on_wait()
+                waiting = True
+
+                # The space is freed by the other jobs or by the user
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        changed.wait(),
+                        timeout=self.poll_interval_seconds,
+                    )
+        finally:
+            turns.discard(turn)
+            self._notify_changed()
+
+        reservations[output_video] = size
+        try:
+            yield
+        finally:
+            del reservations[output_video]
+            self._notify_changed()
+
+    def _notify_changed(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _fits(
+        self,
+        directory: Path,
+        size: int,
+        reservations: list[tuple[Path, int]],
+    ) -> tuple[bool, bool]:
+        """
+        Check if the output fits into the free space and if it fits without the reservations.
+
+        It touches the file system.
+        """
+        reserved = 0
+        for output_video, estimated_size in reservations:
+            try:
+                written = output_video.stat().st_size
+            except OSError:
+                written = 0
+            reserved += max(estimated_size - written, 0)
+
+        free = shutil.disk_usage(directory).free
+        return (
+            free - reserved - size >= self.min_free_bytes,
+            free - size >= self.min_free_bytes,
+        )
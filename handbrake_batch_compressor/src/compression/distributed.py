@@ -0,0 +1,604 @@
+"""
+The module provides the coordinator/worker mode to compress videos on several machines.
+
+The coordinator runs the usual batch (discovery, probing, scheduling, finalization
+and statistics), but instead of running HandbrakeCLI itself it hands out the
+compressions to the connected workers. The workers run HandbrakeCLI on their
+machines and report the progress and the outcome back, so the coordinator shows
+all the running compressions in its live view.
+
+The library must be shared between the machines (e.g. a NAS), every worker has
+its own mount of it, so the paths are sent relative to the target path.
+
+Protocol: JSON messages, one per line, over TCP.
+    worker -> coordinator: hello (name, slots), heartbeat, progress, result
+    coordinator -> worker: settings (HandbrakeCLI options), heartbeat, job, cancel, shutdown
+
+A worker which disconnects or stops sending heartbeats is considered lost,
+its jobs are requeued to the other workers. In turn a worker cancels its
+compressions (and deletes their outputs) once the coordinator is silent for
+as long, since by then they are requeued. The protocol isn't authenticated,
+so the coordinator must listen only on a trusted network.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import datetime
+import functools
+import itertools
+import json
+import socket
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, cast
+
+from pydantic import BaseModel
+
+from handbrake_batch_compressor.src.cli.handbrake_cli_output_capturer import (
+    HandbrakeProgressInfo,
+    ProgressDispatcher,
+)
+from handbrake_batch_compressor.src.cli.logger import log
+from handbrake_batch_compressor.src.compression.handbrake_compressor import (
+    EarlyAbortOptions,  # noqa: TC001 - is used by pydantic
+)
+from handbrake_batch_compressor.src.errors.cancel_compression_by_user import (
+    CompressionCancelledByUserError,
+)
+from handbrake_batch_compressor.src.errors.handbrake_cli_exceptions import (
+    CompressionFailedError,
+    CompressionIneffectiveError,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+    from handbrake_batch_compressor.src.cli.option_types import Address
+    from handbrake_batch_compressor.src.compression.handbrake_compressor import (
+        HandbrakeCompressor,
+    )
+
+PROTOCOL_VERSION = 1
+HEARTBEAT_SECONDS = 5.0
+# A worker (or the coordinator) is lost if nothing is received from it for this long
+WORKER_TIMEOUT_SECONDS = 30.0
+CONNECT_RETRY_SECONDS = 5.0
+# Progress of every job is sent at most this often
+PROGRESS_UPDATES_PER_SECOND = 4
+
+
+class EncodeSettings(BaseModel):
+    """Settings of the encodes, the coordinator sends them to the workers, so every worker encodes the same way."""
+
+    handbrakecli_options: str = ''
+    early_abort: EarlyAbortOptions | None = None
+
+
+class WorkerLostError(Exception):
+    """Exception raised when a worker disconnects or stops sending heartbeats."""
+
+    def __init__(self, worker: str) -> None:
+        super().__init__(f'Worker {worker} is lost.')
+
+
+def _encode(message: dict[str, object]) -> bytes:
+    return json.dumps(message).encode('utf-8') + b'\n'
+
+
+async def _read_message(reader: asyncio.StreamReader) -> dict[str, object] | None:
+    """Read the next message or return None if the connection is closed."""
+    line = await reader.readline()
+    if not line:
+        return None
+    message: object = json.loads(line)
+    if not isinstance(message, dict):
+        msg = f'Invalid message: {line!r}'
+        raise TypeError(msg)
+    return cast('dict[str, object]', message)
+
+
+async def _send_heartbeats(
+    writer: asyncio.StreamWriter,
+    interval_seconds: float,
+) -> None:
+    while not writer.is_closing():
+        writer.write(_encode({'type': 'heartbeat'}))
+        await writer.drain()
+        await asyncio.sleep(interval_seconds)
+
+
+def _progress_message(job_id: object, info: HandbrakeProgressInfo) -> dict[str, object]:
+    return {
+        'type': 'progress',
+        'id': job_id,
+        'progress': info.progress,
+        'fps_current': info.fps_current,
+        'fps_average': info.fps_average,
+        'eta_seconds': info.eta.total_seconds() if info.eta is not None else None,
+    }
+
+
+def _progress_info(message: dict[str, object]) -> HandbrakeProgressInfo:
+    eta_seconds = message.get('eta_seconds')
+    return HandbrakeProgressInfo(
+        progress=_optional_float(message.get('progress')),
+        fps_current=_optional_float(message.get('fps_current')),
+        fps_average=_optional_float(message.get('fps_average')),
+        eta=datetime.timedelta(seconds=eta_seconds)
+        if isinstance(eta_seconds, int | float)
+        else None,
+    )
+
+
+def _optional_float(value: object) -> float | None:
+    return float(value) if isinstance(value, int | float) else None
+
+
+def _optional_int(value: object) -> int | None:
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+class _WorkerConnection:
+    """A connected worker with its running jobs (on the coordinator side)."""
+
+    def __init__(self, name: str, slots: int, writer: asyncio.StreamWriter) -> None:
+        self.name = name
+        self.slots = slots
+        self.writer = writer
+        self.connected = True
+
+        # Running jobs: id -> (result, progress callback)
+        self._jobs: dict[
+            int,
+            tuple[
+                asyncio.Future[dict[str, object]],
+                Callable[[HandbrakeProgressInfo], None],
+            ],
+        ] = {}
+
+    def send(self, message: dict[str, object]) -> None:
+        if self.connected and not self.writer.is_closing():
+            self.writer.write(_encode(message))
+
+    async def run(
+        self,
+        job_id: int,
+        job: dict[str, object],
+        on_update: Callable[[HandbrakeProgressInfo], None],
+    ) -> dict[str, object]:
+        """Send the job to the worker and wait for its result message."""
+        if not self.connected:
+            raise WorkerLostError(self.name)
+
+        result: asyncio.Future[dict[str, object]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._jobs[job_id] = (result, on_update)
+        self.send(job)
+        try:
+            return await asyncio.shield(result)
+        except asyncio.CancelledError:
+            # The job keeps running until the worker acknowledges the cancel (or is lost),
+            # nobody awaits its result anymore, so it's retrieved here
+            self._jobs[job_id] = (result, lambda _: None)
+            result.add_done_callback(lambda done: done.exception())
+            self.send({'type': 'cancel', 'id': job_id})
+            raise
+
+    def when_finished(self, job_id: int, callback: Callable[[], None]) -> None:
+        """Call back once the worker has finished the job (or is lost)."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            callback()
+        else:
+            job[0].add_done_callback(lambda _: callback())
+
+    def handle(self, message: dict[str, object]) -> None:
+        job_id = _optional_int(message.get('id'))
+        job = self._jobs.get(job_id) if job_id is not None else None
+        if job_id is None or job is None:
+            return
+
+        result, on_update = job
+        if message.get('type') == 'progress':
+            on_update(_progress_info(message))
+        elif message.get('type') == 'result':
+            del self._jobs[job_id]
+            if not result.done():
+                result.set_result(message)
+
+    def disconnect(self) -> None:
+        """Fail the running jobs, so they are requeued."""
+        self.connected = False
+        jobs, self._jobs = self._jobs, {}
+        for result, _ in jobs.values():
+            if not result.done():
+                result.set_exception(WorkerLostError(self.name))
+
+
+class Coordinator:
+    """
+    Hands out the compressions to the connected workers.
+
+    It's used by the compression manager as its compressor: `compress` waits
+    for a free slot of any worker and runs the compression there. If the worker
+    is lost during the compression, the job is given to another worker.
+
+    Usage example:
+        coordinator = Coordinator(Address.parse_address('0.0.0.0:7420'), target_path)
+        manager = CompressionManager(videos, compressor=coordinator, ...)
+        await coordinator.start()
+        try:
+            await manager.compress_all_videos()
+        finally:
+            await coordinator.close()
+    """
+
+    def __init__(  # noqa: PLR0913 - settings of the coordinator
+        self,
+        address: Address,
+        root: Path,
+        handbrakecli_options: str = '',
+        early_abort: EarlyAbortOptions | None = None,
+        worker_timeout_seconds: float = WORKER_TIMEOUT_SECONDS,
+        heartbeat_seconds: float = HEARTBEAT_SECONDS,
+    ) -> None:
+        """Paths of the jobs are sent to the workers relative to the `root` (the target path)."""
+        self.address = address
+        self.root = root.absolute()
+        self.handbrakecli_options = handbrakecli_options
+        self.early_abort = early_abort
+        self.worker_timeout_seconds = worker_timeout_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+
+        self.workers: list[_WorkerConnection] = []
+        # One entry per free slot of a worker (entries of lost workers are skipped)
+        self._free_slots: asyncio.Queue[_WorkerConnection] = asyncio.Queue()
+        self._job_ids = itertools.count()
+        self._server: asyncio.Server | None = None
+        self._connections: set[asyncio.Task[None]] = set()
+        self._closing = False
+        self._waiting_for_workers_logged = False
+
+    @property
+    def port(self) -> int:
+        """The port the coordinator listens on (useful with port 0)."""
+        if self._server is None or not self._server.sockets:
+            return self.address.port
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            self._serve_worker,
+            self.address.host,
+            self.address.port,
+        )
+        log.info(f'Waiting for workers on {self.address.host}:{self.port}...')
+
+    async def close(self) -> None:
+        """Let the workers know the batch is finished and stop listening."""
+        self._closing = True
+        for worker in self.workers:
+            worker.send({'type': 'shutdown'})
+            worker.writer.close()
+        if self._server is not None:
+            self._server.close()
+
+        # Closed connections are finished right away, so the handlers aren't left pending
+        if self._connections:
+            await asyncio.wait(self._connections, timeout=self.worker_timeout_seconds)
+
+    async def compress(
+        self,
+        input_video: Path,
+        output_video: Path,
+        on_update: Callable[[HandbrakeProgressInfo], None] = lambda _: None,
+        extra_options: Sequence[str] = (),
+        input_size_bytes: int | None = None,
+    ) -> None:
+        """Compress the video on one of the workers (raises the same errors as HandbrakeCompressor)."""
+        if extra_options:
+            msg = 'Extra HandbrakeCLI options are not supported by the workers'
+            raise ValueError(msg)
+
+        job_id = next(self._job_ids)
+        job: dict[str, object] = {
+            'type': 'job',
+            'id': job_id,
+            'input': self._relative(input_video),
+            'output': self._relative(output_video),
+            'input_size_bytes': input_size_bytes,
+        }
+
+        while True:
+            worker = await self._take_slot()
+            try:
+                result = await worker.run(job_id, job, on_update)
+            except WorkerLostError:
+                log.warning(
+                    f'Worker {worker.name} is lost, requeueing {input_video.name}...',
+                )
+                continue
+            except asyncio.CancelledError as e:
+                raise CompressionCancelledByUserError from e
+            finally:
+                # A cancelled job holds the slot until the worker has stopped it
+                worker.when_finished(job_id, functools.partial(self._free_slot, worker))
+
+            outcome = result.get('outcome')
+            if outcome == 'done':
+                return
+            if outcome == 'ineffective':
+                raise CompressionIneffectiveError(
+                    input_video,
+                    _optional_int(result.get('projected_size_bytes')) or 0,
+                )
+            if outcome == 'failed':
+                if result.get('error'):
+                    log.error(f'Worker {worker.name}: {result["error"]}')
+                raise CompressionFailedError(
+                    input_video,
+                    Path(f'{worker.name}:errors.log'),
+                )
+
+            # The worker has been interrupted, so another one is going to do it
+            log.warning(
+                f'Worker {worker.name} cancelled {input_video.name}, requeueing it...',
+            )
+
+    def _relative(self, path: Path) -> str:
+        return path.absolute().relative_to(self.root).as_posix()
+
+    def _free_slot(self, worker: _WorkerConnection) -> None:
+        if worker.connected:
+            self._free_slots.put_nowait(worker)
+
+    async def _take_slot(self) -> _WorkerConnection:
+        if not self.workers and not self._waiting_for_workers_logged:
+            self._waiting_for_workers_logged = True
+            log.wait('No workers are connected, waiting for them...')
+
+        while True:
+            worker = await self._free_slots.get()
+            if worker.connected:
+                return worker
+
+    async def _serve_worker(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        connection = asyncio.current_task()
+        if connection is not None:
+            self._connections.add(connection)
+
+        worker: _WorkerConnection | None = None
+        heartbeat: asyncio.Task[None] | None = None
+        try:
+            hello = await asyncio.wait_for(
+                _read_message(reader),
+                self.worker_timeout_seconds,
+            )
+            if (
+                hello is None
+                or hello.get('type') != 'hello'
+                or hello.get('version') != PROTOCOL_VERSION
+            ):
+                log.error(f'Rejected an incompatible worker: {hello}')
+                return
+
+            worker = _WorkerConnection(
+                name=str(hello.get('name')),
+                slots=max(_optional_int(hello.get('slots')) or 1, 1),
+                writer=writer,
+            )
+            worker.send(
+                {
+                    'type': 'settings',
+                    **EncodeSettings(
+                        handbrakecli_options=self.handbrakecli_options,
+                        early_abort=self.early_abort,
+                    ).model_dump(),
+                },
+            )
+            heartbeat = asyncio.create_task(
+                _send_heartbeats(writer, self.heartbeat_seconds),
+            )
+            self.workers.append(worker)
+            self._waiting_for_workers_logged = False
+            for _ in range(worker.slots):
+                self._free_slots.put_nowait(worker)
+            log.info(f'Worker {worker.name} is connected ({worker.slots} jobs).')
+
+            while (
+                message := await asyncio.wait_for(
+                    _read_message(reader),
+                    self.worker_timeout_seconds,
+                )
+            ) is not None:
+                worker.handle(message)
+        except (asyncio.TimeoutError, ConnectionError, ValueError, TypeError):
+            pass
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            if worker is not None:
+                worker.disconnect()
+                self.workers.remove(worker)
+                if not self._closing:
+                    log.warning(f'Worker {worker.name} is disconnected.')
+            writer.close()
+            if connection is not None:
+                self._connections.discard(connection)
+
+
+class Worker:
+    """
+    Connects to the coordinator and compresses the videos it hands out.
+
+    The compressor is created by `compressor_factory` from the settings sent
+    by the coordinator, the rest of its settings (HandbrakeCLI command, priority)
+    are up to the worker's machine.
+
+    Usage example:
+        worker = Worker(address, Path('/mnt/videos'), make_compressor, slots=2)
+        await worker.run()  # until the coordinator finishes the batch
+    """
+
+    def __init__(  # noqa: PLR0913 - settings of the worker
+        self,
+        address: Address,
+        root: Path,
+        compressor_factory: Callable[[EncodeSettings], HandbrakeCompressor],
+        slots: int = 1,
+        name: str | None = None,
+        heartbeat_seconds: float = HEARTBEAT_SECONDS,
+        coordinator_timeout_seconds: float = WORKER_TIMEOUT_SECONDS,
+    ) -> None:
+        """Paths of the jobs are relative to the `root` (the worker's mount of the target path)."""
+        self.address = address
+        self.root = root.absolute()
+        self.compressor_factory = compressor_factory
+        self.slots = slots
+        self.name = name or socket.gethostname()
+        self.heartbeat_seconds = heartbeat_seconds
+        self.coordinator_timeout_seconds = coordinator_timeout_seconds
+
+        self.completed_count = 0
+
+    async def run(self) -> None:
+        """Compress the videos handed out by the coordinator until it finishes the batch."""
+        reader, writer = await self._connect()
+        writer.write(
+            _encode(
+                {
+                    'type': 'hello',
+                    'version': PROTOCOL_VERSION,
+                    'name': self.name,
+                    'slots': self.slots,
+                },
+            ),
+        )
+
+        heartbeat = asyncio.create_task(
+            _send_heartbeats(writer, self.heartbeat_seconds),
+        )
+        jobs: dict[object, asyncio.Task[None]] = {}
+        compressor: HandbrakeCompressor | None = None
+        try:
+            while (
+                message := await asyncio.wait_for(
+                    _read_message(reader),
+                    self.coordinator_timeout_seconds,
+                )
+            ) is not None:
+                message_type = message.get('type')
+                if message_type == 'settings':
+                    compressor = self.compressor_factory(
+                        EncodeSettings.model_validate(message),
+                    )
+                elif message_type == 'job' and compressor is not None:
+                    # Finished jobs are dropped, so they don't pile up in long runs
+                    jobs = {
+                        job_id: job for job_id, job in jobs.items() if not job.done()
+                    }
+                    jobs[message.get('id')] = asyncio.create_task(
+                        self._run_job(compressor, message, writer),
+                    )
+                elif message_type == 'cancel' and message.get('id') in jobs:
+                    jobs[message.get('id')].cancel()
+                elif message_type == 'shutdown':
+                    log.success('The coordinator has finished the batch.')
+                    break
+        except asyncio.TimeoutError:
+            # The coordinator has requeued the jobs by now
+            log.error(
+                f'The coordinator is silent for {self.coordinator_timeout_seconds:g}s, cancelling the compressions...',
+            )
+        except (ConnectionError, ValueError, TypeError) as e:
+            log.error(f'Lost the connection to the coordinator: {e}')
+        finally:
+            # Results of the cancelled jobs aren't sent to the lost coordinator
+            writer.close()
+            heartbeat.cancel()
+            for job in jobs.values():
+                job.cancel()
+            await asyncio.gather(heartbeat, *jobs.values(), return_exceptions=True)
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Connect to the coordinator, waiting for it to start if needed."""
+        while True:
+            with contextlib.suppress(OSError):
+                connection = await asyncio.open_connection(
+                    self.address.host,
+                    self.address.port,
+                )
+                log.success(f'Connected to the coordinator on {self.address}.')
+                return connection
+
+            log.wait(f'Waiting for the coordinator on {self.address}...')
+            await asyncio.sleep(CONNECT_RETRY_SECONDS)
+
+    def _resolve(self, relative_path: object) -> Path:
+        """Resolve the path of the job, refusing paths outside of the root."""
+        path = self.root.joinpath(*PurePosixPath(str(relative_path)).parts)
+        if not path.resolve().is_relative_to(self.root.resolve()):
+            msg = f'The path is outside of the target path: {relative_path}'
+            raise ValueError(msg)
+        return path
+
+    async def _run_job(
+        self,
+        compressor: HandbrakeCompressor,
+        job: dict[str, object],
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        job_id = job['id']
+
+        def send(message: dict[str, object]) -> None:
+            if not writer.is_closing():
+                writer.write(_encode(message))
+
+        progress_dispatcher = ProgressDispatcher(
+            lambda info: send(_progress_message(job_id, info)),
+            max_updates_per_second=PROGRESS_UPDATES_PER_SECOND,
+        )
+
+        result: dict[str, object] = {'type': 'result', 'id': job_id}
+        output_video: Path | None = None
+        try:
+            input_video = self._resolve(job['input'])
+            output_video = self._resolve(job['output'])
+            log.info(f'Compressing {input_video.name}...')
+            await compressor.compress(
+                input_video,
+                output_video,
+                on_update=progress_dispatcher,
+                input_size_bytes=_optional_int(job.get('input_size_bytes')),
+            )
+            progress_dispatcher.flush()
+            result['outcome'] = 'done'
+            self.completed_count += 1
+        except CompressionIneffectiveError as e:
+            result['outcome'] = 'ineffective'
+            result['projected_size_bytes'] = e.projected_size_bytes
+        except (CompressionFailedError, ValueError) as e:
+            log.error(str(e))
+            result['outcome'] = 'failed'
+        except (CompressionCancelledByUserError, asyncio.CancelledError):
+            # The output of an interrupted compression is useless
+            if output_video is not None:
+                output_video.unlink(missing_ok=True)
+            result['outcome'] = 'cancelled'
+        except Exception as e:  # noqa: BLE001 - e.g. HandbrakeCLI is missing, the coordinator must know anyway
+            log.error(f"Can't compress {job['input']}: {e}")
+            if output_video is not None:
+                output_video.unlink(missing_ok=True)
+            result['outcome'] = 'failed'
+            result['error'] = str(e)
+
+        if not writer.is_closing():
+            send(result)
+            with contextlib.suppress(ConnectionError):
+                await writer.drain()
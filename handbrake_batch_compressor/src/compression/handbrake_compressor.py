@@ -5,115 +5,336 @@ It will be used to compress the videos and to log the progress.
 """
 
 import asyncio
-from collections.abc import Callable
-from io import StringIO
+import codecs
+import os
+from collections.abc import Callable, Sequence
 from pathlib import Path
 from shlex import split
 
 import aiofiles
+from pydantic import BaseModel
 
 from handbrake_batch_compressor.src.cli.handbrake_cli_output_capturer import (
     HandbrakeProgressInfo,
     parse_handbrake_cli_output,
 )
+from handbrake_batch_compressor.src.cli.option_types import (
+    DEFAULT_HANDBRAKECLI_COMMAND,
+    HANDBRAKECLI_COMMAND_ENV,
+)
+from handbrake_batch_compressor.src.compression.process_priority import (
+    CpuPartitions,
+    ProcessPriority,
+)
+from handbrake_batch_compressor.src.compression.stderr_ring_buffer import (
+    DEFAULT_STDERR_TAIL_SIZE,
+    StderrRingBuffer,
+)
 from handbrake_batch_compressor.src.errors.cancel_compression_by_user import (
     CompressionCancelledByUserError,
 )
 from handbrake_batch_compressor.src.errors.handbrake_cli_exceptions import (
     CompressionFailedError,
+    CompressionIneffectiveError,
 )
 
+# Stderr is read in chunks since it isn't guaranteed to have line endings
+_STDERR_CHUNK_SIZE = 4096
+
+
+class EarlyAbortOptions(BaseModel):
+    """
+    Options to abort compressions which are on track to be ineffective.
+
+    While the video is being compressed, the final size of the output
+    is projected from its current size and the progress.
+
+    margin_percent - How much larger than the original the projected size can be.
+    min_progress_percent - The projection is unreliable at the beginning, so wait until this progress.
+    check_interval_seconds - How often to check the output size.
+    """
+
+    margin_percent: float = 0.0
+    min_progress_percent: float = 10.0
+    check_interval_seconds: float = 5.0
+
+    def projected_size(self, output_size: int, progress: float) -> int | None:
+        """Project the final output size or return None if it's too early."""
+        if progress < self.min_progress_percent or progress <= 0:
+            return None
+        return int(output_size * 100 / progress)
+
+    def is_ineffective(self, input_size: int, projected_size: int) -> bool:
+        return projected_size > input_size * (1 + self.margin_percent / 100)
+
 
 class HandbrakeCompressor:
     """Handles video compression using HandbrakeCLI."""
 
-    def __init__(self, handbrakecli_options: str = '') -> None:
-        """Initialize the HandbrakeCompressor with the given handbrakecli options."""
+    def __init__(  # noqa: PLR0913 - settings of the compressor
+        self,
+        handbrakecli_options: str = '',
+        early_abort: EarlyAbortOptions | None = None,
+        stderr_tail_size: int = DEFAULT_STDERR_TAIL_SIZE,
+        stderr_spill_dir: Path | None = None,
+        handbrakecli_command: str | None = None,
+        priority: ProcessPriority | None = None,
+    ) -> None:
+        """
+        Initialize the HandbrakeCompressor with the given handbrakecli options.
+
+        With `early_abort` compressions which are on track to be ineffective
+        are aborted with CompressionIneffectiveError.
+
+        Only the last `stderr_tail_size` characters of stderr are kept in memory,
+        with `stderr_spill_dir` the full stderr of every compression is saved
+        there (gzipped) and kept if the compression fails.
+
+        `handbrakecli_command` is the command to run HandbrakeCLI (split like a shell does),
+        by default it's taken from the HANDBRAKE_BATCH_COMPRESSOR_HANDBRAKECLI
+        environment variable or just `handbrakecli`.
+
+        `priority` sets CPU/I/O priority, CPU cores and encoder threads of the processes.
+        """
         self.handbrakecli_options = handbrakecli_options
+        self.early_abort = early_abort
+        self.stderr_tail_size = stderr_tail_size
+        self.stderr_spill_dir = stderr_spill_dir
+        self.handbrakecli_command = handbrakecli_command or os.environ.get(
+            HANDBRAKECLI_COMMAND_ENV,
+            DEFAULT_HANDBRAKECLI_COMMAND,
+        )
+        self.priority = priority
+        self._cpu_partitions = (
+            CpuPartitions(priority.partitions) if priority is not None else None
+        )
 
-    async def compress(
+    async def _watch_projected_size(
         self,
+        process: asyncio.subprocess.Process,
         input_video: Path,
+        input_size_bytes: int | None,
         output_video: Path,
-        on_update: Callable[[HandbrakeProgressInfo], None] = lambda _: None,
+        get_progress: Callable[[], float],
+    ) -> int | None:
+        """
+        Kill the process once its output is on track to be larger than the input.
+
+        Returns the projected size if the process was killed.
+        """
+        if self.early_abort is None:
+            return None
+
+        input_size = (
+            input_size_bytes
+            if input_size_bytes is not None
+            else input_video.stat().st_size
+        )
+
+        while process.returncode is None:
+            await asyncio.sleep(self.early_abort.check_interval_seconds)
+
+            # The output may not be created yet or be removed by HandbrakeCLI (e.g. on failure)
+            try:
+                output_size = output_video.stat().st_size
+            except OSError:
+                continue
+
+            projected_size = self.early_abort.projected_size(
+                output_size,
+                get_progress(),
+            )
+            if projected_size is not None and self.early_abort.is_ineffective(
+                input_size,
+                projected_size,
+            ):
+                process.kill()
+                return projected_size
+
+        return None
+
+    @staticmethod
+    async def _handle_stdout(
+        stdout: asyncio.StreamReader | None,
+        on_update: Callable[[HandbrakeProgressInfo], None],
+    ) -> None:
+        """Handle stdout line by line to update progress."""
+        if stdout is None:
+            return
+
+        try:
+            while not stdout.at_eof():
+                line = await stdout.readuntil(b'\r')
+                decoded_line = line.decode('utf-8')
+                info = parse_handbrake_cli_output(decoded_line)
+                on_update(info)
+        except asyncio.IncompleteReadError as e:  # end of stream reached
+            line = e.partial.decode()
+            info = parse_handbrake_cli_output(line)
+            on_update(info)
+
+    @staticmethod
+    async def _handle_stderr(
+        stderr: asyncio.StreamReader | None,
+        error_buffer: StderrRingBuffer,
     ) -> None:
         """
-        Compress a single video file.
+        Handle stderr chunk by chunk for saving error messages to buffer.
 
-        Returns True if the compression was successful, False otherwise.
+        After failed compression the errors will be saved to a log file.
         """
-        compress_cmd = [
-            'handbrakecli',
+        if stderr is None:
+            return
+
+        # A multibyte character may be split between the chunks
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        while chunk := await stderr.read(_STDERR_CHUNK_SIZE):
+            error_buffer.write(decoder.decode(chunk))
+        error_buffer.write(decoder.decode(b'', final=True))
+
+    @staticmethod
+    async def _log_errors(
+        input_video: Path,
+        error_buffer: StderrRingBuffer,
+        log_file: Path,
+    ) -> None:
+        """Append errors (the tail of stderr) of the failed compression to the log file."""
+        async with aiofiles.open(
+            log_file,
+            mode='a',
+            encoding='utf-8',
+        ) as f:
+            await f.write('\n')
+            await f.write(
+                '*' * 30 + ' ' + input_video.name + ' ' + '*' * 30 + '\n',
+            )
+            if error_buffer.truncated:
+                await f.write(
+                    f'[Only the last {error_buffer.max_size} characters are shown',
+                )
+                if error_buffer.spill_path is not None:
+                    await f.write(f', full log: {error_buffer.spill_path}')
+                await f.write(']\n...')
+            await f.write(error_buffer.getvalue())
+
+    def _build_command(
+        self,
+        input_video: Path,
+        output_video: Path,
+        extra_options: Sequence[str],
+        cpu_partition: int | None,
+    ) -> list[str]:
+        """Build HandbrakeCLI command applying the priority controls."""
+        options = [*split(self.handbrakecli_options), *extra_options]
+        prefix: list[str] = []
+
+        if self.priority is not None:
+            options = self.priority.encoder_options(options)
+            prefix = self.priority.command_prefix(
+                self.priority.partition_cpus(cpu_partition),
+            )
+
+        return [
+            *prefix,
+            *split(self.handbrakecli_command),
             '-i',
             str(input_video),
             '-o',
             str(output_video),
-            *split(self.handbrakecli_options),
+            *options,
         ]
 
+    async def compress(
+        self,
+        input_video: Path,
+        output_video: Path,
+        on_update: Callable[[HandbrakeProgressInfo], None] = lambda _: None,
+        extra_options: Sequence[str] = (),
+        input_size_bytes: int | None = None,
+    ) -> None:
+        """
+        Compress a single video file.
+
+        `extra_options` are passed to HandbrakeCLI after the user's options
+        (e.g. to compress only a part of the video).
+        `input_size_bytes` is the size of the input known from the discovery
+        (the input is stat()ed for the early abort only if it isn't given).
+        """
+        # Every running job gets its own part of the CPU cores
+        cpu_partition = self._acquire_cpu_partition()
+        compress_cmd = self._build_command(
+            input_video,
+            output_video,
+            extra_options,
+            cpu_partition,
+        )
+
         stderr_log_filename = Path('errors.log')
-        process = await asyncio.create_subprocess_exec(
-            *compress_cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
+        process = await self._start_process(compress_cmd, cpu_partition)
+
+        # The latest progress is used to project the final output size
+        latest_progress = 0.0
+
+        def track_progress(info: HandbrakeProgressInfo) -> None:
+            nonlocal latest_progress
+            if info.progress is not None:
+                latest_progress = info.progress
+            on_update(info)
+
+        watchdog = asyncio.create_task(
+            self._watch_projected_size(
+                process,
+                input_video,
+                input_size_bytes,
+                output_video,
+                lambda: latest_progress,
+            ),
         )
 
-        try:
-            # Buffering stderr until we detect that error occurred
-            # (stderr contains not only errors but also service info)
-            error_buffer = StringIO()
-
-            # Handle stdout line by line to update progress
-            async def handle_stdout() -> None:
-                if process.stdout is not None:
-                    try:
-                        while not process.stdout.at_eof():
-                            line = await process.stdout.readuntil(b'\r')
-                            decoded_line = line.decode('utf-8')
-                            info = parse_handbrake_cli_output(decoded_line)
-                            on_update(info)
-                    except asyncio.IncompleteReadError as e:  # end of stream reached
-                        line = e.partial.decode()
-                        info = parse_handbrake_cli_output(line)
-                        on_update(info)
-                        return
-
-            # Handle stderr line by line for saving error messages to buffer
-            # after failed compression all the errors will be saved to a log file
-            async def handle_stderr() -> None:
-                if process.stderr is not None:
-                    try:
-                        while not process.stderr.at_eof():
-                            line = await process.stderr.readuntil(b'\r')
-                            decoded_line = line.decode('utf-8')
-                            error_buffer.write(decoded_line)
-                    except asyncio.IncompleteReadError as e:  # end of stream reached
-                        error_buffer.write(e.partial.decode())
-                        return
+        # Buffering stderr until we detect that error occurred
+        # (stderr contains not only errors but also service info)
+        error_buffer = StderrRingBuffer(
+            max_size=self.stderr_tail_size,
+            spill_dir=self.stderr_spill_dir,
+            spill_prefix=input_video.stem,
+        )
+        # The full stderr is only needed for failed compressions
+        keep_full_stderr = False
 
+        try:
             tasks = [
-                asyncio.create_task(handle_stdout()),
-                asyncio.create_task(handle_stderr()),
+                asyncio.create_task(
+                    self._handle_stdout(process.stdout, track_progress),
+                ),
+                asyncio.create_task(
+                    self._handle_stderr(process.stderr, error_buffer),
+                ),
             ]
 
             await asyncio.gather(*tasks, return_exceptions=True)
 
             await process.wait()
 
+            projected_size = watchdog.result() if watchdog.done() else None
+            watchdog.cancel()
+            if projected_size is not None:
+                if output_video.exists():
+                    output_video.unlink()
+                raise CompressionIneffectiveError(input_video, projected_size)
+
             # Check if the compression was successful
-            # (compressed video should exist)
-            if not output_video.exists():
-                # Log error to file
-                async with aiofiles.open(
+            # (compressed video should exist and HandbrakeCLI shouldn't crash)
+            if process.returncode != 0 or not output_video.exists():
+                if output_video.exists():  # A crashed encoding leaves a broken output
+                    output_video.unlink()
+
+                error_buffer.close()
+                keep_full_stderr = True
+                await self._log_errors(
+                    input_video,
+                    error_buffer,
                     stderr_log_filename,
-                    mode='a',
-                    encoding='utf-8',
-                ) as f:
-                    await f.write('\n')
-                    await f.write(
-                        '*' * 30 + ' ' + input_video.name + ' ' + '*' * 30 + '\n',
-                    )
-                    await f.write(error_buffer.getvalue())
+                )
 
                 # Propagate failed compression to the manager
                 raise CompressionFailedError(
@@ -123,9 +344,43 @@ class HandbrakeCompressor:
 
         # In case of ctrl_+ c just cancell the process
         except (asyncio.CancelledError, KeyboardInterrupt) as e:
+            watchdog.cancel()
             process.kill()
             await process.wait()
             if output_video.exists():  # Interrupted encoding can't be successful
                 output_video.unlink()  # so delete the output
 
             raise CompressionCancelledByUserError from e
+
+        finally:
+            self._release_cpu_partition(cpu_partition)
+            if not keep_full_stderr:
+                error_buffer.discard()
+
+    async def _start_process(
+        self,
+        compress_cmd: list[str],
+        cpu_partition: int | None,
+    ) -> asyncio.subprocess.Process:
+        """Start HandbrakeCLI (the CPU partition is released if it can't be started)."""
+        try:
+            return await asyncio.create_subprocess_exec(
+                *compress_cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                creationflags=self.priority.creation_flags()
+                if self.priority is not None
+                else 0,
+            )
+        except BaseException:
+            self._release_cpu_partition(cpu_partition)
+            raise
+
+    def _acquire_cpu_partition(self) -> int | None:
+        if self._cpu_partitions is None:
+            return None
+        return self._cpu_partitions.acquire()
+
+    def _release_cpu_partition(self, cpu_partition: int | None) -> None:
+        if self._cpu_partitions is not None:
+            self._cpu_partitions.release(cpu_partition)
@@ -0,0 +1,253 @@
+"""
+The module provides leases of the compressions shared between several instances.
+
+Several instances (on the same host or on different hosts) may process the same
+target path at the same time. Before compressing a video an instance creates
+a sidecar lease file next to its output (filename.compressing.ext.lease) with
+an exclusive create, so only one instance compresses the video.
+
+The lease holds the host, pid and heartbeat time of its owner, the heartbeat is
+refreshed by a background thread. A lease is dead if its heartbeat is older than
+the timeout or if its owner runs on this host and its process doesn't exist,
+then another instance may take it over (e.g. to remove the incomplete output
+of a crashed instance). Clocks of the hosts are expected to be synchronized
+with a precision much better than the timeout.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import socket
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel, ValidationError
+
+from handbrake_batch_compressor.src.cli.logger import log
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+DEFAULT_LEASE_TIMEOUT_SECONDS = 120
+LEASE_EXT = 'lease'
+
+
+class LeaseInfo(BaseModel):
+    """Content of a lease file: its owner and the last time the owner was alive."""
+
+    host: str
+    pid: int
+    heartbeat: float
+
+
+class JobLeases:
+    """
+    Acquires, refreshes and releases the leases of the compressions of this instance.
+
+    Usage example:
+        leases = JobLeases()
+        if leases.acquire(output_video):
+            try:
+                ...  # compress the video into output_video
+            finally:
+                leases.release(output_video)
+        leases.close()
+    """
+
+    def __init__(
+        self,
+        timeout_seconds: float = DEFAULT_LEASE_TIMEOUT_SECONDS,
+        host: str | None = None,
+        pid: int | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.timeout_seconds = timeout_seconds
+        self.host = host or socket.gethostname()
+        self.pid = pid if pid is not None else os.getpid()
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._held: set[Path] = set()
+
+        # Heartbeats are refreshed a few times per timeout, so a slow write doesn't lose the lease
+        self._closed = threading.Event()
+        self._thread = threading.Thread(
+            target=self._refresh_periodically,
+            name='lease-heartbeat',
+            daemon=True,
+        )
+        self._thread.start()
+
+    @staticmethod
+    def lease_path(output_video: Path) -> Path:
+        """filename.compressing.ext -> filename.compressing.ext.lease"""
+        return output_video.with_name(f'{output_video.name}.{LEASE_EXT}')
+
+    def acquire(self, output_video: Path) -> bool:
+        """
+        Acquire the lease of the output video (taking over a dead lease).
+
+        Returns False if the video is being compressed by another instance.
+        """
+        lease_path = self.lease_path(output_video)
+        if self._create(lease_path):
+            return True
+
+        lease = self._read(lease_path)
+        if lease is None:
+            # Released right now
+            return self._create(lease_path)
+        if not self.is_dead(lease):
+            return False
+
+        return self._take_over(lease_path, lease) and self._create(lease_path)
+
+    def release(self, output_video: Path) -> None:
+        """Remove the lease if it's still held by this instance."""
+        lease_path = self.lease_path(output_video)
+        with self._lock:
+            self._held.discard(lease_path)
+            self._remove_own(lease_path)
+
+    def is_dead(self, lease: LeaseInfo) -> bool:
+        """Check if the owner of the lease is gone (it can be taken over)."""
+        if self._clock() - lease.heartbeat > self.timeout_seconds:
+            return True
+        return lease.host == self.host and not _process_exists(lease.pid)
+
+    def close(self) -> None:
+        """Stop the heartbeat and release all the held leases."""
+        self._closed.set()
+        self._thread.join()
+
+        with self._lock:
+            for lease_path in self._held:
+                self._remove_own(lease_path)
+            self._held.clear()
+
+    def _info(self) -> LeaseInfo:
+        return LeaseInfo(host=self.host, pid=self.pid, heartbeat=self._clock())
+
+    def _is_own(self, lease: LeaseInfo | None) -> bool:
+        return lease is not None and (lease.host, lease.pid) == (self.host, self.pid)
+
+    def _remove_own(self, lease_path: Path) -> None:
+        if self._is_own(self._read(lease_path)):
+            with contextlib.suppress(FileNotFoundError):
+                lease_path.unlink()
+
+    def _create(self, lease_path: Path) -> bool:
+        """Create the lease file if it doesn't exist (atomically, even on NFS v3+)."""
+        try:
+            fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(self._info().model_dump_json())
+
+        with self._lock:
+            self._held.add(lease_path)
+        return True
+
+    def _take_over(self, lease_path: Path, lease: LeaseInfo) -> bool:
+        """
+        Remove the dead lease, so it can be created again.
+
+        The lease is renamed away first (only one of the instances taking it over
+        succeeds). If it has been taken over and refreshed in the meantime,
+        it's put back.
+        """
+        taken_path = lease_path.with_name(
+            f'{lease_path.name}.{self.host}.{self.pid}.stale',
+        )
+        try:
+            lease_path.rename(taken_path)
+        except FileNotFoundError:
+            # Released or taken over by another instance right now
+            return False
+
+        taken = self._read(taken_path)
+        if taken is not None and taken != lease and not self.is_dead(taken):
+            self._put_back(taken_path, lease_path)
+            return False
+
+        with contextlib.suppress(FileNotFoundError):
+            taken_path.unlink()
+        log.info(
+            f'Taking over the dead lease of {lease_path.name} from {lease.host or "unknown host"} (pid {lease.pid}).',
+        )
+        return True
+
+    def _put_back(self, taken_path: Path, lease_path: Path) -> None:
+        """Restore the lease taken by mistake unless a new one is already created."""
+        try:
+            os.link(taken_path, lease_path)
+        except FileExistsError:
+            pass
+        except OSError:
+            # Hard links aren't supported by the file system (e.g. SMB)
+            taken_path.rename(lease_path)
+            return
+        taken_path.unlink()
+
+    def _read(self, lease_path: Path) -> LeaseInfo | None:
+        """
+        Read the lease or return None if it doesn't exist.
+
+        A lease which isn't written yet (or is corrupted) belongs to an unknown
+        owner and is alive until its modification time is older than the timeout.
+        """
+        try:
+            content = lease_path.read_text(encoding='utf-8')
+            modified = lease_path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+        try:
+            return LeaseInfo.model_validate_json(content)
+        except ValidationError:
+            return LeaseInfo(host='', pid=0, heartbeat=modified)
+
+    def _refresh(self) -> None:
+        # The lock is held while writing, so a released lease is never written again
+        with self._lock:
+            for lease_path in list(self._held):
+                if not self._is_own(self._read(lease_path)):
+                    log.warning(
+                        f'The lease {lease_path.name} is lost (its heartbeat was late), another instance may compress the same video.',
+                    )
+                    self._held.discard(lease_path)
+                    continue
+
+                # The lease is replaced atomically, so other instances never read a partial one
+                temp_path = lease_path.with_name(f'{lease_path.name}.{self.pid}.tmp')
+                try:
+                    temp_path.write_text(
+                        self._info().model_dump_json(),
+                        encoding='utf-8',
+                    )
+                    temp_path.replace(lease_path)
+                except OSError as e:
+                    log.warning(f'Failed to refresh the lease {lease_path.name}: {e}')
+
+    def _refresh_periodically(self) -> None:
+        while not self._closed.wait(self.timeout_seconds / 4):
+            self._refresh()
+
+
+def _process_exists(pid: int) -> bool:
+    # os.kill() terminates the process on Windows, so only the heartbeat is checked there
+    if os.name == 'nt':
+        return True
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
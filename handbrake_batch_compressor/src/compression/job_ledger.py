@@ -0,0 +1,166 @@
+"""
+The module provides a persistent ledger of the compression jobs.
+
+The ledger remembers the outcome of every processed video (with the
+fingerprint of the source file), so the next run can skip the videos
+with known outcomes without probing or compressing them again.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from enum import Enum
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from handbrake_batch_compressor.src.utils.files import VideoFile
+    from handbrake_batch_compressor.src.utils.sharding import Shard
+
+
+class JobState(str, Enum):
+    """
+    State of the compression job of a video.
+
+    pending - The compression has started but hasn't finished (e.g. it was interrupted).
+    skipped - The video doesn't meet the smart filter criteria.
+    failed - The video can't be probed or compressed.
+    ineffective - The compressed video turned out larger than the original.
+    done - The video is compressed.
+    """
+
+    pending = 'pending'
+    skipped = 'skipped'
+    failed = 'failed'
+    ineffective = 'ineffective'
+    done = 'done'
+
+
+class LedgerEntry(BaseModel):
+    """
+    Recorded outcome of a video.
+
+    `settings` describes what the outcome depends on
+    (e.g. smart filter criteria for skipped videos).
+    """
+
+    state: JobState
+    settings: str
+
+
+class JobLedger:
+    """
+    SQLite (WAL) ledger of the compression jobs.
+
+    Entries are keyed by the video path and bound to the source fingerprint
+    (size, modification time and inode), so a changed video is processed again.
+
+    Usage example:
+        ledger = JobLedger(JobLedger.default_path(target_path))
+        ledger.record(video, JobState.pending, settings='')
+        ...
+        ledger.record(video, JobState.done, settings='')
+        ledger.close()
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+
+        # Jobs are recorded from several threads, so the connection is shared under a lock
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                settings TEXT NOT NULL,
+                updated_at INTEGER NOT NULL
+            )
+            """,
+        )
+        self._connection.execute(
+            'CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)',
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def default_path(
+        target_path: Path,
+        shard: Shard | None = None,
+        host: str | None = None,
+    ) -> Path:
+        """
+        Return the default location of the ledger (in the root of the target path).
+
+        Every shard (or every host if the hosts share the library with leases)
+        has its own ledger, so the hosts don't write to the same SQLite file
+        over a network share (its locking isn't reliable there).
+        """
+        if shard is not None:
+            return (
+                target_path
+                / f'.handbrake-batch-compressor.ledger.shard-{shard.index}-of-{shard.count}.sqlite'
+            )
+        if host is not None:
+            return (
+                target_path / f'.handbrake-batch-compressor.ledger.host-{host}.sqlite'
+            )
+        return target_path / '.handbrake-batch-compressor.ledger.sqlite'
+
+    def get(self, video: VideoFile) -> LedgerEntry | None:
+        """Return the recorded outcome of the video if the video hasn't changed since."""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT size, mtime_ns, inode, state, settings FROM jobs WHERE path = ?',
+                (str(video.path.absolute()),),
+            ).fetchone()
+
+        if row is None or tuple(row[:3]) != video.identity:
+            return None
+
+        return LedgerEntry(state=JobState(row[3]), settings=row[4])
+
+    def record(self, video: VideoFile, state: JobState, settings: str) -> None:
+        """
+        Record the state of the video job.
+
+        The fingerprint is the metadata of the video taken at the discovery,
+        so the outcome is known until the video changes.
+        """
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    str(video.path.absolute()),
+                    *video.identity,
+                    state.value,
+                    settings,
+                    int(time.time()),
+                ),
+            )
+            self._connection.commit()
+
+    def paths_in_state(self, state: JobState) -> list[Path]:
+        """Return the paths of all the videos in the given state."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT path FROM jobs WHERE state = ?',
+                (state.value,),
+            ).fetchall()
+
+        return [Path(row[0]) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.commit()
+            self._connection.close()
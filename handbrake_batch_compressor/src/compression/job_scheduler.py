@@ -0,0 +1,139 @@
+"""
+The module provides a scheduler which orders the compression jobs by their value.
+
+With a bounded time window (e.g. a night) it's better to spend it on the videos
+which save the most, instead of the ones which happened to be discovered first.
+The videos are ordered by their probed properties, so the scheduler takes all
+the probed videos from the probe pipeline as soon as they are ready and gives
+the workers the most valuable one available at the moment.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import math
+from typing import TYPE_CHECKING
+
+from handbrake_batch_compressor.src.cli.option_types import JobOrder
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from handbrake_batch_compressor.src.compression.probe_pipeline import (
+        ProbedVideo,
+        ProbePipeline,
+    )
+
+# Typical bits per pixel of a compressed video (e.g. H.265 1080p30 at ~2.5 Mbps),
+# videos with a higher bits per pixel are expected to shrink more
+TARGET_BITS_PER_PIXEL = 0.04
+
+
+def encode_cost(probed: ProbedVideo) -> float:
+    """Estimate how long the video takes to encode in pixels to process (duration * fps * area)."""
+    properties = probed.properties
+    if properties is None or properties.duration_seconds is None:
+        return math.inf
+
+    return (
+        properties.duration_seconds * properties.frame_rate * properties.resolution.area
+    )
+
+
+def estimated_savings_rate(probed: ProbedVideo) -> float:
+    """Estimate how many bytes are saved per pixel to encode."""
+    cost = encode_cost(probed)
+    if probed.properties is None or cost in (0, math.inf):
+        return 0.0
+
+    # bitrate_kbytes is in kilobits per second
+    bits_per_pixel = (
+        probed.properties.bitrate_kbytes
+        * 1024
+        / max(probed.properties.frame_rate * probed.properties.resolution.area, 1)
+    )
+    expected_ratio = min(1.0, TARGET_BITS_PER_PIXEL / max(bits_per_pixel, 1e-9))
+    return probed.size_bytes * (1 - expected_ratio) / cost
+
+
+# Lower keys go first
+_ORDER_KEYS: dict[JobOrder, Callable[[ProbedVideo], float]] = {
+    JobOrder.largest_first: lambda probed: -probed.size_bytes,
+    JobOrder.shortest_first: encode_cost,
+    JobOrder.best_savings_rate: lambda probed: -estimated_savings_rate(probed),
+}
+
+
+class JobScheduler:
+    """
+    Orders the probed videos by the given policy.
+
+    Videos which won't be compressed (filtered or corrupted) are given out first
+    since they take no time. Before the whole library is probed only the already
+    probed videos are ordered, but probing is much faster than encoding, so
+    usually everything is probed while the first jobs are running.
+
+    Usage example:
+        scheduler = JobScheduler(pipeline, JobOrder.largest_first)
+        scheduler.start()
+        try:
+            while (probed := await scheduler.get()) is not None:
+                ...
+        finally:
+            await scheduler.close()
+    """
+
+    def __init__(self, pipeline: ProbePipeline, order: JobOrder) -> None:
+        if order == JobOrder.discovery:
+            msg = 'Videos are already in the discovery order, use the pipeline directly'
+            raise ValueError(msg)
+
+        self.pipeline = pipeline
+        self.order = order
+
+        self._key = _ORDER_KEYS[order]
+        self._heap: list[tuple[bool, float, int, ProbedVideo]] = []
+        self._changed = asyncio.Event()
+        self._collector: asyncio.Task[None] | None = None
+        self._finished = False
+        self._error: Exception | None = None
+
+    def start(self) -> None:
+        """Start taking the probed videos from the pipeline."""
+        self._collector = asyncio.create_task(self._collect())
+
+    async def get(self) -> ProbedVideo | None:
+        """Get the most valuable of the probed videos or None if there are no more videos."""
+        while True:
+            if self._error is not None:
+                raise self._error
+            if self._heap:
+                return heapq.heappop(self._heap)[-1]
+            if self._finished:
+                return None
+
+            self._changed.clear()
+            await self._changed.wait()
+
+    async def close(self) -> None:
+        """Stop taking the probed videos (the pipeline is closed by its owner)."""
+        if self._collector is not None:
+            self._collector.cancel()
+            await asyncio.gather(self._collector, return_exceptions=True)
+
+    async def _collect(self) -> None:
+        sequence = 0
+        try:
+            while (probed := await self.pipeline.get()) is not None:
+                heapq.heappush(
+                    self._heap,
+                    (probed.should_compress, self._key(probed), sequence, probed),
+                )
+                sequence += 1
+                self._changed.set()
+        except Exception as e:  # noqa: BLE001 - re-raised to the consumers in get()
+            self._error = e
+        finally:
+            self._finished = True
+            self._changed.set()
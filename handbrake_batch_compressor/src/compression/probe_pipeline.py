@@ -0,0 +1,177 @@
+"""
+The module provides a look-ahead stage which probes videos before they are compressed.
+
+Probing a video (especially a VFR one) takes time, so instead of doing it
+between the encodes, upcoming videos are probed in a thread pool while
+the current ones are being compressed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel
+
+from handbrake_batch_compressor.src.utils.ffmpeg_helpers import (
+    VideoProperties,
+    get_video_properties,
+)
+from handbrake_batch_compressor.src.utils.files import (
+    VideoFile,  # noqa: TC001 - is used by pydantic
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+    from pathlib import Path
+
+    from handbrake_batch_compressor.src.utils.probe_cache import ProbeCache
+    from handbrake_batch_compressor.src.utils.smart_filters import SmartFilter
+
+
+class ProbedVideo(BaseModel):
+    """
+    A video with its properties and the smart filter decision.
+
+    `properties` is None if the video can't be probed (e.g. it's corrupted).
+    """
+
+    file: VideoFile
+    properties: VideoProperties | None
+    should_compress: bool
+
+    @property
+    def path(self) -> Path:
+        return self.file.path
+
+    @property
+    def size_bytes(self) -> int:
+        return self.file.size_bytes
+
+
+class ProbePipeline:
+    """
+    Probes the next `lookahead` videos in background threads.
+
+    Probed videos are available through `get()` in the same order as they were given.
+
+    Usage example:
+        pipeline = ProbePipeline(videos, smart_filter, lookahead=4)
+        pipeline.start()
+        try:
+            while (probed := await pipeline.get()) is not None:
+                ...
+        finally:
+            await pipeline.close()
+    """
+
+    def __init__(
+        self,
+        videos: Iterable[VideoFile],
+        smart_filter: SmartFilter,
+        lookahead: int,
+        probe_cache: ProbeCache | None = None,
+        on_probed: Callable[[ProbedVideo], None] | None = None,
+    ) -> None:
+        """`on_probed` is called (on the event loop) for every probed video as soon as it's ready."""
+        self.videos = videos
+        self.smart_filter = smart_filter
+        self.lookahead = max(1, lookahead)
+        self.probe_cache = probe_cache
+        self.on_probed = on_probed
+
+        self._ready: asyncio.Queue[ProbedVideo | None] = asyncio.Queue(
+            maxsize=self.lookahead,
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.lookahead,
+            thread_name_prefix='probe',
+        )
+        self._producer: asyncio.Task[None] | None = None
+        self._error: Exception | None = None
+
+    def start(self) -> None:
+        """Start probing the videos in the background."""
+        self._producer = asyncio.create_task(self._produce())
+
+    async def get(self) -> ProbedVideo | None:
+        """Get the next probed video or None if there are no more videos."""
+        probed = await self._ready.get()
+
+        if probed is None:
+            # Keep the end marker for the other consumers
+            self._ready.put_nowait(None)
+            if self._error is not None:
+                raise self._error
+
+        return probed
+
+    async def close(self) -> None:
+        """Stop probing and release the threads."""
+        if self._producer is not None:
+            self._producer.cancel()
+            await asyncio.gather(self._producer, return_exceptions=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _probe(self, video: VideoFile) -> ProbedVideo:
+        properties = (
+            self.probe_cache.get_or_probe(video)
+            if self.probe_cache is not None
+            else get_video_properties(video.path)
+        )
+
+        return ProbedVideo(
+            file=video,
+            properties=properties,
+            should_compress=properties is not None
+            and self.smart_filter.should_compress(properties),
+        )
+
+    async def _produce(self) -> None:
+        loop = asyncio.get_running_loop()
+        in_flight: deque[asyncio.Future[ProbedVideo]] = deque()
+
+        # The videos may be discovered lazily (e.g. by walking the file system),
+        # so they are taken in a thread to not block the event loop
+        videos = iter(self.videos)
+        next_video = asyncio.ensure_future(asyncio.to_thread(next, videos, None))
+
+        try:
+            while True:
+                # The next video may take long to arrive (e.g. in the watch mode),
+                # so the probed ones are given out meanwhile
+                while not next_video.done():
+                    awaited = {next_video, in_flight[0]} if in_flight else {next_video}
+                    await asyncio.wait(awaited, return_when=asyncio.FIRST_COMPLETED)
+                    while in_flight and in_flight[0].done():
+                        await self._put_ready(in_flight.popleft().result())
+
+                if (video := next_video.result()) is None:
+                    break
+
+                in_flight.append(
+                    loop.run_in_executor(self._executor, self._probe, video),
+                )
+                if len(in_flight) >= self.lookahead:
+                    await self._put_ready(await in_flight.popleft())
+                next_video = asyncio.ensure_future(
+                    asyncio.to_thread(next, videos, None),
+                )
+
+            while in_flight:
+                await self._put_ready(await in_flight.popleft())
+        except Exception as e:  # noqa: BLE001 - re-raised to the consumers in get()
+            self._error = e
+        finally:
+            next_video.cancel()
+            for future in in_flight:
+                future.cancel()
+
+        await self._ready.put(None)
+
+    async def _put_ready(self, probed: ProbedVideo) -> None:
+        if self.on_probed is not None:
+            self.on_probed(probed)
+        await self._ready.put(probed)
@@ -0,0 +1,202 @@
+"""
+The module provides priority controls for the HandbrakeCLI processes.
+
+It allows to run the compression as a background workload: with a lower CPU
+and I/O priority, on a subset of CPU cores (split between the parallel jobs)
+and with a limited count of encoder threads.
+
+On Linux the priorities are applied by launching HandbrakeCLI through `nice`,
+`ionice` and `taskset`, so they are inherited by every thread of the encoder
+from the very start. On Windows only the CPU priority is supported.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+from pydantic import BaseModel
+
+from handbrake_batch_compressor.src.cli.logger import log
+from handbrake_batch_compressor.src.cli.option_types import IoPriorityClass
+from handbrake_batch_compressor.src.utils.handbrakecli_options import option_value
+
+# Windows priority classes by the lowest nice level they correspond to
+_WINDOWS_PRIORITY_CLASSES = [
+    (15, 'IDLE_PRIORITY_CLASS'),
+    (1, 'BELOW_NORMAL_PRIORITY_CLASS'),
+]
+
+
+class InvalidCpuListError(ValueError):
+    """Exception raised for an invalid list of CPU cores."""
+
+    def __init__(self, cpus: str) -> None:
+        super().__init__(
+            f'Invalid CPU list: {cpus} (the right format is e.g. 0-3,6,8-9)',
+        )
+
+
+def parse_cpu_list(cpus: str) -> list[int]:
+    """
+    Parse a list of CPU cores in the taskset format.
+
+    Usage example:
+        parse_cpu_list('0-3,6')  # [0, 1, 2, 3, 6]
+    """
+    result: set[int] = set()
+    try:
+        for part in str(cpus).replace(' ', '').split(','):
+            first, separator, last = part.partition('-')
+            cores = range(int(first), int(last if separator else first) + 1)
+            if not cores or cores.start < 0:
+                raise InvalidCpuListError(cpus)
+            result.update(cores)
+    except ValueError:
+        raise InvalidCpuListError(cpus) from None
+
+    return sorted(result)
+
+
+class ProcessPriority(BaseModel):
+    """
+    Priority controls of the HandbrakeCLI processes.
+
+    nice - CPU priority (from -20 to 19, the higher the lower the priority).
+    io_class - I/O scheduling class.
+    io_level - Level of the best_effort class (from 0 to 7, the higher the lower the priority).
+    cpus - CPU cores the processes may run on.
+    partitions - How many parts the cores are split into (one per parallel job).
+    encoder_threads - Limit of the encoder threads (for x264 and x265 encoders).
+    """
+
+    nice: int | None = None
+    io_class: IoPriorityClass | None = None
+    io_level: int | None = None
+    cpus: list[int] | None = None
+    partitions: int = 1
+    encoder_threads: int | None = None
+
+    def partition_cpus(self, partition: int | None) -> list[int] | None:
+        """
+        Return the cores of the given partition or all the cores if it's None.
+
+        If there are fewer cores than partitions, the cores are shared.
+        """
+        if not self.cpus or partition is None:
+            return self.cpus
+
+        partitions = max(1, min(self.partitions, len(self.cpus)))
+        size, rest = divmod(len(self.cpus), partitions)
+        partition %= partitions
+        start = partition * size + min(partition, rest)
+        return self.cpus[start : start + size + (partition < rest)]
+
+    def command_prefix(self, cpus: list[int] | None) -> list[str]:
+        """Return the command to launch HandbrakeCLI through (Linux and macOS)."""
+        if os.name == 'nt':
+            return []
+
+        prefix: list[str] = []
+        if self.nice is not None and _has_tool('nice'):
+            prefix += ['nice', '-n', str(self.nice)]
+        if self.io_class is not None and _has_tool('ionice'):
+            prefix += [
+                'ionice',
+                '-c',
+                '3' if self.io_class == IoPriorityClass.idle else '2',
+            ]
+            if (
+                self.io_class == IoPriorityClass.best_effort
+                and self.io_level is not None
+            ):
+                prefix += ['-n', str(self.io_level)]
+        if cpus and _has_tool('taskset'):
+            prefix += ['taskset', '-c', ','.join(map(str, cpus))]
+        return prefix
+
+    def creation_flags(self) -> int:
+        """Return the process creation flags with the CPU priority (Windows)."""
+        if os.name != 'nt' or self.nice is None:
+            return 0
+
+        for min_nice, priority_class in _WINDOWS_PRIORITY_CLASSES:
+            if self.nice >= min_nice:
+                return getattr(subprocess, priority_class)
+        return 0
+
+    def encoder_options(self, options: list[str]) -> list[str]:
+        """
+        Inject the encoder threads limit into the HandbrakeCLI options.
+
+        The limit is appended to the user's `--encopts` (if any), it's `threads`
+        for x264 and `pools` for x265. Hardware encoders are left as they are,
+        and so are the options without `--encoder` (the encoder of the preset is unknown).
+        """
+        if self.encoder_threads is None:
+            return options
+
+        encoder = option_value(options, '-e', '--encoder')
+        if encoder is None:
+            return options
+        if 'x265' in encoder:
+            limit = f'pools={self.encoder_threads}'
+        elif 'x264' in encoder:
+            limit = f'threads={self.encoder_threads}'
+        else:
+            return options
+
+        options = list(options)
+        for i, option in enumerate(options):
+            if option in ('-x', '--encopts') and i + 1 < len(options):
+                options[i + 1] = f'{options[i + 1]}:{limit}'
+                return options
+            if option.startswith('--encopts='):
+                options[i] = f'{option}:{limit}'
+                return options
+
+        return [*options, '--encopts', limit]
+
+
+class CpuPartitions:
+    """
+    Gives every running job its own partition of the CPU cores.
+
+    If there are more running jobs than partitions (e.g. trial encodes),
+    the extra jobs run on all the cores.
+    """
+
+    def __init__(self, partitions: int) -> None:
+        self._free = list(range(max(1, partitions)))
+        self._lock = threading.Lock()
+
+    def acquire(self) -> int | None:
+        """Take a free partition or return None if all of them are taken."""
+        with self._lock:
+            return self._free.pop(0) if self._free else None
+
+    def release(self, partition: int | None) -> None:
+        if partition is None:
+            return
+        with self._lock:
+            self._free.append(partition)
+            self._free.sort()
+
+
+_tools_warned: set[str] = set()
+
+
+def _has_tool(tool: str) -> bool:
+    """Check if the tool is available, warning once if it's not."""
+    if shutil.which(tool) is not None:
+        return True
+
+    if tool not in _tools_warned:
+        _tools_warned.add(tool)
+        log.warning(
+            f'{tool} is not found, its priority option is ignored on {sys.platform}.',
+        )
+    return False
@@ -0,0 +1,100 @@
+"""
+The module provides a bounded buffer for the stderr of HandbrakeCLI.
+
+HandbrakeCLI writes a lot to stderr (scan info, warnings on damaged sources),
+so only the tail of the output is kept in memory. Optionally the whole output
+is spilled to a gzip-compressed file to investigate failed compressions.
+"""
+
+from __future__ import annotations
+
+import gzip
+import os
+import tempfile
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import TextIO
+
+DEFAULT_STDERR_TAIL_SIZE = 64 * 1024
+
+
+class StderrRingBuffer:
+    """
+    Keeps the last `max_size` characters of the written text.
+
+    With `spill_dir` the whole text is also written to a gzip file
+    in that directory (see `spill_path`). The file is removed by `discard()`,
+    so it should be called when the full output isn't needed anymore.
+
+    Usage example:
+        buffer = StderrRingBuffer(max_size=1024, spill_dir=Path('logs'))
+        buffer.write(chunk)
+        ...
+        buffer.close()
+        print(buffer.getvalue(), buffer.spill_path)
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_STDERR_TAIL_SIZE,
+        spill_dir: Path | None = None,
+        spill_prefix: str = 'handbrakecli',
+    ) -> None:
+        self.max_size = max_size
+        self.spill_path: Path | None = None
+
+        self._chunks: deque[str] = deque()
+        self._size = 0
+        self._dropped = False
+
+        self._spill: TextIO | None = None
+        if spill_dir is not None:
+            spill_dir.mkdir(parents=True, exist_ok=True)
+            fd, path = tempfile.mkstemp(
+                prefix=f'{spill_prefix}.',
+                suffix='.stderr.log.gz',
+                dir=spill_dir,
+            )
+            os.close(fd)
+            self.spill_path = Path(path)
+            self._spill = gzip.open(self.spill_path, 'wt', encoding='utf-8')  # noqa: SIM115 - closed in close()
+
+    def write(self, text: str) -> None:
+        if not text:
+            return
+
+        if self._spill is not None:
+            self._spill.write(text)
+
+        self._chunks.append(text)
+        self._size += len(text)
+
+        # Drop the oldest chunks which are entirely out of the tail
+        while self._size - len(self._chunks[0]) >= self.max_size:
+            self._size -= len(self._chunks.popleft())
+            self._dropped = True
+
+    @property
+    def truncated(self) -> bool:
+        """Whether the beginning of the written text is lost."""
+        return self._dropped or self._size > self.max_size
+
+    def getvalue(self) -> str:
+        """Return the tail of the written text (at most `max_size` characters)."""
+        return ''.join(self._chunks)[-self.max_size :]
+
+    def close(self) -> None:
+        """Finish writing of the spill file."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def discard(self) -> None:
+        """Close and remove the spill file."""
+        self.close()
+        if self.spill_path is not None:
+            self.spill_path.unlink(missing_ok=True)
+            self.spill_path = None
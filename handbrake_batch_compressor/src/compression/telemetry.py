@@ -0,0 +1,291 @@
+"""
+The module provides machine-readable telemetry of the compression jobs.
+
+Every job emits events (queued, started, progress, finished, skipped, failed)
+which are written as JSON Lines and/or aggregated into a Prometheus textfile
+(for the node_exporter textfile collector).
+
+Writing is done by background threads, emitting an event only puts it into
+a queue, so the telemetry never slows the compression down.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import threading
+import time
+from enum import Enum
+from pathlib import Path
+from typing import TYPE_CHECKING, Protocol
+
+if TYPE_CHECKING:
+    from typing import TextIO
+
+PROMETHEUS_WRITE_INTERVAL_SECONDS = 5.0
+_METRIC_PREFIX = 'handbrake_batch_compressor'
+
+
+class JobEvent(str, Enum):
+    """
+    Events of the compression jobs.
+
+    queued - The video is probed and waits for a worker.
+    started - The compression is started.
+    progress - The compression progress is updated (at most a few times per second).
+    finished - The video is compressed.
+    skipped - The video is skipped (filtered, predicted or turned out to be ineffective).
+    failed - The video can't be compressed (corrupted or HandbrakeCLI failed).
+    """
+
+    queued = 'queued'
+    started = 'started'
+    progress = 'progress'
+    finished = 'finished'
+    skipped = 'skipped'
+    failed = 'failed'
+
+
+class EventSink(Protocol):
+    """Receives the events (it must not block) and releases its resources on close."""
+
+    def handle(self, event: dict[str, object]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class InvalidEventsTargetError(ValueError):
+    """Exception raised for an invalid target of the events."""
+
+    def __init__(self, target: str) -> None:
+        super().__init__(
+            f'Invalid events target: {target} (the right format is a file path or fd:<number>)',
+        )
+
+
+def open_events_target(target: str) -> TextIO:
+    """
+    Open the target of the JSON Lines events for appending.
+
+    The target is a file path or `fd:<number>` for an already open file descriptor
+    (e.g. a pipe to a log shipper), the descriptor is left open on close.
+    """
+    if target.startswith('fd:'):
+        try:
+            fd = int(target.removeprefix('fd:'))
+        except ValueError:
+            raise InvalidEventsTargetError(target) from None
+        return open(fd, 'w', encoding='utf-8', closefd=False)
+
+    return Path(target).open('a', encoding='utf-8')
+
+
+class JsonLinesWriter:
+    """
+    Writes the events as JSON Lines from a background thread.
+
+    Usage example:
+        writer = JsonLinesWriter(open_events_target('events.jsonl'))
+        writer.handle({'event': 'started', 'path': '/videos/a.mp4'})
+        writer.close()
+    """
+
+    def __init__(self, output: TextIO) -> None:
+        self.output = output
+
+        self._events: queue.SimpleQueue[dict[str, object] | None] = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._write_events,
+            name='events-writer',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def handle(self, event: dict[str, object]) -> None:
+        self._events.put(event)
+
+    def close(self) -> None:
+        """Write the remaining events and close the output."""
+        self._events.put(None)
+        self._thread.join()
+        self.output.close()
+
+    def _write_events(self) -> None:
+        while (event := self._events.get()) is not None:
+            self.output.write(json.dumps(event, default=str) + '\n')
+            # Events are flushed in batches (once the queue is drained)
+            if self._events.empty():
+                self.output.flush()
+        self.output.flush()
+
+
+class PrometheusTextfile:
+    """
+    Aggregates the events into metrics written to a Prometheus textfile.
+
+    The file is rewritten atomically every `interval_seconds` from a background
+    thread (and once more on close), so the collector never sees a partial file.
+
+    Usage example:
+        metrics = PrometheusTextfile(Path('/var/lib/node_exporter/handbrake.prom'))
+        metrics.handle({'event': 'started', 'path': '/videos/a.mp4'})
+        metrics.close()
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        interval_seconds: float = PROMETHEUS_WRITE_INTERVAL_SECONDS,
+    ) -> None:
+        self.path = path
+        self.interval_seconds = interval_seconds
+
+        self._lock = threading.Lock()
+        self._queued: set[object] = set()
+        # Running jobs: path -> current FPS
+        self._running: dict[object, float] = {}
+        self._files_total = {
+            JobEvent.finished: 0,
+            JobEvent.skipped: 0,
+            JobEvent.failed: 0,
+        }
+        self._input_bytes = 0
+        self._output_bytes = 0
+
+        self._closed = threading.Event()
+        self._thread = threading.Thread(
+            target=self._write_periodically,
+            name='metrics-writer',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def handle(self, event: dict[str, object]) -> None:
+        job_event = JobEvent(event['event'])
+        path = event.get('path')
+
+        with self._lock:
+            if job_event == JobEvent.queued:
+                self._queued.add(path)
+                return
+
+            self._queued.discard(path)
+            if job_event == JobEvent.started:
+                self._running[path] = 0.0
+            elif job_event == JobEvent.progress:
+                if path in self._running:
+                    self._running[path] = _number(event.get('fps_current'))
+            else:
+                self._running.pop(path, None)
+                self._files_total[job_event] += 1
+                if job_event == JobEvent.finished:
+                    self._input_bytes += int(_number(event.get('input_size_bytes')))
+                    self._output_bytes += int(_number(event.get('output_size_bytes')))
+
+    def close(self) -> None:
+        """Stop the periodic writing and write the final metrics."""
+        self._closed.set()
+        self._thread.join()
+        self._write()
+
+    def render(self) -> str:
+        """Render the metrics in the Prometheus text format."""
+        with self._lock:
+            gauges = {
+                'jobs_in_flight': (
+                    'Compressions running right now.',
+                    len(self._running),
+                ),
+                'queue_depth': (
+                    'Probed videos waiting for a worker.',
+                    len(self._queued),
+                ),
+                'encode_fps': (
+                    'Current FPS of all the running compressions together.',
+                    sum(self._running.values()),
+                ),
+                'bytes_saved': (
+                    'Input bytes minus output bytes of the compressed videos.',
+                    self._input_bytes - self._output_bytes,
+                ),
+            }
+            counters = {
+                'input_bytes_total': (
+                    'Size of the compressed videos.',
+                    self._input_bytes,
+                ),
+                'output_bytes_total': ('Size of their outputs.', self._output_bytes),
+            }
+            files_total = dict(self._files_total)
+
+        lines: list[str] = []
+        for name, (description, value) in gauges.items():
+            lines += [
+                f'# HELP {_METRIC_PREFIX}_{name} {description}',
+                f'# TYPE {_METRIC_PREFIX}_{name} gauge',
+                f'{_METRIC_PREFIX}_{name} {value}',
+            ]
+        for name, (description, value) in counters.items():
+            lines += [
+                f'# HELP {_METRIC_PREFIX}_{name} {description}',
+                f'# TYPE {_METRIC_PREFIX}_{name} counter',
+                f'{_METRIC_PREFIX}_{name} {value}',
+            ]
+        lines += [
+            f'# HELP {_METRIC_PREFIX}_files_total Processed videos by their outcome.',
+            f'# TYPE {_METRIC_PREFIX}_files_total counter',
+        ]
+        lines += [
+            f'{_METRIC_PREFIX}_files_total{{outcome="{outcome.value}"}} {count}'
+            for outcome, count in files_total.items()
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def _write(self) -> None:
+        # The collector may read the file at any moment, so it's replaced atomically
+        temp_path = self.path.with_name(f'.{self.path.name}.{os.getpid()}.tmp')
+        temp_path.write_text(self.render(), encoding='utf-8')
+        temp_path.replace(self.path)
+
+    def _write_periodically(self) -> None:
+        while not self._closed.wait(self.interval_seconds):
+            self._write()
+
+
+def _number(value: object) -> float:
+    """Return the value of a numeric field of the event (missing ones are 0)."""
+    return float(value) if isinstance(value, int | float) else 0.0
+
+
+class Telemetry:
+    """
+    Emits the events of the compression jobs to the sinks.
+
+    `emit` can be called from any thread, the sinks only queue or aggregate
+    the events, so it doesn't block.
+
+    Usage example:
+        telemetry = Telemetry([JsonLinesWriter(open_events_target('fd:3'))])
+        telemetry.emit(JobEvent.started, video, size_bytes=1024)
+        telemetry.close()
+    """
+
+    def __init__(self, sinks: list[EventSink]) -> None:
+        self.sinks = sinks
+
+    def emit(self, event: JobEvent, video: Path, **fields: object) -> None:
+        """Emit the event of the video with the given details (sizes, timings, fps)."""
+        record: dict[str, object] = {
+            'timestamp': time.time(),
+            'event': event.value,
+            'path': str(video),
+            **fields,
+        }
+        for sink in self.sinks:
+            sink.handle(record)
+
+    def close(self) -> None:
+        """Write the remaining events and release the sinks."""
+        for sink in self.sinks:
+            sink.close()
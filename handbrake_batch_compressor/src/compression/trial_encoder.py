@@ -0,0 +1,157 @@
+"""
+The module provides a class to predict the compression ratio by encoding short samples of a video.
+
+A few short windows spread over the video are compressed with the same
+HandbrakeCLI options, and the results are extrapolated to the whole video.
+"""
+
+from __future__ import annotations
+
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel
+
+from handbrake_batch_compressor.src.errors.handbrake_cli_exceptions import (
+    CompressionFailedError,
+)
+
+if TYPE_CHECKING:
+    from handbrake_batch_compressor.src.compression.handbrake_compressor import (
+        HandbrakeCompressor,
+    )
+    from handbrake_batch_compressor.src.utils.ffmpeg_helpers import VideoProperties
+
+
+class TrialOptions(BaseModel):
+    """
+    Options of the trial encoding.
+
+    segments - How many sample windows to encode.
+    segment_seconds - Duration of every sample window.
+    min_predicted_saving_percent - Videos with a lower predicted saving are skipped.
+    """
+
+    segments: int = 3
+    segment_seconds: float = 10.0
+    min_predicted_saving_percent: float = 0.0
+
+    @property
+    def criteria(self) -> str:
+        """Text representation of the trial options, e.g: trial>=10.0%(3x10.0s)."""
+        return f'trial>={self.min_predicted_saving_percent}%({self.segments}x{self.segment_seconds}s)'
+
+
+class TrialPrediction(BaseModel):
+    """
+    Prediction of the compression result for the whole video.
+
+    predicted_ratio - Predicted output size divided by the original size.
+    encode_speed - Media seconds encoded per wall clock second.
+    """
+
+    predicted_size_bytes: int
+    predicted_ratio: float
+    encode_speed: float
+
+    @property
+    def predicted_saving_percent(self) -> float:
+        return (1 - self.predicted_ratio) * 100
+
+
+class TrialEncoder:
+    """
+    Predicts the compression ratio of a video by encoding its samples.
+
+    Usage example:
+        trial_encoder = TrialEncoder(compressor, TrialOptions(min_predicted_saving_percent=10))
+        prediction = await trial_encoder.predict(video, video_properties, video_file.size_bytes)
+        if prediction is not None and not trial_encoder.is_worth_compressing(prediction):
+            ...  # skip the video
+    """
+
+    def __init__(self, compressor: HandbrakeCompressor, options: TrialOptions) -> None:
+        self.compressor = compressor
+        self.options = options
+
+    def sample_windows(self, duration_seconds: float) -> list[tuple[float, float]]:
+        """
+        Return (start, duration) of the sample windows evenly spread over the video.
+
+        Returns an empty list if the video is too short for the sampling to make sense.
+        """
+        segments = max(1, self.options.segments)
+        if duration_seconds < segments * self.options.segment_seconds * 2:
+            return []
+
+        return [
+            (
+                duration_seconds * (i + 1) / (segments + 1)
+                - self.options.segment_seconds / 2,
+                self.options.segment_seconds,
+            )
+            for i in range(segments)
+        ]
+
+    def is_worth_compressing(self, prediction: TrialPrediction) -> bool:
+        return (
+            prediction.predicted_saving_percent
+            >= self.options.min_predicted_saving_percent
+        )
+
+    async def predict(
+        self,
+        video: Path,
+        properties: VideoProperties,
+        size_bytes: int,
+    ) -> TrialPrediction | None:
+        """
+        Encode the sample windows and extrapolate the result to the whole video of `size_bytes`.
+
+        Returns None if the prediction isn't possible (e.g. the video is too short
+        or the trial compression failed), so the video should just be compressed.
+        """
+        if properties.duration_seconds is None:
+            return None
+
+        windows = self.sample_windows(properties.duration_seconds)
+        if not windows:
+            return None
+
+        sampled_bytes = 0
+        sampled_seconds = 0.0
+        started = time.perf_counter()
+
+        with tempfile.TemporaryDirectory(prefix='handbrake-trial-') as tmp_dir:
+            for i, (start, duration) in enumerate(windows):
+                output = Path(tmp_dir) / f'trial_{i}{video.suffix}'
+                try:
+                    await self.compressor.compress(
+                        video,
+                        output,
+                        extra_options=[
+                            '--start-at',
+                            f'seconds:{start:.3f}',
+                            '--stop-at',
+                            f'seconds:{duration:.3f}',
+                        ],
+                        input_size_bytes=size_bytes,
+                    )
+                except CompressionFailedError:
+                    return None
+
+                sampled_bytes += output.stat().st_size
+                sampled_seconds += duration
+
+        elapsed = max(time.perf_counter() - started, 1e-6)
+        predicted_size = int(
+            sampled_bytes / sampled_seconds * properties.duration_seconds,
+        )
+
+        return TrialPrediction(
+            predicted_size_bytes=predicted_size,
+            predicted_ratio=predicted_size / max(size_bytes, 1),
+            encode_speed=sampled_seconds / elapsed,
+        )
@@ -11,3 +11,13 @@ class CompressionFailedError(Exception):
         super().__init__(
             f'Compression failed for {input_video.name}. \nCheck {error_log_file} for details.',
         )
+
+
+class CompressionIneffectiveError(Exception):
+    """Exception raised when the compression was aborted because the output would be larger than the input."""
+
+    def __init__(self, input_video: Path, projected_size_bytes: int) -> None:
+        self.projected_size_bytes = projected_size_bytes
+        super().__init__(
+            f'Compression of {input_video.name} was aborted: the output is on track to be larger than the original.',
+        )
@@ -0,0 +1,348 @@
+"""
+The module provides watching of the target path for new video files.
+
+In the watch mode the process keeps running after the initial discovery and
+feeds the videos which arrive later into the same compression queue.
+
+On Linux the changes are taken from inotify (through ctypes, no extra dependencies),
+elsewhere or if inotify isn't available (e.g. the watches limit is reached)
+the tree is rescanned periodically. Files which are still being written are
+debounced: a file is given out only once its size and modification time
+haven't changed for `settle_seconds`.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Protocol, cast
+
+from handbrake_batch_compressor.src.cli.logger import log
+from handbrake_batch_compressor.src.cli.option_types import (
+    DEFAULT_POLL_INTERVAL_SECONDS,
+    DEFAULT_SETTLE_SECONDS,
+)
+from handbrake_batch_compressor.src.utils.files import (
+    VideoFile,
+    get_video_files_by_directory,
+    is_video_file,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator, Iterable
+
+# The watcher checks if it's closed at least this often
+_TICK_SECONDS = 1.0
+
+# inotify constants from <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_WATCH_MASK = _IN_CREATE | _IN_CLOSE_WRITE | _IN_MOVED_TO
+# struct inotify_event: wd, mask, cookie, len (followed by the name)
+_INOTIFY_EVENT = struct.Struct('iIII')
+_INOTIFY_BUFFER_SIZE = 64 * 1024
+
+
+class _ChangesBackend(Protocol):
+    """Reports paths of the files which are created or changed."""
+
+    def changes(self, timeout: float) -> set[Path]: ...
+
+    def close(self) -> None: ...
+
+
+class _PollingBackend:
+    """Rescans the tree every `interval_seconds` comparing it to the previous scan."""
+
+    def __init__(self, root: Path, interval_seconds: float) -> None:
+        self.root = root
+        self.interval_seconds = interval_seconds
+
+        # The baseline is taken before the initial discovery,
+        # so files created in the meantime aren't missed
+        self._snapshot = self._scan()
+        self._next_scan = time.monotonic() + interval_seconds
+
+    def changes(self, timeout: float) -> set[Path]:
+        wait = self._next_scan - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            return set()
+
+        snapshot = self._scan()
+        changed = {
+            path
+            for path, identity in snapshot.items()
+            if self._snapshot.get(path) != identity
+        }
+        self._snapshot = snapshot
+        self._next_scan = time.monotonic() + self.interval_seconds
+        return changed
+
+    def close(self) -> None:
+        pass
+
+    def _scan(self) -> dict[Path, tuple[int, int, int]]:
+        return {
+            video_file.path: video_file.identity
+            for video_files in get_video_files_by_directory(self.root)
+            for video_file in video_files
+        }
+
+
+# inotify (and its flags in os) exist only on Linux
+if sys.platform == 'linux':
+    import ctypes.util
+
+    class _InotifyBackend:
+        """Takes the changes from inotify watches of every directory of the tree."""
+
+        def __init__(self, root: Path) -> None:
+            self.root = root
+
+            self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if self._fd < 0:
+                raise InotifyError
+
+            # Watch descriptor -> watched directory
+            self._watches: dict[int, Path] = {}
+            try:
+                self._watch_tree(root)
+            except OSError:
+                os.close(self._fd)
+                raise
+
+        def changes(self, timeout: float) -> set[Path]:
+            readable, _, _ = select.select([self._fd], [], [], timeout)
+            if not readable:
+                return set()
+
+            try:
+                data = os.read(self._fd, _INOTIFY_BUFFER_SIZE)
+            except BlockingIOError:
+                return set()
+
+            changed: set[Path] = set()
+            offset = 0
+            while offset + _INOTIFY_EVENT.size <= len(data):
+                wd, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+                name = data[
+                    offset + _INOTIFY_EVENT.size : offset + _INOTIFY_EVENT.size + length
+                ].rstrip(b'\0')
+                offset += _INOTIFY_EVENT.size + length
+
+                if mask & _IN_Q_OVERFLOW:
+                    log.warning(
+                        'Too many file system events, rescanning the target path...',
+                    )
+                    return self._scan_tree(self.root)
+                if mask & _IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    continue
+
+                directory = self._watches.get(wd)
+                if directory is None or not name:
+                    continue
+
+                path = directory / os.fsdecode(name)
+                if mask & _IN_ISDIR:
+                    # Files may be created before the new directory is watched
+                    changed |= self._watch_new_directory(path)
+                else:
+                    changed.add(path)
+
+            return changed
+
+        def close(self) -> None:
+            os.close(self._fd)
+
+        def _watch_tree(self, root: Path) -> None:
+            for directory, _, _ in os.walk(root):
+                wd = self._libc.inotify_add_watch(
+                    self._fd,
+                    os.fsencode(directory),
+                    _IN_WATCH_MASK,
+                )
+                if wd < 0:
+                    raise InotifyError(directory)
+                self._watches[wd] = Path(directory)
+
+        def _watch_new_directory(self, directory: Path) -> set[Path]:
+            try:
+                self._watch_tree(directory)
+            except OSError as e:
+                log.warning(f'New files in {directory} are not watched: {e}')
+            return self._scan_tree(directory)
+
+        def _scan_tree(self, root: Path) -> set[Path]:
+            return {
+                video_file.path
+                for video_files in get_video_files_by_directory(root)
+                for video_file in video_files
+            }
+
+
+class InotifyError(OSError):
+    """Exception raised when an inotify call fails (e.g. the limit of the watches is reached)."""
+
+    def __init__(self, directory: str | None = None) -> None:
+        errno = ctypes.get_errno()
+        action = f'watch {directory}' if directory is not None else 'initialize inotify'
+        super().__init__(errno, f"Can't {action}: {os.strerror(errno)}")
+
+
+class DirectoryWatcher:
+    """
+    Gives out the video files of the initial discovery and then the new ones as they arrive.
+
+    `accept` decides which of the new files are given out (e.g. not the outputs
+    of the compressions). Files are given out only once they are settled,
+    a file is given out again only if it's changed since and it's released
+    (its job is finished), so two jobs never compress the same file.
+
+    Usage example:
+        watcher = DirectoryWatcher(target_path, accept=classifier.is_unprocessed)
+        watcher.start()
+        for video in watcher.watch(classifier.unprocessed_files(...)):
+            ...  # runs until watcher.close() is called from another thread
+            watcher.release(video.path)  # once the job of the video is finished
+    """
+
+    def __init__(  # noqa: PLR0913 - settings of the watcher
+        self,
+        root: Path,
+        settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+        poll_interval_seconds: float = DEFAULT_POLL_INTERVAL_SECONDS,
+        accept: Callable[[Path], bool] = lambda _: True,
+        *,
+        use_inotify: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.root = root.absolute()
+        self.settle_seconds = settle_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.accept = accept
+        self.use_inotify = use_inotify
+        self._clock = clock
+
+        self._backend: _ChangesBackend | None = None
+        self._closed = threading.Event()
+        # Files waiting to settle: path -> (identity, since when it's unchanged)
+        self._pending: dict[Path, tuple[tuple[int, int, int], float]] = {}
+        # Identities of the files given out (until they are removed or changed)
+        self._given_out: dict[Path, tuple[int, int, int]] = {}
+        # Files given out whose jobs aren't finished yet (released by another thread)
+        self._in_flight: set[Path] = set()
+        self._in_flight_lock = threading.Lock()
+        self._next_prune = clock() + poll_interval_seconds
+
+    def start(self) -> None:
+        """Start watching (before the initial discovery, so no file is missed)."""
+        if self._backend is not None:
+            return
+
+        if self.use_inotify and sys.platform == 'linux':
+            try:
+                self._backend = _InotifyBackend(self.root)
+            except (OSError, AttributeError) as e:
+                log.warning(
+                    f"Can't watch the target path with inotify, polling it instead: {e}",
+                )
+            else:
+                log.info('Watching the target path for new videos...')
+                return
+
+        self._backend = _PollingBackend(self.root, self.poll_interval_seconds)
+        log.info(
+            f'Watching the target path for new videos (rescanning it every {self.poll_interval_seconds:g}s)...',
+        )
+
+    def watch(self, initial: Iterable[VideoFile]) -> Generator[VideoFile, None, None]:
+        """Yield the initial videos (unless they are still being written) and then the new ones until closed."""
+        self.start()
+        backend = cast('_ChangesBackend', self._backend)
+
+        try:
+            for video_file in initial:
+                if self._closed.is_set():
+                    return
+                if time.time() - video_file.mtime_ns / 1e9 >= self.settle_seconds:
+                    yield self._give_out(video_file)
+                else:
+                    self._pending[video_file.path] = (
+                        video_file.identity,
+                        self._clock(),
+                    )
+
+            while not self._closed.is_set():
+                for path in backend.changes(timeout=_TICK_SECONDS):
+                    if is_video_file(path.name) and self.accept(path):
+                        self._observe(path)
+                yield from self._settled_files()
+                self._prune_given_out()
+        finally:
+            backend.close()
+
+    def close(self) -> None:
+        """Stop watching, the generator returns within a second (it may be run by another thread)."""
+        self._closed.set()
+
+    def release(self, path: Path) -> None:
+        """Let the file be given out again if it changes, once its job is finished (it may be called by another thread)."""
+        with self._in_flight_lock:
+            self._in_flight.discard(path)
+
+    def _give_out(self, video_file: VideoFile) -> VideoFile:
+        self._given_out[video_file.path] = video_file.identity
+        with self._in_flight_lock:
+            self._in_flight.add(video_file.path)
+        return video_file
+
+    def _is_in_flight(self, path: Path) -> bool:
+        with self._in_flight_lock:
+            return path in self._in_flight
+
+    def _observe(self, path: Path) -> None:
+        """Start (or restart) waiting for the file to settle."""
+        video_file = VideoFile.from_path(path)
+        if video_file.size_bytes == 0 and video_file.mtime_ns == 0:
+            # Removed right away
+            self._pending.pop(path, None)
+            return
+        self._pending[path] = (video_file.identity, self._clock())
+
+    def _settled_files(self) -> Generator[VideoFile, None, None]:
+        now = self._clock()
+        for path, (identity, since) in list(self._pending.items()):
+            video_file = VideoFile.from_path(path)
+            if video_file.mtime_ns == 0:
+                del self._pending[path]
+            elif video_file.identity != identity:
+                self._pending[path] = (video_file.identity, now)
+            elif now - since >= self.settle_seconds and not self._is_in_flight(path):
+                # Changes of files whose jobs are queued or running wait until they finish
+                del self._pending[path]
+                if self._given_out.get(path) != identity and self.accept(path):
+                    yield self._give_out(video_file)
+
+    def _prune_given_out(self) -> None:
+        """Forget the given out files which are removed or changed since (e.g. finalized), so they don't pile up."""
+        now = self._clock()
+        if now < self._next_prune:
+            return
+        self._next_prune = now + self.poll_interval_seconds
+
+        for path, identity in list(self._given_out.items()):
+            if VideoFile.from_path(path).identity != identity:
+                del self._given_out[path]
@@ -2,15 +2,18 @@
 The module provides functions to get the resolution of a video.
 
 It will be used for smart filters.
+
+PyAV and NumPy take a good part of the startup time, so they are imported
+only when a video is probed (e.g. `--help` doesn't need them).
 """
 
 from __future__ import annotations
 
 import functools
+import itertools
 from fractions import Fraction
 from typing import TYPE_CHECKING
 
-import av
 from pydantic import BaseModel
 
 if TYPE_CHECKING:
@@ -80,35 +83,87 @@ class VideoResolution(BaseModel):
 
 
 class VideoProperties(BaseModel):
-    """Basic video properties. (resolution, frame rate, bitrate)"""
+    """Basic video properties. (resolution, frame rate, bitrate, duration)"""
 
     resolution: VideoResolution
     frame_rate: float
     bitrate_kbytes: int
+    duration_seconds: float | None = None
+
+
+# How many packets can be read to estimate FPS of a VFR video
+DEFAULT_FPS_PACKET_BUDGET = 600
+
+# Timestamps are sampled at the start, the middle, etc. of the video
+# to not be fooled by a different frame rate of the intro
+FPS_SAMPLE_POINTS = 3
 
 
 def estimate_fps_from_timestamps(
     container: InputContainer,
     stream: VideoStream,
-) -> Fraction | None:
-    """Estimate average FPS from timestamps for VFR (Variable Frame Rate) video."""
-    timestamps: list[Fraction] = [
-        Fraction(packet.pts, packet.time_base.denominator)  # Convert to Fraction
-        for packet in container.demux(stream)
-        if packet.pts is not None and packet.time_base is not None
-    ]
+    packet_budget: int = DEFAULT_FPS_PACKET_BUDGET,
+) -> float | None:
+    """
+    Estimate average FPS from timestamps for VFR (Variable Frame Rate) video.
+
+    Instead of demuxing the whole video, it reads at most `packet_budget`
+    packets split between a few points of the video.
+    """
+    import av.error
+    import numpy as np
+
+    time_base = stream.time_base
+    if time_base is None:
+        return None
+
+    sample_points = [0]
+    if stream.duration:
+        sample_points = [
+            stream.duration * i // FPS_SAMPLE_POINTS for i in range(FPS_SAMPLE_POINTS)
+        ]
+    packets_per_point = max(2, packet_budget // len(sample_points))
+
+    total_span = 0
+    total_intervals = 0
+
+    for point in sample_points:
+        if point > 0:
+            try:
+                container.seek(point, stream=stream)
+            except av.error.FFmpegError:
+                break
+
+        pts = np.fromiter(
+            itertools.islice(
+                (
+                    packet.pts
+                    for packet in container.demux(stream)
+                    if packet.pts is not None
+                ),
+                packets_per_point,
+            ),
+            dtype=np.int64,
+        )
+        if pts.size < 2:  # noqa: PLR2004 - at least one interval is needed
+            continue
+
+        # Packets are in the decoding order, so the timestamps are shuffled by B-frames
+        pts.sort()
+        total_span += int(pts[-1] - pts[0])
+        total_intervals += pts.size - 1
 
-    if len(timestamps) > 1:
-        intervals = [j - i for i, j in zip(timestamps[:-1], timestamps[1:])]
-        avg_interval = sum(intervals, start=Fraction(0)) / len(intervals)
-        return Fraction(1, avg_interval) if avg_interval > 0 else None
+    if total_span <= 0:
+        return None
 
-    return None
+    avg_interval = Fraction(total_span, total_intervals) * time_base
+    return float(1 / avg_interval)
 
 
 def extract_bitrate_from_stream(
     container: InputContainer,
     stream: VideoStream,
+    fps_packet_budget: int = DEFAULT_FPS_PACKET_BUDGET,
 ) -> float:
     """
     Estimate FPS using the following methods:
@@ -121,19 +176,27 @@ def extract_bitrate_from_stream(
     if fps is None or fps == 0:
         fps = stream.average_rate
     if fps is None or fps == 0:
-        fps = estimate_fps_from_timestamps(container, stream)
+        fps = estimate_fps_from_timestamps(container, stream, fps_packet_budget)
     if fps is None or fps == 0:
         fps = 1.0
 
     return float(fps)
 
 
-def get_video_properties(video_path: Path) -> VideoProperties | None:
+def get_video_properties(
+    video_path: Path,
+    fps_packet_budget: int = DEFAULT_FPS_PACKET_BUDGET,
+) -> VideoProperties | None:
     """
     Get the resolution, frame rate and bitrate of a video as a VideoProperties object.
 
     If, for some reason, any of this properties can't be determined, return None.
+
+    `fps_packet_budget` limits how many packets can be read to estimate
+    the frame rate of VFR videos.
     """
+    import av
+
     try:
         probe = av.open(video_path)
         stream = probe.streams.video[0]
@@ -141,8 +204,11 @@ def get_video_properties(video_path: Path) -> VideoProperties | None:
             width=stream.width,
             height=stream.height,
         )
-        frame_rate = extract_bitrate_from_stream(probe, stream)
+        frame_rate = extract_bitrate_from_stream(probe, stream, fps_packet_budget)
         bitrate_kbytes = probe.bit_rate // 1024
+        duration_seconds = (
+            probe.duration / av.time_base if probe.duration is not None else None
+        )
         probe.close()
     except (av.InvalidDataError, IndexError):
         return None
@@ -151,4 +217,5 @@ def get_video_properties(video_path: Path) -> VideoProperties | None:
             resolution=resolution,
             frame_rate=frame_rate,
             bitrate_kbytes=bitrate_kbytes,
+            duration_seconds=duration_seconds,
         )
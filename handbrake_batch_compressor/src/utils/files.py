@@ -1,8 +1,19 @@
 """The module provides helper functions to work with files."""
 
+from __future__ import annotations
+
+import contextlib
 import os
-from collections.abc import Generator
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+APP_NAME = 'handbrake-batch-compressor'
 
 supported_videofile_extensions = {
     'mp4',
@@ -16,6 +27,14 @@ supported_videofile_extensions = {
     '3gp',
 }
 
+# Precomputed lookup of the lowercase suffixes (e.g. '.mp4')
+_supported_videofile_suffixes = frozenset(
+    f'.{ext}' for ext in supported_videofile_extensions
+)
+
+# Directories are scanned in parallel (it mostly waits for I/O, e.g. on network shares)
+DEFAULT_DISCOVERY_WORKERS = 8
+
 
 def human_readable_size(size: float, decimal_places: int = 2) -> str:
     """
@@ -36,9 +55,174 @@ def human_readable_size(size: float, decimal_places: int = 2) -> str:
     return f'{size:.{decimal_places}f} PB'
 
 
-def get_video_files_paths(path: Path) -> Generator[Path, None, None]:
+class InvalidSizeError(ValueError):
+    """Exception raised for an invalid size."""
+
+    def __init__(self, size: str) -> None:
+        super().__init__(
+            f'Invalid size: {size} (the right format is <NUMBER>[B|KB|MB|GB|TB], e.g. 10GB)',
+        )
+
+
+_SIZE_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024**2, 'GB': 1024**3, 'TB': 1024**4}
+
+
+def parse_size(size: str) -> int:
+    """
+    Parse a human-readable size into bytes (units are powers of 1024, case insensitive).
+
+    Usage example:
+        parse_size('1.5GB')  # 1610612736
+        parse_size('512')  # 512 (bytes)
+    """
+    text = str(size).strip().upper().replace(' ', '')
+    number = text.rstrip('KMGTB')
+    unit = text[len(number) :] or 'B'
+
+    if unit not in _SIZE_UNITS:
+        raise InvalidSizeError(size)
+    try:
+        value = float(number)
+    except ValueError:
+        raise InvalidSizeError(size) from None
+    if value < 0:
+        raise InvalidSizeError(size)
+
+    return int(value * _SIZE_UNITS[unit])
+
+
+def get_app_cache_dir() -> Path:
+    """
+    Return the directory where the application keeps its caches.
+
+    - Windows: %LOCALAPPDATA%/handbrake-batch-compressor
+    - macOS: ~/Library/Caches/handbrake-batch-compressor
+    - Linux: $XDG_CACHE_HOME/handbrake-batch-compressor (~/.cache by default)
+    """
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or Path.home() / 'AppData' / 'Local'
+    elif sys.platform == 'darwin':
+        base = Path.home() / 'Library' / 'Caches'
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+
+    return Path(base) / APP_NAME
+
+
+@dataclass(slots=True, frozen=True)
+class VideoFile:
+    """
+    A video file with its metadata taken once at the discovery.
+
+    The metadata is carried through filtering, scheduling, statistics and
+    finalization, so the file isn't stat()ed again (every stat is a round trip
+    on network shares). The size, modification time and inode also identify
+    the file in the probe cache and in the ledger.
+    """
+
+    path: Path
+    size_bytes: int
+    mtime_ns: int
+    inode: int
+
+    @classmethod
+    def from_dir_entry(cls, entry: os.DirEntry[str]) -> VideoFile:
+        """Create the record from the entry of os.scandir (its stat is cached by the entry)."""
+        stat = entry.stat()
+        return cls(
+            path=Path(entry.path),
+            size_bytes=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            # The stat of the entry has no inode on Windows
+            inode=stat.st_ino or entry.inode(),
+        )
+
+    @classmethod
+    def from_path(cls, path: Path) -> VideoFile:
+        """
+        Create the record by a stat of the path.
+
+        The metadata of a missing or unreadable file is zeroed,
+        it fails later like any other broken video.
+        """
+        try:
+            stat = path.stat()
+        except OSError:
+            return cls(path=path, size_bytes=0, mtime_ns=0, inode=0)
+
+        return cls(
+            path=path,
+            size_bytes=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            inode=stat.st_ino,
+        )
+
+    @property
+    def identity(self) -> tuple[int, int, int]:
+        """Size, modification time and inode (if any of them changes, the file is changed)."""
+        return (self.size_bytes, self.mtime_ns, self.inode)
+
+
+def is_video_file(filename: str) -> bool:
+    """Check if the file has one of the supported video extensions (case insensitive)."""
+    return os.path.splitext(filename)[1].lower() in _supported_videofile_suffixes  # noqa: PTH122 - it's faster than Path for plain names
+
+
+def _scan_directory(directory: str) -> tuple[list[VideoFile], list[str]]:
+    """Return video files and subdirectories of the directory."""
+    video_files: list[VideoFile] = []
+    subdirectories: list[str] = []
+
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif is_video_file(entry.name) and entry.is_file():
+                    with contextlib.suppress(OSError):  # removed since it's listed
+                        video_files.append(VideoFile.from_dir_entry(entry))
+    except OSError:
+        # Unreadable directories are skipped (like os.walk does)
+        return [], []
+
+    return video_files, subdirectories
+
+
+def get_video_files_by_directory(
+    path: Path,
+    workers: int = DEFAULT_DISCOVERY_WORKERS,
+) -> Generator[list[VideoFile], None, None]:
+    """
+    Get video files (with absolute paths) in a directory, grouped by their parent directory.
+
+    Subdirectories are scanned in parallel and every directory is yielded
+    as soon as it's scanned, so the files can be processed while the rest
+    of the tree is still being discovered.
+    """
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='discovery')
+    pending: set[Future[tuple[list[VideoFile], list[str]]]] = {
+        executor.submit(_scan_directory, str(path.absolute())),
+    }
+
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                video_files, subdirectories = future.result()
+                pending.update(
+                    executor.submit(_scan_directory, subdirectory)
+                    for subdirectory in subdirectories
+                )
+                if video_files:
+                    yield video_files
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_video_files_paths(
+    path: Path,
+    workers: int = DEFAULT_DISCOVERY_WORKERS,
+) -> Generator[Path, None, None]:
     """Get all video files paths in a directory."""
-    for root, _, files in os.walk(path):
-        for file in files:
-            if file.endswith(tuple(supported_videofile_extensions)):
-                yield (Path(root) / file).absolute()
+    for video_files in get_video_files_by_directory(path, workers):
+        yield from (video_file.path for video_file in video_files)
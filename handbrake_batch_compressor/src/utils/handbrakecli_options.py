@@ -0,0 +1,38 @@
+"""
+The module provides reading of the user's HandbrakeCLI options.
+
+The options are passed to HandbrakeCLI as they are, but a few of them
+matter for the tool itself (e.g. the encoder or the target bitrate).
+"""
+
+from __future__ import annotations
+
+
+def option_value(options: list[str], *names: str) -> str | None:
+    """Return the value of the option by any of its names (e.g. `-e x265` or `--encoder=x265`)."""
+    for i, option in enumerate(options):
+        if option in names and i + 1 < len(options):
+            return options[i + 1]
+        for name in names:
+            if name.startswith('--') and option.startswith(f'{name}='):
+                return option.split('=', 1)[1]
+    return None
+
+
+def target_bitrate_kbits(options: list[str]) -> int | None:
+    """
+    Return the average bitrate (kb/s) of the video and audio tracks the options encode at.
+
+    None if the video bitrate isn't set (e.g. the quality is constant).
+    """
+    video_bitrate = option_value(options, '-b', '--vb')
+    if video_bitrate is None:
+        return None
+
+    audio_bitrates = option_value(options, '-B', '--ab') or ''
+    try:
+        return int(float(video_bitrate)) + sum(
+            int(float(bitrate)) for bitrate in audio_bitrates.split(',') if bitrate
+        )
+    except ValueError:
+        return None
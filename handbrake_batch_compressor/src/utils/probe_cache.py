@@ -0,0 +1,185 @@
+"""
+The module provides a persistent cache of the video properties.
+
+Probing a video requires opening and reading it, which is slow for large
+libraries (especially on network shares), so the properties are stored in
+an SQLite database and reused while the file stays the same.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from handbrake_batch_compressor.src.utils.ffmpeg_helpers import (
+    VideoProperties,
+    get_video_properties,
+)
+from handbrake_batch_compressor.src.utils.files import get_app_cache_dir
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from handbrake_batch_compressor.src.utils.files import VideoFile
+
+DEFAULT_MAX_ENTRIES = 1_000_000
+
+# Changes are committed in batches to not sync the database after each probe
+_COMMIT_EVERY = 100
+
+# Bump it when VideoProperties changes, so the outdated properties are dropped
+_SCHEMA_VERSION = 2
+
+
+class ProbeCache:
+    """
+    Cache of the video properties keyed by the file identity.
+
+    A file is identified by its path, size, modification time and inode,
+    if any of them changes the cached properties are considered stale.
+
+    Unreadable (corrupted) videos are cached too, so they aren't reopened
+    on every run.
+
+    When the cache is closed and it has grown beyond `max_entries`,
+    the least recently used entries are evicted.
+
+    Usage example:
+        cache = ProbeCache(ProbeCache.default_path())
+        properties = cache.get_or_probe(VideoFile.from_path(Path('video.mp4')))
+        cache.close()
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.db_path = db_path
+        self.max_entries = max_entries
+
+        # Probing happens in several threads, so the connection is shared under a lock
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        if self._connection.execute('PRAGMA user_version').fetchone()[0] != (
+            _SCHEMA_VERSION
+        ):
+            self._connection.execute('DROP TABLE IF EXISTS video_properties')
+            self._connection.execute(f'PRAGMA user_version = {_SCHEMA_VERSION}')
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS video_properties (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                properties TEXT,
+                last_used INTEGER NOT NULL
+            )
+            """,
+        )
+        self._connection.execute(
+            """
+            CREATE INDEX IF NOT EXISTS video_properties_last_used
+            ON video_properties (last_used)
+            """,
+        )
+        self._connection.commit()
+
+        self._now = int(time.time())
+        self._pending_changes = 0
+
+    @staticmethod
+    def default_path() -> Path:
+        """Return the default location of the cache database."""
+        return get_app_cache_dir() / 'probe_cache.sqlite'
+
+    def get_or_probe(
+        self,
+        video_file: VideoFile,
+        probe: Callable[[Path], VideoProperties | None] = get_video_properties,
+    ) -> VideoProperties | None:
+        """Return the cached properties of the video or probe it and cache the result."""
+        video = video_file.path
+        key = str(video.absolute())
+        identity = video_file.identity
+
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT size, mtime_ns, inode, properties FROM video_properties WHERE path = ?',
+                (key,),
+            ).fetchone()
+
+            if row is not None and tuple(row[:3]) == identity:
+                self._connection.execute(
+                    'UPDATE video_properties SET last_used = ? WHERE path = ? AND last_used < ?',
+                    (self._now, key, self._now),
+                )
+                self._register_change()
+                return (
+                    VideoProperties.model_validate_json(row[3])
+                    if row[3] is not None
+                    else None
+                )
+
+        properties = probe(video)
+
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO video_properties VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    key,
+                    *identity,
+                    properties.model_dump_json() if properties is not None else None,
+                    self._now,
+                ),
+            )
+            self._register_change()
+
+        return properties
+
+    def clear(self) -> None:
+        """Remove all the cached properties."""
+        with self._lock:
+            self._connection.execute('DELETE FROM video_properties')
+            self._connection.commit()
+            self._pending_changes = 0
+
+    def __len__(self) -> int:
+        """Count of the cached videos."""
+        with self._lock:
+            return self._connection.execute(
+                'SELECT COUNT(*) FROM video_properties',
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        """Evict the least recently used entries and save the cache."""
+        with self._lock:
+            self._evict()
+            self._connection.commit()
+            self._connection.close()
+
+    def _register_change(self) -> None:
+        self._pending_changes += 1
+        if self._pending_changes >= _COMMIT_EVERY:
+            self._connection.commit()
+            self._pending_changes = 0
+
+    def _evict(self) -> None:
+        self._connection.execute(
+            """
+            DELETE FROM video_properties WHERE path IN (
+                SELECT path FROM video_properties
+                ORDER BY last_used DESC
+                LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,),
+        )
@@ -0,0 +1,74 @@
+"""
+The module provides deterministic sharding of the video files between hosts.
+
+Several hosts may process the same library (e.g. on a NAS) independently:
+every host takes only the files of its shard, so they never touch the same file.
+
+A file belongs to a shard by a stable hash of its path relative to the target path
+(with `/` separators), so every host agrees on it regardless of its OS and of where
+the library is mounted. Compressed and incomplete outputs belong to the shard
+of their original file.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from pathlib import PurePath
+
+
+class InvalidShardError(ValueError):
+    """Exception raised for an invalid shard."""
+
+    def __init__(self, shard: str) -> None:
+        super().__init__(
+            f'Invalid shard: {shard} (the right format is <index>/<count>, e.g. 1/3)',
+        )
+
+
+class Shard(BaseModel):
+    """
+    One of `count` disjoint parts of the video files (`index` starts from 1).
+
+    Usage example:
+        shard = Shard.parse_shard('2/3')
+        shard.owns(PurePosixPath('movies/video.mp4'))
+    """
+
+    index: int
+    count: int
+
+    def __str__(self) -> str:
+        """Shard representation e.g: 2/3."""
+        return f'{self.index}/{self.count}'
+
+    @staticmethod
+    def parse_shard(shard: str) -> Shard:
+        index, separator, count = shard.partition('/')
+        try:
+            result = Shard(index=int(index), count=int(count))
+        except ValueError:
+            raise InvalidShardError(shard) from None
+
+        if not separator or not 1 <= result.index <= result.count:
+            raise InvalidShardError(shard)
+
+        return result
+
+    def owns(self, relative_path: PurePath) -> bool:
+        """Check if the file (by its path relative to the target path) belongs to the shard."""
+        return shard_of(relative_path, self.count) == self.index
+
+
+def shard_of(relative_path: PurePath, count: int) -> int:
+    """Return the shard (from 1 to `count`) of the file by its path relative to the target path."""
+    # Built-in hash() is randomized per process, so a stable digest is used
+    digest = hashlib.blake2b(
+        relative_path.as_posix().encode('utf-8'),
+        digest_size=8,
+    ).digest()
+    return int.from_bytes(digest, 'big') % count + 1
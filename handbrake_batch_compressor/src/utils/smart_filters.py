@@ -35,6 +35,15 @@ class SmartFilter:
         self.minimal_bitrate_kbytes = minimal_bitrate_kbytes
         self.minimal_frame_rate = minimal_frame_rate
 
+    @property
+    def criteria(self) -> str:
+        """Text representation of the filter criteria, e.g: resolution>=1280x720;bitrate>=None;fps>=30."""
+        return (
+            f'resolution>={self.minimal_resolution};'
+            f'bitrate>={self.minimal_bitrate_kbytes};'
+            f'fps>={self.minimal_frame_rate}'
+        )
+
     def should_compress(self, video_properties: VideoProperties) -> bool:
         actual_resolution = video_properties.resolution
         actual_bitrate_kbytes = video_properties.bitrate_kbytes
@@ -1,11 +1,27 @@
-"""The module provides a class to install a software on Windows, Linux, and macOS."""
+"""
+The module provides a class to install a software on Windows, Linux, and macOS.
 
+Checking a software (e.g. `ffmpeg -version`) spawns a process on every start,
+so the binaries which passed the check are remembered in the application cache
+directory along with their modification time. A binary is checked again only
+if it's changed (e.g. updated) or another one is found in the PATH.
+"""
+
+from __future__ import annotations
+
+import contextlib
 import os
+import shlex
+import shutil
 import subprocess
+from pathlib import Path
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
 from handbrake_batch_compressor.src.cli.logger import log
+from handbrake_batch_compressor.src.utils.files import get_app_cache_dir
+
+TOOLS_CACHE_FILENAME = 'tools.json'
 
 
 class InstallCommand(BaseModel):
@@ -40,6 +56,75 @@ class InstallCommand(BaseModel):
         )
 
 
+class CheckedBinary(BaseModel):
+    """A binary which passed the check of its software."""
+
+    path: str
+    mtime_ns: int
+
+
+class CheckedBinaries(BaseModel):
+    """Content of the tools cache: checked binaries by their command (e.g. ffmpeg)."""
+
+    binaries: dict[str, CheckedBinary] = {}
+
+
+class ToolsCache:
+    """
+    Remembers the binaries which passed the check, so they aren't checked on every start.
+
+    Usage example:
+        cache = ToolsCache(get_app_cache_dir() / TOOLS_CACHE_FILENAME)
+        if not cache.is_checked('ffmpeg', binary):
+            ...  # run `ffmpeg -version`
+            cache.remember('ffmpeg', binary)
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+        try:
+            self._checked = CheckedBinaries.model_validate_json(
+                path.read_text(encoding='utf-8'),
+            )
+        except (OSError, ValidationError):
+            self._checked = CheckedBinaries()
+
+    def is_checked(self, command: str, binary: Path) -> bool:
+        """Check if the binary of the command is the same one which passed the check."""
+        checked = self._checked.binaries.get(command)
+        return (
+            checked is not None
+            and checked.path == str(binary)
+            and checked.mtime_ns == _mtime_ns(binary)
+        )
+
+    def remember(self, command: str, binary: Path) -> None:
+        """Remember that the binary of the command passed the check."""
+        mtime_ns = _mtime_ns(binary)
+        if mtime_ns is None:
+            return
+
+        self._checked.binaries[command] = CheckedBinary(
+            path=str(binary),
+            mtime_ns=mtime_ns,
+        )
+
+        # The cache is only an optimization (e.g. the home directory may be read-only)
+        with contextlib.suppress(OSError):
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+            temp_path.write_text(self._checked.model_dump_json(), encoding='utf-8')
+            temp_path.replace(self.path)
+
+
+def _mtime_ns(binary: Path) -> int | None:
+    try:
+        return binary.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
 class Software:
     """
     Class representing a software to install.
@@ -47,33 +132,53 @@ class Software:
     You should specify how to check if the software is installed and how to install it.
     """
 
-    def __init__(self, install_cmd: InstallCommand, check_cmd: str) -> None:
+    def __init__(
+        self,
+        install_cmd: InstallCommand,
+        check_cmd: str,
+        cache: ToolsCache | None = None,
+    ) -> None:
         self.check_cmd = check_cmd
         self.install_cmd = install_cmd
+        self.cache = cache
 
     def is_installed(self) -> bool:
+        """Check if the software is in the PATH and its check command succeeds (unless it's cached)."""
+        command, *args = shlex.split(self.check_cmd)
+        binary_path = shutil.which(command)
+        if binary_path is None:
+            return False
+
+        binary = Path(binary_path)
+        if self.cache is not None and self.cache.is_checked(command, binary):
+            return True
+
         try:
             subprocess.run(  # noqa: S603 , warning about unsanitized subprocess
-                self.check_cmd,
+                [binary, *args],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
                 check=True,
             )
-        except subprocess.CalledProcessError:
+        except (subprocess.CalledProcessError, OSError):
             return False
-        else:
-            return True
+
+        if self.cache is not None:
+            self.cache.remember(command, binary)
+        return True
 
     def install(self) -> None:
         self.install_cmd.run()
 
 
-def setup_software() -> None:
+def setup_software(*, install_handbrake_cli: bool = True) -> None:
     """
     Install all the required software for the script to work.
 
-    Including: FFmpeg and Handbrake CLI.
+    Including: FFmpeg and Handbrake CLI (unless `install_handbrake_cli` is False).
     """
+    cache = ToolsCache(get_app_cache_dir() / TOOLS_CACHE_FILENAME)
+
     ffmpeg = Software(
         install_cmd=InstallCommand(
             win='winget install ffmpeg',
@@ -81,6 +186,7 @@ def setup_software() -> None:
             mac='brew install ffmpeg',
         ),
         check_cmd='ffmpeg -version',
+        cache=cache,
     )
 
     handbrake_cli = Software(
@@ -90,6 +196,7 @@ def setup_software() -> None:
             mac='brew install handbrake-cli',
         ),
         check_cmd='handbrakecli --version',
+        cache=cache,
     )
 
     if not ffmpeg.is_installed():
@@ -98,6 +205,9 @@ def setup_software() -> None:
 
     log.success('FFmpeg is installed.')
 
+    if not install_handbrake_cli:
+        return
+
     if not handbrake_cli.is_installed():
         log.wait('Installing Handbrake CLI...')
         handbrake_cli.install()
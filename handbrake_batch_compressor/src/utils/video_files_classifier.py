@@ -0,0 +1,174 @@
+"""
+The module provides a class to sort out discovered video files by their processing state.
+
+The state is determined by the extensions added by the compressor:
+    - filename.compressed.ext - complete file (the original one is processed too)
+    - filename.compressing.ext - incomplete file (the compression was interrupted)
+    - filename.ext - unprocessed file
+
+With a shard only the files of the shard are classified (including the complete
+and incomplete ones of its originals), so hosts processing other shards
+of the same library never lose their incomplete files.
+
+With leases incomplete files which are being compressed by other instances
+right now (their lease is alive) are left in place along with their originals.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from handbrake_batch_compressor.src.cli.logger import log
+
+if TYPE_CHECKING:
+    from collections.abc import Generator, Iterable
+    from pathlib import Path
+
+    from handbrake_batch_compressor.src.compression.job_lease import JobLeases
+    from handbrake_batch_compressor.src.utils.files import VideoFile
+    from handbrake_batch_compressor.src.utils.sharding import Shard
+
+
+def remove_incomplete_files(
+    incomplete_files: Iterable[Path],
+    leases: JobLeases | None = None,
+) -> set[Path]:
+    """
+    Remove incomplete files left after an interrupted compression.
+
+    With leases only the files with dead leases are removed (the lease is taken
+    over for the removal), the ones being compressed by other instances are returned.
+    """
+    leased_files: set[Path] = set()
+    for file in incomplete_files:
+        if leases is not None and not leases.acquire(file):
+            leased_files.add(file)
+            continue
+
+        try:
+            if file.exists():
+                try:
+                    file.unlink()
+                except OSError as e:
+                    log.error(f'Failed to remove file {file}: {e}')
+            else:
+                log.error(f'File {file} does not exist, skipping.')
+        finally:
+            if leases is not None:
+                leases.release(file)
+
+    return leased_files
+
+
+class VideoFilesClassifier:
+    """
+    Sorts out the video files and streams the unprocessed ones.
+
+    The files must be grouped by their directory since a complete file
+    is always placed next to its original.
+
+    Usage example:
+        classifier = VideoFilesClassifier('compressing', 'compressed', shard, path)
+        for video in classifier.unprocessed_files(get_video_files_by_directory(path)):
+            ...
+        print(classifier.complete_count)
+    """
+
+    def __init__(
+        self,
+        progress_ext: str,
+        complete_ext: str,
+        shard: Shard | None = None,
+        root: Path | None = None,
+        leases: JobLeases | None = None,
+    ) -> None:
+        self.progress_ext = progress_ext
+        self.complete_ext = complete_ext
+        # Paths of the files are hashed relative to the root to find their shard
+        # (discovered paths are absolute, so is the root e.g. for `-t ./videos`)
+        self.shard = shard
+        self.root = root.absolute() if root is not None else None
+        self.leases = leases
+
+        self.found_count = 0
+        self.complete_count = 0
+        self.incomplete_count = 0
+        self.unprocessed_count = 0
+        # Incomplete files being compressed by other instances
+        self.leased_count = 0
+
+    def unprocessed_files(
+        self,
+        directories: Iterable[list[VideoFile]],
+    ) -> Generator[VideoFile, None, None]:
+        """
+        Yield unprocessed files of every directory as soon as it's classified.
+
+        Incomplete files are removed along the way.
+        """
+        for video_files in directories:
+            if self.shard is not None:
+                video_files = [x for x in video_files if self._in_shard(x.path)]  # noqa: PLW2901 - only the files of the shard are classified
+
+            complete_files: set[Path] = set()
+            incomplete_files: set[Path] = set()
+            unprocessed_files: dict[Path, VideoFile] = {}
+
+            for video_file in video_files:
+                file = video_file.path
+                extensions = {x.replace('.', '') for x in file.suffixes}
+                if self.complete_ext in extensions:
+                    complete_files.add(file)
+                elif self.progress_ext in extensions:
+                    incomplete_files.add(file)
+                else:
+                    unprocessed_files[file] = video_file
+
+            # Remove complete files from unprocessed
+            for complete_file in complete_files:
+                unprocessed_files.pop(self._original_file(complete_file), None)
+
+            if incomplete_files:
+                leased_files = remove_incomplete_files(incomplete_files, self.leases)
+                for leased_file in leased_files:
+                    unprocessed_files.pop(self._original_file(leased_file), None)
+                self.leased_count += len(leased_files)
+
+            self.found_count += len(video_files)
+            self.complete_count += len(complete_files)
+            self.incomplete_count += len(incomplete_files)
+            self.unprocessed_count += len(unprocessed_files)
+
+            yield from (unprocessed_files[file] for file in sorted(unprocessed_files))
+
+    def is_unprocessed(self, file: Path) -> bool:
+        """
+        Check if a single file (e.g. a newly created one) is unprocessed.
+
+        Complete and incomplete files (the outputs of the compressor), files of other
+        shards and originals which already have a complete file are not.
+        """
+        extensions = {x.replace('.', '') for x in file.suffixes}
+        if self.complete_ext in extensions or self.progress_ext in extensions:
+            return False
+        if not self._in_shard(file):
+            return False
+        return not (
+            file.parent / f'{file.stem}.{self.complete_ext}{file.suffix}'
+        ).exists()
+
+    def _original_file(self, file: Path) -> Path:
+        """Return the original of a complete or incomplete file (filename.ext_mark.ext -> filename.ext)."""
+        stem = file.stem
+        for mark in (self.complete_ext, self.progress_ext):
+            stem = stem.replace(f'.{mark}', '')
+        return file.parent / f'{stem}{file.suffix}'
+
+    def _in_shard(self, file: Path) -> bool:
+        if self.shard is None:
+            return True
+
+        original_file = self._original_file(file)
+        if self.root is not None and original_file.is_relative_to(self.root):
+            original_file = original_file.relative_to(self.root)
+        return self.shard.owns(original_file)
@@ -0,0 +1,113 @@
+from pathlib import Path
+
+import pytest
+
+from handbrake_batch_compressor.src.compression.batch_throughput import (
+    BatchThroughput,
+)
+from handbrake_batch_compressor.src.compression.probe_pipeline import ProbedVideo
+from handbrake_batch_compressor.src.utils.ffmpeg_helpers import (
+    VideoProperties,
+    VideoResolution,
+)
+from handbrake_batch_compressor.src.utils.files import VideoFile
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def probed(name: str, duration: float, *, should_compress: bool = True) -> ProbedVideo:
+    return ProbedVideo(
+        file=VideoFile(path=Path(name), size_bytes=0, mtime_ns=0, inode=0),
+        properties=VideoProperties(
+            resolution=VideoResolution(width=1280, height=720),
+            frame_rate=30,
+            bitrate_kbytes=2000,
+            duration_seconds=duration,
+        ),
+        should_compress=should_compress,
+    )
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def test_eta_is_unknown_before_any_progress(clock: FakeClock):
+    throughput = BatchThroughput(clock)
+    throughput.add_discovered()
+    throughput.add_probed(probed('a.mp4', 60))
+
+    assert throughput.eta_seconds is None
+
+    throughput.start_job(Path('a.mp4'), 60)
+    clock.now = 10
+
+    assert throughput.eta_seconds is None
+
+
+def test_eta_from_remaining_media(clock: FakeClock):
+    throughput = BatchThroughput(clock)
+    for name, duration in [('a.mp4', 60), ('b.mp4', 120), ('c.mp4', 600)]:
+        throughput.add_discovered()
+        throughput.add_probed(
+            probed(name, duration, should_compress=name != 'c.mp4'),
+        )
+
+    throughput.start_job(Path('a.mp4'), 60)
+    clock.now = 10
+    throughput.update_job(Path('a.mp4'), 50.0)
+
+    # 30 media seconds in 10 seconds, 30 + 120 media seconds are left
+    assert throughput.media_seconds_per_second == 3
+    assert throughput.remaining_media_seconds == 150
+    assert throughput.eta_seconds == 50
+
+    clock.now = 20
+    throughput.finish_job(Path('a.mp4'), completed=True)
+
+    assert throughput.encoded_media_seconds == 60
+    assert throughput.eta_seconds == 40
+
+
+def test_not_probed_videos_are_extrapolated(clock: FakeClock):
+    throughput = BatchThroughput(clock)
+    for _ in range(4):
+        throughput.add_discovered()
+    throughput.add_probed(probed('a.mp4', 60))
+    throughput.add_probed(probed('b.mp4', 100))
+
+    # 2 not probed videos are expected to be as long as the probed ones on average
+    assert throughput.remaining_media_seconds == 320
+
+
+def test_uncompleted_job_counts_only_its_progress(clock: FakeClock):
+    throughput = BatchThroughput(clock)
+    throughput.add_discovered()
+    throughput.add_probed(probed('a.mp4', 100))
+
+    throughput.start_job(Path('a.mp4'), 100)
+    clock.now = 10
+    throughput.update_job(Path('a.mp4'), 25.0)
+    throughput.finish_job(Path('a.mp4'), completed=False)
+
+    assert throughput.encoded_media_seconds == 25
+    assert throughput.remaining_media_seconds == 0
+
+
+def test_skipped_videos_leave_the_queue(clock: FakeClock):
+    throughput = BatchThroughput(clock)
+    for name, duration in [('a.mp4', 60), ('b.mp4', 120)]:
+        throughput.add_discovered()
+        throughput.add_probed(probed(name, duration))
+
+    # E.g. b.mp4 is compressed by another instance
+    throughput.skip_probed(probed('b.mp4', 120))
+
+    assert throughput.remaining_media_seconds == 60
@@ -0,0 +1,427 @@
+import asyncio
+import json
+import shutil
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+import pytest
+
+from handbrake_batch_compressor.src.cli.handbrake_cli_output_capturer import (
+    HandbrakeProgressInfo,
+)
+from handbrake_batch_compressor.src.cli.option_types import (
+    EffectiveCompressionBehavior,
+    IneffectiveCompressionBehavior,
+    JobOrder,
+)
+from handbrake_batch_compressor.src.compression.compression_manager import (
+    CompressionManager,
+    CompressionManagerOptions,
+)
+from handbrake_batch_compressor.src.compression.disk_space_admission import (
+    DiskSpaceAdmission,
+)
+from handbrake_batch_compressor.src.compression.job_lease import JobLeases
+from handbrake_batch_compressor.src.compression.job_ledger import JobLedger, JobState
+from handbrake_batch_compressor.src.compression.telemetry import (
+    JsonLinesWriter,
+    Telemetry,
+    open_events_target,
+)
+from handbrake_batch_compressor.src.errors.handbrake_cli_exceptions import (
+    CompressionFailedError,
+    CompressionIneffectiveError,
+)
+from handbrake_batch_compressor.src.utils.directory_watcher import DirectoryWatcher
+from handbrake_batch_compressor.src.utils.files import (
+    VideoFile,
+    get_video_files_by_directory,
+)
+from handbrake_batch_compressor.src.utils.smart_filters import SmartFilter
+from handbrake_batch_compressor.src.utils.video_files_classifier import (
+    VideoFilesClassifier,
+)
+
+
+class FakeCompressor:
+    """Compressor which just writes a half-sized copy of the input video."""
+
+    def __init__(
+        self,
+        fail_on: str | None = None,
+        abort_on: str | None = None,
+    ) -> None:
+        self.handbrakecli_options = ''
+        self.early_abort = None
+        self.fail_on = fail_on
+        self.abort_on = abort_on
+        self.active_jobs = 0
+        self.max_active_jobs = 0
+        self.compressed: list[str] = []
+
+    async def compress(
+        self,
+        input_video: Path,
+        output_video: Path,
+        on_update: Callable[[HandbrakeProgressInfo], None] = lambda _: None,
+        input_size_bytes: int | None = None,  # noqa: ARG002
+    ) -> None:
+        self.compressed.append(input_video.name)
+        self.active_jobs += 1
+        self.max_active_jobs = max(self.max_active_jobs, self.active_jobs)
+        try:
+            output_video.write_bytes(b'\0' * 10)
+            on_update(
+                HandbrakeProgressInfo(
+                    progress=50.0,
+                    fps_current=None,
+                    fps_average=None,
+                    eta=None,
+                ),
+            )
+            await asyncio.sleep(0.05)
+            if input_video.name == self.fail_on:
+                raise CompressionFailedError(input_video, Path('errors.log'))
+            if input_video.name == self.abort_on:
+                output_video.unlink()
+                raise CompressionIneffectiveError(input_video, 10**9)
+            on_update(
+                HandbrakeProgressInfo(
+                    progress=100.0,
+                    fps_current=None,
+                    fps_average=None,
+                    eta=None,
+                ),
+            )
+        finally:
+            self.active_jobs -= 1
+
+
+@pytest.fixture
+def videos(tmp_path: Path, video_720p_2mb_mp4: Path) -> set[Path]:
+    files = set()
+    for i in range(6):
+        file = tmp_path / f'video_{i}.mp4'
+        shutil.copy(video_720p_2mb_mp4, file)
+        files.add(file)
+    return files
+
+
+def make_manager(
+    videos: Iterable[Path],
+    compressor: FakeCompressor,
+    ledger: JobLedger | None = None,
+    disk_space: DiskSpaceAdmission | None = None,
+    on_finished: Callable[[Path], None] | None = None,
+    **options: object,
+) -> CompressionManager:
+    return CompressionManager(
+        (VideoFile.from_path(video) for video in videos),
+        compressor=compressor,  # type: ignore[arg-type]
+        smart_filter=SmartFilter(),
+        options=CompressionManagerOptions(
+            **{
+                'ineffective_compression_behavior': IneffectiveCompressionBehavior.keep_both,
+                'effective_compression_behavior': EffectiveCompressionBehavior.keep_both,
+                **options,
+            },  # type: ignore[arg-type]
+        ),
+        ledger=ledger,
+        disk_space=disk_space,
+        on_finished=on_finished,
+    )
+
+
+def test_parallel_jobs_are_bounded(videos: set[Path]):
+    compressor = FakeCompressor()
+    manager = make_manager(videos, compressor, jobs=3)
+
+    asyncio.run(manager.compress_all_videos())
+
+    assert compressor.max_active_jobs == 3
+    for video in videos:
+        assert (video.parent / f'{video.stem}.compressed.mp4').exists()
+
+
+def test_failed_job_cancels_other_jobs(videos: set[Path]):
+    compressor = FakeCompressor(fail_on='video_0.mp4')
+    manager = make_manager(videos, compressor, jobs=3)
+
+    with pytest.raises(CompressionFailedError):
+        asyncio.run(manager.compress_all_videos())
+
+    tmp_dir = next(iter(videos)).parent
+    assert list(tmp_dir.glob('*.compressing.*')) == []
+
+
+def test_scheduled_videos_are_compressed_once(videos: set[Path]):
+    # The order itself is checked by the scheduler tests (probing races the first jobs)
+    compressor = FakeCompressor()
+    manager = make_manager(
+        sorted(videos),
+        compressor,
+        jobs=2,
+        order=JobOrder.largest_first,
+    )
+
+    asyncio.run(manager.compress_all_videos())
+
+    assert sorted(compressor.compressed) == sorted(video.name for video in videos)
+
+
+def test_batch_runs_on_callers_event_loop(videos: set[Path]):
+    compressor = FakeCompressor()
+    manager = make_manager(videos, compressor, jobs=2)
+    ticks = 0
+
+    async def ticker() -> None:
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    async def run() -> None:
+        ticker_task = asyncio.create_task(ticker())
+        await manager.compress_all_videos()
+        ticker_task.cancel()
+
+    asyncio.run(run())
+
+    # The loop kept serving other tasks during the whole batch
+    assert ticks > len(videos)
+    assert manager.statistics.overall_stats.files_skipped == 0
+
+
+def test_videos_are_streamed(videos: set[Path]):
+    compressor = FakeCompressor()
+    manager = make_manager(iter(sorted(videos)), compressor, jobs=2)
+
+    asyncio.run(manager.compress_all_videos())
+
+    for video in videos:
+        assert (video.parent / f'{video.stem}.compressed.mp4').exists()
+
+
+def test_ledger_skips_known_outcomes(videos: set[Path], tmp_path: Path):
+    ledger = JobLedger(tmp_path / 'ledger.sqlite')
+    failed_video = tmp_path / 'video_0.mp4'
+
+    compressor = FakeCompressor(fail_on=failed_video.name)
+    manager = make_manager(videos, compressor, ledger, skip_failed_files=True)
+    asyncio.run(manager.compress_all_videos())
+
+    entry = ledger.get(VideoFile.from_path(failed_video))
+    assert entry is not None
+    assert entry.state == JobState.failed
+    assert ledger.paths_in_state(JobState.pending) == []
+
+    # The second run doesn't touch any video (others are already compressed)
+    manager = make_manager(videos, FakeCompressor(), ledger)
+    asyncio.run(manager.compress_all_videos())
+    assert manager.known_outcomes_count == len(videos)
+
+    # Unless failed videos are retried
+    manager = make_manager(videos, FakeCompressor(), ledger, retry_failed=True)
+    asyncio.run(manager.compress_all_videos())
+    assert manager.known_outcomes_count == len(videos) - 1
+
+    ledger.close()
+
+
+def test_finished_videos_are_reported(videos: set[Path], tmp_path: Path):
+    ledger = JobLedger(tmp_path / 'ledger.sqlite')
+    compressor = FakeCompressor(fail_on='video_0.mp4')
+    finished: list[Path] = []
+    manager = make_manager(
+        videos,
+        compressor,
+        ledger,
+        on_finished=finished.append,
+        skip_failed_files=True,
+        jobs=2,
+    )
+    asyncio.run(manager.compress_all_videos())
+    assert sorted(finished) == sorted(videos)
+
+    # Videos with known outcomes are reported too
+    finished.clear()
+    manager = make_manager(
+        videos,
+        FakeCompressor(),
+        ledger,
+        on_finished=finished.append,
+    )
+    asyncio.run(manager.compress_all_videos())
+    assert manager.known_outcomes_count == len(videos)
+    assert sorted(finished) == sorted(videos)
+
+    ledger.close()
+
+
+def test_aborted_compression_marks_original(videos: set[Path], tmp_path: Path):
+    compressor = FakeCompressor(abort_on='video_0.mp4')
+    manager = make_manager(
+        videos,
+        compressor,
+        ineffective_compression_behavior=IneffectiveCompressionBehavior.mark_original,
+    )
+
+    asyncio.run(manager.compress_all_videos())
+
+    assert not (tmp_path / 'video_0.mp4').exists()
+    assert (tmp_path / 'video_0.compressed.mp4').stat().st_size > 10
+    assert manager.statistics.overall_stats.files_skipped == 1
+
+
+def test_batch_eta_is_shown(videos: set[Path]):
+    manager = make_manager(videos, FakeCompressor(), jobs=2)
+
+    asyncio.run(manager.compress_all_videos())
+
+    task = manager.general_progress.tasks[manager.all_videos_task]
+    assert task.fields['eta'] == '0s'
+    assert manager.throughput.encoded_media_seconds > 0
+
+
+def test_job_events(videos: set[Path], tmp_path: Path):
+    events_file = tmp_path / 'events.jsonl'
+    telemetry = Telemetry([JsonLinesWriter(open_events_target(str(events_file)))])
+    compressor = FakeCompressor(fail_on='video_0.mp4')
+    manager = make_manager(videos, compressor, jobs=2, skip_failed_files=True)
+    manager.telemetry = telemetry
+
+    asyncio.run(manager.compress_all_videos())
+    telemetry.close()
+
+    events = [json.loads(line) for line in events_file.read_text().splitlines()]
+    events_by_type: dict[str, list[dict]] = {}
+    for event in events:
+        events_by_type.setdefault(event['event'], []).append(event)
+
+    assert len(events_by_type['queued']) == 6
+    assert len(events_by_type['started']) == 6
+    assert len(events_by_type['finished']) == 5
+    assert [Path(event['path']).name for event in events_by_type['failed']] == [
+        'video_0.mp4',
+    ]
+    finished = events_by_type['finished'][0]
+    assert finished['output_size_bytes'] == 10
+    assert finished['encode_seconds'] > 0
+    # The last progress is delivered even if it came right after the previous one
+    last_progress = {
+        event['path']: event['progress'] for event in events_by_type['progress']
+    }
+    assert all(
+        last_progress[event['path']] == 100.0 for event in events_by_type['finished']
+    )
+
+
+def test_videos_leased_by_other_instances_are_left_out(videos: set[Path]):
+    other_instance = JobLeases(host='other-host', pid=1)
+    for name in ('video_0', 'video_1'):
+        assert other_instance.acquire(
+            (next(iter(videos)).parent / f'{name}.compressing.mp4').absolute(),
+        )
+
+    compressor = FakeCompressor()
+    leases = JobLeases()
+    manager = make_manager(videos, compressor, jobs=2)
+    manager.leases = leases
+
+    asyncio.run(manager.compress_all_videos())
+    leases.close()
+
+    assert sorted(compressor.compressed) == [f'video_{i}.mp4' for i in range(2, 6)]
+    # The leased videos aren't left in the ETA of the batch
+    assert manager.throughput.remaining_media_seconds == pytest.approx(0)
+    tmp_dir = next(iter(videos)).parent
+    assert sorted(path.name for path in tmp_dir.glob('*.lease')) == [
+        'video_0.compressing.mp4.lease',
+        'video_1.compressing.mp4.lease',
+    ]
+    other_instance.close()
+
+
+def test_watched_videos_are_compressed(
+    videos: set[Path],
+    tmp_path: Path,
+    video_720p_2mb_mp4: Path,
+):
+    classifier = VideoFilesClassifier('compressing', 'compressed')
+    watcher = DirectoryWatcher(
+        tmp_path,
+        settle_seconds=0.2,
+        poll_interval_seconds=0.2,
+        accept=classifier.is_unprocessed,
+    )
+    watcher.start()
+    compressor = FakeCompressor()
+    manager = make_manager(
+        (
+            video.path
+            for video in watcher.watch(
+                classifier.unprocessed_files(get_video_files_by_directory(tmp_path)),
+            )
+        ),
+        compressor,
+        jobs=2,
+    )
+
+    async def wait_for(path: Path) -> None:
+        for _ in range(200):
+            if path.exists():
+                return
+            await asyncio.sleep(0.05)
+        pytest.fail(f'{path.name} is not compressed')
+
+    async def run() -> None:
+        batch = asyncio.create_task(manager.compress_all_videos())
+        for video in videos:
+            await wait_for(video.parent / f'{video.stem}.compressed.mp4')
+
+        new_video = tmp_path / 'new' / 'video.mp4'
+        new_video.parent.mkdir()
+        shutil.copy(video_720p_2mb_mp4, new_video)
+        await wait_for(new_video.parent / 'video.compressed.mp4')
+
+        watcher.close()
+        await asyncio.wait_for(batch, timeout=10)
+
+    asyncio.run(run())
+
+    # The outputs of the compressions aren't picked up
+    assert sorted(compressor.compressed) == sorted(
+        [video.name for video in videos] + ['video.mp4'],
+    )
+
+
+def test_videos_not_fitting_into_free_space_are_skipped(
+    videos: set[Path],
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    usage = shutil.disk_usage(tmp_path)
+    monkeypatch.setattr(
+        shutil,
+        'disk_usage',
+        lambda _: usage._replace(free=1024**2),
+    )
+    events_file = tmp_path / 'events.jsonl'
+    telemetry = Telemetry([JsonLinesWriter(open_events_target(str(events_file)))])
+    compressor = FakeCompressor()
+    manager = make_manager(
+        videos,
+        compressor,
+        disk_space=DiskSpaceAdmission(min_free_bytes=0, poll_interval_seconds=10),
+        jobs=2,
+    )
+    manager.telemetry = telemetry
+
+    asyncio.run(asyncio.wait_for(manager.compress_all_videos(), timeout=10))
+    telemetry.close()
+
+    assert compressor.compressed == []
+    events = [json.loads(line) for line in events_file.read_text().splitlines()]
+    skipped = [event for event in events if event['event'] == 'skipped']
+    assert len(skipped) == len(videos)
+    assert {event['reason'] for event in skipped} == {'disk_space'}
@@ -1,9 +1,15 @@
+import csv
 from pathlib import Path
 
+import numpy as np
 import pytest
 
 from handbrake_batch_compressor.src.compression.compression_statistics import (
     CompressionStatistics,
+    EncodeSpeedStatistics,
+    FileStatistics,
+    FileStatisticsStore,
+    UnsupportedExportFormatError,
 )
 
 
@@ -112,3 +118,144 @@ def test_general_statistics(video_files: tuple[Path, Path]):
     assert info.final_size_bytes == files_count * 50
     assert info.initial_size_bytes == files_count * 100
     assert info.compression_rate == '-50%'
+
+
+@pytest.mark.parametrize(
+    'video_files',
+    [
+        {'input_size': 100, 'output_size': 50},
+    ],
+    indirect=True,
+)
+def test_prediction_error(video_files: tuple[Path, Path]):
+    statistics = CompressionStatistics()
+
+    input_file, output_file = video_files
+
+    assert statistics.prediction_error_percent is None
+
+    info = statistics.add_compression_info(
+        input_file,
+        output_file,
+        predicted_ratio=0.6,
+    )
+
+    assert info.actual_ratio == 0.5
+    assert statistics.prediction_error_percent == pytest.approx(10)
+
+
+@pytest.mark.parametrize(
+    'video_files',
+    [
+        {'input_size': 100, 'output_size': 50},
+    ],
+    indirect=True,
+)
+def test_encode_speed(video_files: tuple[Path, Path]):
+    statistics = CompressionStatistics()
+
+    input_file, output_file = video_files
+
+    info = statistics.add_compression_info(
+        input_file,
+        output_file,
+        encode_speed=EncodeSpeedStatistics(
+            encode_seconds=10,
+            media_seconds=30,
+            fps_average=90,
+        ),
+    )
+    statistics.add_compression_info(
+        input_file,
+        output_file,
+        encode_speed=EncodeSpeedStatistics(
+            encode_seconds=30,
+            media_seconds=30,
+            fps_average=30,
+        ),
+    )
+    # Files without the encode speed are not counted in it
+    statistics.add_compression_info(input_file, output_file)
+
+    assert info.encode_speed == 3
+    overall = statistics.overall_stats
+    assert overall.encode_seconds == 40
+    assert overall.media_seconds == 60
+    assert overall.encode_speed == 1.5
+    assert overall.fps_average == pytest.approx(45)
+
+
+def file_statistics(name: str, **fields: object) -> FileStatistics:
+    return FileStatistics(
+        path=Path('/videos', name),
+        initial_size_bytes=100,
+        final_size_bytes=50,
+        **fields,  # type: ignore[arg-type]
+    )
+
+
+class TestFileStatisticsStore:
+    def test_rows_are_kept_in_columns(self) -> None:
+        store = FileStatisticsStore()
+        store.append(file_statistics('a.mp4', predicted_ratio=0.4))
+        store.append(file_statistics('b.mp4', encode_seconds=10, media_seconds=20))
+
+        assert len(store) == 2
+        assert list(store.column('final_size_bytes')) == [50, 50]
+        assert [row.path.name for row in store] == ['a.mp4', 'b.mp4']
+
+        first, second = store
+        assert first.predicted_ratio == 0.4
+        assert first.encode_seconds is None
+        assert second.encode_speed == 2
+
+    def test_checkpoint(self, tmp_path: Path) -> None:
+        checkpoint = tmp_path / 'stats.csv'
+        store = FileStatisticsStore(checkpoint_path=checkpoint, checkpoint_every=2)
+
+        store.append(file_statistics('a.mp4'))
+        assert not checkpoint.exists()
+
+        store.append(file_statistics('b.mp4'))
+        store.append(file_statistics('c.mp4'))
+        assert len(read_csv(checkpoint)) == 2
+
+        store.close()
+        rows = read_csv(checkpoint)
+        assert [Path(row['path']).name for row in rows] == ['a.mp4', 'b.mp4', 'c.mp4']
+        assert rows[0]['predicted_ratio'] == ''
+
+    def test_export_csv(self, tmp_path: Path) -> None:
+        store = FileStatisticsStore()
+        store.append(file_statistics('a.mp4', fps_average=30.5))
+
+        store.export(tmp_path / 'stats.csv')
+
+        (row,) = read_csv(tmp_path / 'stats.csv')
+        assert row['initial_size_bytes'] == '100'
+        assert row['fps_average'] == '30.5'
+
+    def test_export_npz(self, tmp_path: Path) -> None:
+        store = FileStatisticsStore()
+        store.append(file_statistics('a.mp4', media_seconds=60))
+        store.append(file_statistics('b.mp4'))
+
+        store.export(tmp_path / 'stats.npz')
+
+        with np.load(tmp_path / 'stats.npz') as columns:
+            assert list(columns['path']) == [
+                str(Path('/videos/a.mp4')),
+                str(Path('/videos/b.mp4')),
+            ]
+            assert list(columns['final_size_bytes']) == [50, 50]
+            assert columns['media_seconds'][0] == 60
+            assert np.isnan(columns['media_seconds'][1])
+
+    def test_unsupported_export_format(self, tmp_path: Path) -> None:
+        with pytest.raises(UnsupportedExportFormatError):
+            FileStatisticsStore().export(tmp_path / 'stats.parquet')
+
+
+def read_csv(path: Path) -> list[dict[str, str]]:
+    with path.open(encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
@@ -0,0 +1,196 @@
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from handbrake_batch_compressor.src.utils.directory_watcher import DirectoryWatcher
+from handbrake_batch_compressor.src.utils.files import VideoFile
+
+# Generous timeout for the events to arrive on slow machines
+TIMEOUT_SECONDS = 10
+
+
+class WatchedVideos:
+    """Runs the watcher in a thread (like the probe pipeline does) collecting the given out videos."""
+
+    def __init__(self, watcher: DirectoryWatcher, initial: list[VideoFile]) -> None:
+        self.watcher = watcher
+        self.videos: queue.Queue[VideoFile] = queue.Queue()
+        watcher.start()
+        self._thread = threading.Thread(target=self._run, args=(initial,))
+        self._thread.start()
+
+    def next_path(self) -> Path:
+        return self.videos.get(timeout=TIMEOUT_SECONDS).path
+
+    def close(self) -> None:
+        self.watcher.close()
+        self._thread.join(timeout=TIMEOUT_SECONDS)
+        assert not self._thread.is_alive()
+
+    def _run(self, initial: list[VideoFile]) -> None:
+        for video in self.watcher.watch(initial):
+            self.videos.put(video)
+
+
+def make_video(path: Path, age_seconds: float = 0) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'video')
+    if age_seconds:
+        modified = time.time() - age_seconds
+        os.utime(path, (modified, modified))
+    return path
+
+
+@pytest.mark.parametrize(
+    'use_inotify',
+    [
+        pytest.param(
+            True,
+            marks=pytest.mark.skipif(
+                sys.platform != 'linux',
+                reason='inotify is Linux only',
+            ),
+        ),
+        False,
+    ],
+)
+def test_new_videos_are_given_out(tmp_path: Path, *, use_inotify: bool):
+    old_video = make_video(tmp_path / 'old.mp4', age_seconds=60)
+    watched = WatchedVideos(
+        DirectoryWatcher(
+            tmp_path,
+            settle_seconds=0.2,
+            poll_interval_seconds=0.2,
+            accept=lambda path: '.compressed' not in path.name,
+            use_inotify=use_inotify,
+        ),
+        [VideoFile.from_path(old_video)],
+    )
+    try:
+        assert watched.next_path() == old_video
+
+        make_video(tmp_path / 'video.compressed.mp4')
+        (tmp_path / 'notes.txt').write_text('not a video')
+        # Files in new directories are found too
+        new_video = make_video(tmp_path / 'new' / 'nested' / 'video.mkv')
+        assert watched.next_path() == new_video
+    finally:
+        watched.close()
+
+    assert watched.videos.empty()
+
+
+def test_videos_being_written_are_debounced(tmp_path: Path):
+    watched = WatchedVideos(
+        DirectoryWatcher(
+            tmp_path,
+            settle_seconds=1,
+            poll_interval_seconds=0.1,
+            use_inotify=False,
+        ),
+        [],
+    )
+    try:
+        video = tmp_path / 'video.mp4'
+        started = time.monotonic()
+        with video.open('wb') as file:
+            for _ in range(5):
+                time.sleep(0.3)
+                file.write(b'chunk')
+                file.flush()
+        written = time.monotonic()
+
+        assert watched.next_path() == video
+        # Given out only after it's unchanged for the settle time
+        assert time.monotonic() - written >= 1
+        assert time.monotonic() - started >= 2.5
+    finally:
+        watched.close()
+
+
+def test_recently_modified_initial_videos_wait_to_settle(tmp_path: Path):
+    settled = make_video(tmp_path / 'settled.mp4', age_seconds=60)
+    recent = make_video(tmp_path / 'recent.mp4')
+    watched = WatchedVideos(
+        DirectoryWatcher(tmp_path, settle_seconds=0.5, use_inotify=False),
+        [VideoFile.from_path(recent), VideoFile.from_path(settled)],
+    )
+    try:
+        assert watched.next_path() == settled
+        assert watched.next_path() == recent
+    finally:
+        watched.close()
+
+
+def test_unchanged_videos_are_given_out_once(tmp_path: Path):
+    video = make_video(tmp_path / 'video.mp4', age_seconds=60)
+    watched = WatchedVideos(
+        DirectoryWatcher(
+            tmp_path,
+            settle_seconds=0.1,
+            poll_interval_seconds=0.1,
+            use_inotify=False,
+        ),
+        [VideoFile.from_path(video)],
+    )
+    try:
+        assert watched.next_path() == video
+        # Rewritten with the same content and modification time
+        modified_ns = video.stat().st_mtime_ns
+        video.write_bytes(b'video')
+        os.utime(video, ns=(modified_ns, modified_ns))
+        other = make_video(tmp_path / 'other.mp4')
+        assert watched.next_path() == other
+    finally:
+        watched.close()
+
+
+def test_removed_videos_are_forgotten(tmp_path: Path):
+    video = make_video(tmp_path / 'video.mp4', age_seconds=60)
+    watcher = DirectoryWatcher(
+        tmp_path,
+        settle_seconds=0.1,
+        poll_interval_seconds=0.1,
+        use_inotify=False,
+    )
+    watched = WatchedVideos(watcher, [VideoFile.from_path(video)])
+    try:
+        assert watched.next_path() == video
+        # E.g. the original is deleted once its compression is finalized
+        video.unlink()
+
+        deadline = time.monotonic() + TIMEOUT_SECONDS
+        while video in watcher._given_out:  # noqa: SLF001 - checking the memory is freed
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+    finally:
+        watched.close()
+
+
+def test_changed_videos_wait_for_their_jobs_to_finish(tmp_path: Path):
+    video = make_video(tmp_path / 'video.mp4', age_seconds=60)
+    watcher = DirectoryWatcher(
+        tmp_path,
+        settle_seconds=0.1,
+        poll_interval_seconds=0.1,
+        use_inotify=False,
+    )
+    watched = WatchedVideos(watcher, [VideoFile.from_path(video)])
+    try:
+        assert watched.next_path() == video
+        # Changed while its job is still queued or running
+        video.write_bytes(b'changed video')
+        other = make_video(tmp_path / 'other.mp4')
+        assert watched.next_path() == other
+        time.sleep(0.5)
+        assert watched.videos.empty()
+
+        watcher.release(video)
+        assert watched.next_path() == video
+    finally:
+        watched.close()
@@ -0,0 +1,193 @@
+import asyncio
+import shutil
+from pathlib import Path
+from shlex import split
+from typing import NamedTuple
+
+import pytest
+
+from handbrake_batch_compressor.src.compression.disk_space_admission import (
+    DiskSpaceAdmission,
+    InsufficientDiskSpaceError,
+    estimate_output_size,
+)
+from handbrake_batch_compressor.src.utils.ffmpeg_helpers import (
+    VideoProperties,
+    VideoResolution,
+)
+from handbrake_batch_compressor.src.utils.handbrakecli_options import (
+    target_bitrate_kbits,
+)
+
+
+class DiskUsage(NamedTuple):
+    total: int
+    used: int
+    free: int
+
+
+@pytest.fixture
+def free_space(monkeypatch: pytest.MonkeyPatch) -> dict[str, int]:
+    """Free space reported for any directory, it can be changed by tests."""
+    space = {'free': 0}
+    monkeypatch.setattr(
+        shutil,
+        'disk_usage',
+        lambda _: DiskUsage(total=10**12, used=0, free=space['free']),
+    )
+    return space
+
+
+def test_estimate_output_size_from_bitrate_and_duration():
+    properties = VideoProperties(
+        resolution=VideoResolution(width=1280, height=720),
+        frame_rate=30,
+        bitrate_kbytes=800,  # kilobits per second
+        duration_seconds=100,
+    )
+
+    assert estimate_output_size(10**9, properties) == 800 * 1024 // 8 * 100
+    assert estimate_output_size(10**9, properties, ratio=0.5) == 800 * 1024 // 16 * 100
+    # The video stream can't be larger than the file itself
+    assert estimate_output_size(1000, properties) == 1000
+    assert estimate_output_size(1000, None) == 1000
+
+
+def test_estimate_output_size_from_bitrate_of_options():
+    properties = VideoProperties(
+        resolution=VideoResolution(width=1280, height=720),
+        frame_rate=30,
+        bitrate_kbytes=800,
+        duration_seconds=100,
+    )
+    options = split('-e x265 -b 1500 -B 160,96')
+
+    # The output is encoded at the target bitrate whatever the source is
+    assert (
+        estimate_output_size(
+            10**9,
+            properties,
+            target_bitrate_kbits=target_bitrate_kbits(options),
+        )
+        == (1500 + 160 + 96) * 1000 // 8 * 100
+    )
+    # Constant quality encodes have no target bitrate
+    assert target_bitrate_kbits(split('-e x265 -q 24')) is None
+    assert target_bitrate_kbits(split('--vb=2000')) == 2000
+
+
+def test_jobs_wait_until_reserved_space_is_released(
+    tmp_path: Path,
+    free_space: dict[str, int],
+):
+    free_space['free'] = 1500
+    admission = DiskSpaceAdmission(min_free_bytes=100, poll_interval_seconds=10)
+    events: list[str] = []
+
+    async def job(name: str, hold_seconds: float) -> None:
+        async with admission.reserve(
+            tmp_path / f'{name}.compressing.mp4',
+            size=1000,
+            on_wait=lambda: events.append(f'{name} waits'),
+        ):
+            events.append(f'{name} starts')
+            await asyncio.sleep(hold_seconds)
+        events.append(f'{name} ends')
+
+    async def run() -> None:
+        await asyncio.gather(job('first', 0.05), job('second', 0))
+
+    asyncio.run(run())
+
+    assert events == [
+        'first starts',
+        'second waits',
+        'first ends',
+        'second starts',
+        'second ends',
+    ]
+
+
+def test_written_output_is_not_reserved_twice(
+    tmp_path: Path,
+    free_space: dict[str, int],
+):
+    free_space['free'] = 2000
+    admission = DiskSpaceAdmission(min_free_bytes=0, poll_interval_seconds=10)
+    output = tmp_path / 'first.compressing.mp4'
+
+    async def second_job() -> None:
+        async with admission.reserve(tmp_path / 'second.compressing.mp4', size=1000):
+            pass
+
+    async def run() -> None:
+        async with admission.reserve(output, size=1000):
+            # The first job has written its whole output
+            output.write_bytes(b'\0' * 1000)
+            free_space['free'] = 1000
+
+            await asyncio.wait_for(second_job(), timeout=1)
+
+    asyncio.run(run())
+
+
+def test_waiting_job_starts_once_space_is_freed(
+    tmp_path: Path,
+    free_space: dict[str, int],
+):
+    free_space['free'] = 1000
+    admission = DiskSpaceAdmission(min_free_bytes=0, poll_interval_seconds=0.01)
+    waited = False
+
+    def on_wait() -> None:
+        nonlocal waited
+        waited = True
+        # Freed by the user while the other job is still running
+        free_space['free'] = 2000
+
+    async def run() -> None:
+        async with (
+            admission.reserve(tmp_path / 'running.mp4', 1000),
+            admission.reserve(tmp_path / 'video.mp4', 1000, on_wait=on_wait),
+        ):
+            pass
+
+    asyncio.run(run())
+
+    assert waited
+
+
+def test_oversized_job_is_refused_without_holding_up_others(
+    tmp_path: Path,
+    free_space: dict[str, int],
+):
+    free_space['free'] = 1500
+    admission = DiskSpaceAdmission(min_free_bytes=100, poll_interval_seconds=10)
+    events: list[str] = []
+
+    async def job(name: str, size: int, hold_seconds: float = 0) -> None:
+        try:
+            async with admission.reserve(tmp_path / f'{name}.compressing.mp4', size):
+                events.append(f'{name} starts')
+                await asyncio.sleep(hold_seconds)
+        except InsufficientDiskSpaceError:
+            events.append(f'{name} is refused')
+
+    async def run() -> None:
+        await asyncio.wait_for(
+            asyncio.gather(
+                job('running', 500, hold_seconds=0.05),
+                job('oversized', 5000),
+                job('small', 500),
+            ),
+            timeout=5,
+        )
+
+    asyncio.run(run())
+
+    # The oversized job waits until the running one finishes (it may free the space)
+    assert events == [
+        'running starts',
+        'small starts',
+        'oversized is refused',
+    ]
@@ -0,0 +1,325 @@
+import asyncio
+import json
+import shutil
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from handbrake_batch_compressor.src.cli.handbrake_cli_output_capturer import (
+    HandbrakeProgressInfo,
+)
+from handbrake_batch_compressor.src.cli.option_types import (
+    Address,
+    EffectiveCompressionBehavior,
+    IneffectiveCompressionBehavior,
+    InvalidAddressError,
+)
+from handbrake_batch_compressor.src.compression.compression_manager import (
+    CompressionManager,
+    CompressionManagerOptions,
+)
+from handbrake_batch_compressor.src.compression.distributed import (
+    Coordinator,
+    EncodeSettings,
+    Worker,
+)
+from handbrake_batch_compressor.src.errors.cancel_compression_by_user import (
+    CompressionCancelledByUserError,
+)
+from handbrake_batch_compressor.src.errors.handbrake_cli_exceptions import (
+    CompressionFailedError,
+)
+from handbrake_batch_compressor.src.utils.files import VideoFile
+from handbrake_batch_compressor.src.utils.smart_filters import SmartFilter
+
+
+class FakeCompressor:
+    """Compressor which writes a tiny output, it can hang to simulate a lost worker."""
+
+    def __init__(self, settings: EncodeSettings, *, hang: bool = False) -> None:
+        self.settings = settings
+        self.hang = hang
+        self.started = asyncio.Event()
+        self.compressed: list[str] = []
+
+    async def compress(
+        self,
+        input_video: Path,
+        output_video: Path,
+        on_update: Callable[[HandbrakeProgressInfo], None] = lambda _: None,
+        input_size_bytes: int | None = None,  # noqa: ARG002
+    ) -> None:
+        self.started.set()
+        output_video.write_bytes(b'\0' * 10)
+        if self.hang:
+            await asyncio.Event().wait()
+        if (
+            input_video.name == 'video_0.mp4'
+            and 'fail' in self.settings.handbrakecli_options
+        ):
+            output_video.unlink()
+            raise CompressionFailedError(input_video, Path('errors.log'))
+
+        await asyncio.sleep(0.05)
+        on_update(
+            HandbrakeProgressInfo(
+                progress=100.0,
+                fps_current=30.0,
+                fps_average=25.0,
+                eta=None,
+            ),
+        )
+        self.compressed.append(input_video.name)
+
+
+@pytest.fixture
+def videos(tmp_path: Path, video_720p_2mb_mp4: Path) -> list[Path]:
+    files = []
+    for i in range(4):
+        file = tmp_path / f'video_{i}.mp4'
+        shutil.copy(video_720p_2mb_mp4, file)
+        files.append(file)
+    return files
+
+
+def make_manager(
+    videos: list[Path],
+    coordinator: Coordinator,
+    **options: object,
+) -> CompressionManager:
+    return CompressionManager(
+        (VideoFile.from_path(video) for video in videos),
+        compressor=coordinator,  # type: ignore[arg-type]
+        smart_filter=SmartFilter(),
+        options=CompressionManagerOptions(
+            **{
+                'ineffective_compression_behavior': IneffectiveCompressionBehavior.keep_both,
+                'effective_compression_behavior': EffectiveCompressionBehavior.keep_both,
+                **options,
+            },  # type: ignore[arg-type]
+        ),
+    )
+
+
+async def send(writer: asyncio.StreamWriter, message: dict[str, object]) -> None:
+    writer.write(json.dumps(message).encode('utf-8') + b'\n')
+    await writer.drain()
+
+
+async def next_message(
+    reader: asyncio.StreamReader,
+    message_type: str,
+) -> dict[str, object]:
+    """Read the messages until the one of the given type."""
+    while True:
+        message = json.loads(await reader.readline())
+        if message['type'] == message_type:
+            return message
+
+
+def test_parse_address():
+    assert Address.parse_address('127.0.0.1:7420') == Address(
+        host='127.0.0.1',
+        port=7420,
+    )
+    assert Address.parse_address('[::1]:80').host == '::1'
+    for address in ('localhost', ':80', 'localhost:port', 'localhost:70000'):
+        with pytest.raises(InvalidAddressError):
+            Address.parse_address(address)
+
+
+def test_workers_compress_the_batch(videos: list[Path], tmp_path: Path):
+    compressors: list[FakeCompressor] = []
+
+    def make_compressor(settings: EncodeSettings) -> FakeCompressor:
+        compressors.append(FakeCompressor(settings))
+        return compressors[-1]
+
+    async def run() -> CompressionManager:
+        coordinator = Coordinator(
+            Address(host='127.0.0.1', port=0),
+            tmp_path,
+            handbrakecli_options='fail',
+        )
+        manager = make_manager(videos, coordinator, jobs=4, skip_failed_files=True)
+        await coordinator.start()
+        address = Address(host='127.0.0.1', port=coordinator.port)
+        workers = [
+            asyncio.create_task(
+                Worker(address, tmp_path, make_compressor, slots=2, name=name).run(),  # type: ignore[arg-type]
+            )
+            for name in ('worker-a', 'worker-b')
+        ]
+        try:
+            await manager.compress_all_videos()
+        finally:
+            await coordinator.close()
+        await asyncio.wait_for(asyncio.gather(*workers), 5)
+        return manager
+
+    manager = asyncio.run(run())
+
+    assert len(compressors) == 2
+    assert sorted(
+        name for compressor in compressors for name in compressor.compressed
+    ) == [f'video_{i}.mp4' for i in range(1, 4)]
+    # The results are finalized and counted by the coordinator
+    for i in range(1, 4):
+        assert (tmp_path / f'video_{i}.compressed.mp4').stat().st_size == 10
+    assert len(manager.statistics.files_statistics) == 3
+    assert manager.statistics.overall_stats.files_skipped == 1
+    assert manager.statistics.overall_stats.fps_average == 25.0
+
+
+class MissingHandbrakeCompressor:
+    """Compressor whose HandbrakeCLI binary doesn't exist."""
+
+    async def compress(self, *_: object, **__: object) -> None:
+        raise FileNotFoundError(2, 'No such file or directory', 'handbrakecli')
+
+
+def test_unexpected_errors_of_workers_fail_the_job(
+    videos: list[Path],
+    tmp_path: Path,
+):
+    async def run() -> CompressionManager:
+        coordinator = Coordinator(Address(host='127.0.0.1', port=0), tmp_path)
+        manager = make_manager(videos[:2], coordinator, skip_failed_files=True)
+        await coordinator.start()
+        worker = asyncio.create_task(
+            Worker(
+                Address(host='127.0.0.1', port=coordinator.port),
+                tmp_path,
+                lambda _: MissingHandbrakeCompressor(),  # type: ignore[arg-type,return-value]
+            ).run(),
+        )
+        try:
+            await asyncio.wait_for(manager.compress_all_videos(), 5)
+        finally:
+            await coordinator.close()
+        await asyncio.wait_for(worker, 5)
+        return manager
+
+    manager = asyncio.run(run())
+
+    assert manager.statistics.overall_stats.files_skipped == 2
+
+
+def test_jobs_of_lost_worker_are_requeued(videos: list[Path], tmp_path: Path):
+    async def run() -> list[str]:
+        coordinator = Coordinator(Address(host='127.0.0.1', port=0), tmp_path)
+        manager = make_manager(videos[:1], coordinator)
+        await coordinator.start()
+        address = Address(host='127.0.0.1', port=coordinator.port)
+
+        lost_compressor = FakeCompressor(EncodeSettings(), hang=True)
+        lost_worker = asyncio.create_task(
+            Worker(address, tmp_path, lambda _: lost_compressor, name='lost').run(),  # type: ignore[arg-type,return-value]
+        )
+        batch = asyncio.create_task(manager.compress_all_videos())
+        await asyncio.wait_for(lost_compressor.started.wait(), 5)
+
+        # The worker disappears in the middle of the compression
+        lost_worker.cancel()
+        other_compressor = FakeCompressor(EncodeSettings())
+        other_worker = asyncio.create_task(
+            Worker(address, tmp_path, lambda _: other_compressor, name='other').run(),  # type: ignore[arg-type,return-value]
+        )
+        try:
+            await asyncio.wait_for(batch, 5)
+        finally:
+            await coordinator.close()
+        await asyncio.wait_for(other_worker, 5)
+        return other_compressor.compressed
+
+    assert asyncio.run(run()) == ['video_0.mp4']
+    assert (tmp_path / 'video_0.compressed.mp4').exists()
+
+
+def test_worker_cancels_jobs_once_coordinator_is_silent(
+    videos: list[Path],
+    tmp_path: Path,
+):
+    compressor = FakeCompressor(EncodeSettings(), hang=True)
+    output = tmp_path / 'video_0.compressed.mp4'
+
+    async def silent_coordinator(
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        await next_message(reader, 'hello')
+        await send(writer, {'type': 'settings'})
+        job = {'type': 'job', 'id': 0, 'input': videos[0].name, 'output': output.name}
+        await send(writer, job)
+        # Then it's silent (e.g. the network is partitioned) but connected
+        await asyncio.Event().wait()
+
+    async def run() -> None:
+        server = await asyncio.start_server(silent_coordinator, '127.0.0.1', 0)
+        worker = Worker(
+            Address(host='127.0.0.1', port=server.sockets[0].getsockname()[1]),
+            tmp_path,
+            lambda _: compressor,  # type: ignore[arg-type,return-value]
+            coordinator_timeout_seconds=0.5,
+        )
+        try:
+            await asyncio.wait_for(worker.run(), 5)
+        finally:
+            server.close()
+
+    asyncio.run(run())
+
+    assert compressor.started.is_set()
+    # The job is requeued by the coordinator, so the partial output is deleted
+    assert not output.exists()
+    assert videos[0].exists()
+
+
+def test_cancelled_job_holds_slot_until_worker_stops_it(
+    videos: list[Path],
+    tmp_path: Path,
+):
+    async def run() -> None:
+        coordinator = Coordinator(Address(host='127.0.0.1', port=0), tmp_path)
+        await coordinator.start()
+        # The worker with a single slot is driven by the test
+        reader, writer = await asyncio.open_connection('127.0.0.1', coordinator.port)
+        await send(
+            writer,
+            {'type': 'hello', 'version': 1, 'name': 'worker', 'slots': 1},
+        )
+        try:
+            cancelled = asyncio.create_task(
+                coordinator.compress(videos[0], tmp_path / 'output_0.mp4'),
+            )
+            job = await asyncio.wait_for(next_message(reader, 'job'), 5)
+            cancelled.cancel()
+            with pytest.raises(CompressionCancelledByUserError):
+                await cancelled
+            assert (await next_message(reader, 'cancel'))['id'] == job['id']
+
+            queued = asyncio.create_task(
+                coordinator.compress(videos[1], tmp_path / 'output_1.mp4'),
+            )
+            # The worker is still stopping the cancelled job
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(next_message(reader, 'job'), 0.3)
+
+            await send(
+                writer,
+                {'type': 'result', 'id': job['id'], 'outcome': 'cancelled'},
+            )
+            queued_job = await asyncio.wait_for(next_message(reader, 'job'), 5)
+            assert queued_job['input'] == videos[1].name
+
+            await send(
+                writer,
+                {'type': 'result', 'id': queued_job['id'], 'outcome': 'done'},
+            )
+            await asyncio.wait_for(queued, 5)
+        finally:
+            writer.close()
+            await coordinator.close()
+
+    asyncio.run(run())
@@ -0,0 +1,64 @@
+import subprocess
+import sys
+
+import pytest
+
+from handbrake_batch_compressor.src.cli.entry_point import VERSION
+
+
+@pytest.mark.parametrize('option', ['--version', '-v'])
+def test_version_is_shown_without_importing_the_cli(option: str):
+    output = subprocess.run(  # noqa: S603 - the command is built by the test
+        [
+            sys.executable,
+            '-c',
+            'import sys\n'
+            'from handbrake_batch_compressor.src.cli.entry_point import bootstrap\n'
+            'try:\n'
+            '    bootstrap()\n'
+            'finally:\n'
+            '    print(sorted({"typer", "pydantic", "av"} & set(sys.modules)))\n',
+            option,
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+    assert output.splitlines() == [f'handbrake-batch-compressor {VERSION}', '[]']
+
+
+def test_help_is_shown_without_importing_the_runtime_modules():
+    runtime_modules = {
+        'asyncio',
+        'numpy',
+        'aiofiles',
+        'handbrake_batch_compressor.src.compression.compression_manager',
+        'handbrake_batch_compressor.src.compression.compression_statistics',
+        'handbrake_batch_compressor.src.compression.distributed',
+        'handbrake_batch_compressor.src.compression.handbrake_compressor',
+        'handbrake_batch_compressor.src.compression.process_priority',
+        'handbrake_batch_compressor.src.compression.telemetry',
+        'handbrake_batch_compressor.src.compression.trial_encoder',
+        'handbrake_batch_compressor.src.utils.directory_watcher',
+        'handbrake_batch_compressor.src.utils.third_party_installers',
+    }
+    output = subprocess.run(  # noqa: S603 - the command is built by the test
+        [
+            sys.executable,
+            '-c',
+            'import sys\n'
+            'from handbrake_batch_compressor.src.cli.entry_point import bootstrap\n'
+            'try:\n'
+            '    bootstrap()\n'
+            'finally:\n'
+            f'    print(sorted({runtime_modules!r} & set(sys.modules)))\n',
+            '--help',
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+    assert '--target-path' in output
+    assert output.splitlines()[-1] == '[]'
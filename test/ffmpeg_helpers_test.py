@@ -1,8 +1,12 @@
 from pathlib import Path
 
+import av
+import pytest
+
 from handbrake_batch_compressor.src.utils.ffmpeg_helpers import (
     VideoProperties,
     VideoResolution,
+    estimate_fps_from_timestamps,
     get_video_properties,
 )
 
@@ -22,6 +26,7 @@ def test_get_video_properties(video_720p_2mb_mp4: Path):
 
     assert video_properties.bitrate_kbytes == 1219
     assert video_properties.frame_rate == 25.0
+    assert video_properties.duration_seconds == pytest.approx(13.5, abs=0.1)
 
 
 def test_resolution_comparisons():
@@ -36,3 +41,15 @@ def test_resolution_comparisons():
     assert res_1280x720 < res_1920x1080
 
     assert res_1440x900 <= VideoResolution.parse_resolution('1440x900')
+
+
+@pytest.mark.parametrize('packet_budget', [10, 100, 10_000])
+def test_estimate_fps_from_timestamps(video_720p_2mb_mp4: Path, packet_budget: int):
+    with av.open(video_720p_2mb_mp4) as container:
+        fps = estimate_fps_from_timestamps(
+            container,
+            container.streams.video[0],
+            packet_budget=packet_budget,
+        )
+
+    assert fps == pytest.approx(25.0, rel=0.01)
@@ -1,6 +1,13 @@
+from pathlib import Path
+
+import pytest
+
 from handbrake_batch_compressor.src.utils.files import (
+    InvalidSizeError,
+    get_video_files_by_directory,
     get_video_files_paths,
     human_readable_size,
+    parse_size,
 )
 from test.conftest import VideoSampleData
 
@@ -25,3 +32,35 @@ def test_human_readable_size():
     assert human_readable_size(1099511627776) == '1.00 TB'
     assert human_readable_size(1125899906842624) == '1.00 PB'
     assert human_readable_size(245323223) == '233.96 MB'  # just some random float
+
+
+def test_parse_size():
+    assert parse_size('512') == 512
+    assert parse_size('10KB') == 10 * 1024
+    assert parse_size('1.5gb') == int(1.5 * 1024**3)
+    assert parse_size('2 TB') == 2 * 1024**4
+
+
+@pytest.mark.parametrize('size', ['', 'GB', '10XB', '-1GB', 'ten'])
+def test_parse_invalid_size(size: str):
+    with pytest.raises(InvalidSizeError):
+        parse_size(size)
+
+
+def test_extensions_are_case_insensitive(tmp_path: Path):
+    (tmp_path / 'nested').mkdir()
+    (tmp_path / 'upper.MP4').touch()
+    (tmp_path / 'nested' / 'mixed.Mkv').touch()
+    (tmp_path / 'nested' / 'not_a_video.mp4.txt').touch()
+
+    paths = {path.name for path in get_video_files_paths(tmp_path)}
+
+    assert paths == {'upper.MP4', 'mixed.Mkv'}
+
+
+def test_files_are_grouped_by_directory(generate_video_files_data: VideoSampleData):
+    directories = list(get_video_files_by_directory(generate_video_files_data.path))
+
+    assert len(directories) == 2
+    for video_files in directories:
+        assert len({file.path.parent for file in video_files}) == 1
@@ -1,6 +1,10 @@
 import datetime
 
+import pytest
+
 from handbrake_batch_compressor.src.cli.handbrake_cli_output_capturer import (
+    HandbrakeProgressInfo,
+    ProgressDispatcher,
     parse_handbrake_cli_output,
 )
 
@@ -39,3 +43,46 @@ class TestHandbrakeCliOutputCapturer:
         assert progress_info.fps_current is None
         assert progress_info.fps_average is None
         assert progress_info.eta is None
+
+    def test_without_progress(self):
+        progress_info = parse_handbrake_cli_output('Muxing: this may take awhile...')
+
+        assert progress_info.progress is None
+        assert progress_info.fps_current is None
+        assert progress_info.fps_average is None
+        assert progress_info.eta is None
+
+
+def make_info(progress: float) -> HandbrakeProgressInfo:
+    return HandbrakeProgressInfo(
+        progress=progress,
+        fps_current=None,
+        fps_average=None,
+        eta=None,
+    )
+
+
+class TestProgressDispatcher:
+    def test_coalesces_updates(self, monkeypatch: pytest.MonkeyPatch):
+        now = 100.0
+        monkeypatch.setattr('time.monotonic', lambda: now)
+
+        delivered: list[float | None] = []
+        dispatcher = ProgressDispatcher(
+            lambda info: delivered.append(info.progress),
+            max_updates_per_second=2,
+        )
+
+        dispatcher(make_info(1))
+        dispatcher(make_info(2))
+        dispatcher(make_info(3))
+        assert delivered == [1]
+
+        now += 0.5
+        dispatcher(make_info(4))
+        assert delivered == [1, 4]
+
+        dispatcher(make_info(5))
+        dispatcher.flush()
+        dispatcher.flush()
+        assert delivered == [1, 4, 5]
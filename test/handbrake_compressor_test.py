@@ -0,0 +1,166 @@
+import asyncio
+import os
+import shlex
+import sys
+from pathlib import Path
+
+import pytest
+
+from handbrake_batch_compressor.src.compression.handbrake_compressor import (
+    EarlyAbortOptions,
+    HandbrakeCompressor,
+)
+from handbrake_batch_compressor.src.compression.stderr_ring_buffer import (
+    StderrRingBuffer,
+)
+from handbrake_batch_compressor.src.errors.handbrake_cli_exceptions import (
+    CompressionFailedError,
+    CompressionIneffectiveError,
+)
+
+FAKE_HANDBRAKECLI = Path('benchmarks/fake_handbrakecli.py').absolute()
+
+
+def fake_compressor(*fake_options: str) -> HandbrakeCompressor:
+    return HandbrakeCompressor(
+        handbrakecli_command=shlex.join(
+            [
+                sys.executable,
+                str(FAKE_HANDBRAKECLI),
+                '--fake-seconds',
+                '0.1',
+                *fake_options,
+            ],
+        ),
+    )
+
+
+class TestEarlyAbortOptions:
+    def test_no_projection_before_min_progress(self):
+        options = EarlyAbortOptions(min_progress_percent=10)
+
+        assert options.projected_size(output_size=500, progress=5.0) is None
+        assert options.projected_size(output_size=500, progress=0.0) is None
+
+    def test_projected_size(self):
+        options = EarlyAbortOptions(min_progress_percent=10)
+
+        assert options.projected_size(output_size=500, progress=25.0) == 2000
+
+    def test_is_ineffective_with_margin(self):
+        options = EarlyAbortOptions(margin_percent=10)
+
+        assert not options.is_ineffective(input_size=1000, projected_size=1000)
+        assert not options.is_ineffective(input_size=1000, projected_size=1100)
+        assert options.is_ineffective(input_size=1000, projected_size=1101)
+
+
+class TestLogErrors:
+    def test_truncated_errors_point_to_full_log(self, tmp_path: Path):
+        buffer = StderrRingBuffer(max_size=4, spill_dir=tmp_path / 'spill')
+        buffer.write('scan info\n')
+        buffer.write('fail')
+        buffer.close()
+
+        log_file = tmp_path / 'errors.log'
+        asyncio.run(
+            HandbrakeCompressor._log_errors(Path('video.mp4'), buffer, log_file),  # noqa: SLF001 - testing the log format
+        )
+
+        log = log_file.read_text(encoding='utf-8')
+        assert 'video.mp4' in log
+        assert log.endswith('...fail')
+        assert 'scan info' not in log
+        assert str(buffer.spill_path) in log
+
+
+class VanishingOutput:
+    """Output which exists, but is removed before its size is taken."""
+
+    def exists(self) -> bool:
+        return True
+
+    def stat(self) -> os.stat_result:
+        raise FileNotFoundError
+
+
+class FinishingProcess:
+    """Process which exits after its return code is checked a few times."""
+
+    def __init__(self, checks: int) -> None:
+        self.checks = checks
+
+    @property
+    def returncode(self) -> int | None:
+        self.checks -= 1
+        return None if self.checks > 0 else 0
+
+
+class TestWatchProjectedSize:
+    def test_vanishing_output_is_not_projected(self):
+        compressor = fake_compressor()
+        compressor.early_abort = EarlyAbortOptions(check_interval_seconds=0)
+
+        projected_size = asyncio.run(
+            compressor._watch_projected_size(  # noqa: SLF001 - the race with HandbrakeCLI can't be timed
+                FinishingProcess(checks=3),  # type: ignore[arg-type]
+                Path('video.mp4'),
+                1000,
+                VanishingOutput(),  # type: ignore[arg-type]
+                lambda: 50.0,
+            ),
+        )
+
+        assert projected_size is None
+
+
+class TestCompressWithFakeHandbrakecli:
+    @pytest.fixture(autouse=True)
+    def _errors_log_in_tmp_path(
+        self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.chdir(tmp_path)
+
+    @pytest.fixture
+    def video(self, tmp_path: Path) -> Path:
+        video = tmp_path / 'video.mp4'
+        video.write_bytes(b'\0' * 1000)
+        return video
+
+    def test_successful_compression(self, video: Path):
+        output = video.with_suffix('.compressed.mp4')
+        progress: list[float | None] = []
+
+        asyncio.run(
+            fake_compressor('--fake-ratio', '0.3').compress(
+                video,
+                output,
+                on_update=lambda info: progress.append(info.progress),
+            ),
+        )
+
+        assert output.stat().st_size == 300
+        assert 100.0 in progress
+
+    def test_early_abort_uses_given_input_size(self, video: Path):
+        output = video.with_suffix('.compressed.mp4')
+        compressor = fake_compressor('--fake-ratio', '0.3', '--fake-seconds', '1')
+        compressor.early_abort = EarlyAbortOptions(check_interval_seconds=0.05)
+
+        # The output (30% of the file) is larger than the size known from the discovery
+        with pytest.raises(CompressionIneffectiveError):
+            asyncio.run(compressor.compress(video, output, input_size_bytes=100))
+
+        assert not output.exists()
+
+    @pytest.mark.parametrize('failure', ['--fake-fail-rate', '--fake-crash-rate'])
+    def test_failed_compression(self, video: Path, failure: str):
+        output = video.with_suffix('.compressed.mp4')
+
+        with pytest.raises(CompressionFailedError):
+            asyncio.run(fake_compressor(failure, '1').compress(video, output))
+
+        assert not output.exists()
+        assert video.name in Path('errors.log').read_text(encoding='utf-8')
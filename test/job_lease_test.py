@@ -0,0 +1,107 @@
+import os
+import time
+from pathlib import Path
+
+from handbrake_batch_compressor.src.compression.job_lease import JobLeases, LeaseInfo
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = time.time()
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lease_is_exclusive(tmp_path: Path):
+    output = tmp_path / 'video.compressing.mp4'
+    first = JobLeases(host='host-a', pid=1)
+    second = JobLeases(host='host-b', pid=1)
+
+    assert first.acquire(output)
+    assert not second.acquire(output)
+
+    first.release(output)
+    assert not JobLeases.lease_path(output).exists()
+    assert second.acquire(output)
+
+    first.close()
+    second.close()
+    assert not JobLeases.lease_path(output).exists()
+
+
+def test_lease_without_heartbeat_is_taken_over(tmp_path: Path):
+    output = tmp_path / 'video.compressing.mp4'
+    clock = FakeClock()
+    crashed = JobLeases(host='host-a', pid=1, clock=clock)
+    assert crashed.acquire(output)
+    # The heartbeat of the crashed instance stops
+    crashed.close()
+    JobLeases.lease_path(output).write_text(
+        LeaseInfo(host='host-a', pid=1, heartbeat=clock.now).model_dump_json(),
+    )
+
+    other = JobLeases(host='host-b', pid=1, timeout_seconds=60, clock=clock)
+    assert not other.acquire(output)
+
+    clock.now += 61
+    assert other.acquire(output)
+    lease = LeaseInfo.model_validate_json(JobLeases.lease_path(output).read_text())
+    assert lease.host == 'host-b'
+    assert list(tmp_path.iterdir()) == [JobLeases.lease_path(output)]
+    other.close()
+
+
+def test_lease_of_dead_local_process_is_taken_over(tmp_path: Path):
+    output = tmp_path / 'video.compressing.mp4'
+    leases = JobLeases()
+    # Pids are far below this limit on any system
+    dead_pid = 2**22 + 1
+    JobLeases.lease_path(output).write_text(
+        LeaseInfo(
+            host=leases.host,
+            pid=dead_pid,
+            heartbeat=time.time(),
+        ).model_dump_json(),
+    )
+    alive = tmp_path / 'alive.compressing.mp4'
+    JobLeases.lease_path(alive).write_text(
+        LeaseInfo(
+            host=leases.host,
+            pid=os.getppid(),
+            heartbeat=time.time(),
+        ).model_dump_json(),
+    )
+
+    assert leases.acquire(output)
+    assert not leases.acquire(alive)
+    leases.close()
+
+
+def test_unwritten_lease_is_alive(tmp_path: Path):
+    output = tmp_path / 'video.compressing.mp4'
+    JobLeases.lease_path(output).touch()
+    leases = JobLeases(timeout_seconds=60)
+
+    assert not leases.acquire(output)
+
+    old = time.time() - 120
+    os.utime(JobLeases.lease_path(output), (old, old))
+    assert leases.acquire(output)
+    leases.close()
+
+
+def test_heartbeat_is_refreshed(tmp_path: Path):
+    output = tmp_path / 'video.compressing.mp4'
+    leases = JobLeases(timeout_seconds=0.2)
+    assert leases.acquire(output)
+
+    def heartbeat() -> float:
+        return LeaseInfo.model_validate_json(
+            JobLeases.lease_path(output).read_text(),
+        ).heartbeat
+
+    first_heartbeat = heartbeat()
+    time.sleep(0.3)
+    assert heartbeat() > first_heartbeat
+    leases.close()
@@ -0,0 +1,23 @@
+from pathlib import Path
+
+from handbrake_batch_compressor.src.compression.job_ledger import JobLedger
+from handbrake_batch_compressor.src.utils.sharding import Shard
+
+
+def test_hosts_sharing_library_keep_own_ledgers(tmp_path: Path):
+    paths = {
+        JobLedger.default_path(tmp_path),
+        JobLedger.default_path(tmp_path, Shard(index=1, count=2)),
+        JobLedger.default_path(tmp_path, Shard(index=2, count=2)),
+        JobLedger.default_path(tmp_path, host='host-a'),
+        JobLedger.default_path(tmp_path, host='host-b'),
+    }
+
+    assert len(paths) == 5
+    assert all(path.parent == tmp_path for path in paths)
+    # The shard is already disjoint between the hosts
+    assert JobLedger.default_path(
+        tmp_path,
+        Shard(index=1, count=2),
+        host='host-a',
+    ) == JobLedger.default_path(tmp_path, Shard(index=1, count=2))
@@ -0,0 +1,111 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from handbrake_batch_compressor.src.cli.option_types import JobOrder
+from handbrake_batch_compressor.src.compression.job_scheduler import JobScheduler
+from handbrake_batch_compressor.src.compression.probe_pipeline import ProbedVideo
+from handbrake_batch_compressor.src.utils.ffmpeg_helpers import (
+    VideoProperties,
+    VideoResolution,
+)
+from handbrake_batch_compressor.src.utils.files import VideoFile
+
+
+class ListPipeline:
+    """Pipeline which gives out the already probed videos."""
+
+    def __init__(self, videos: list[ProbedVideo]) -> None:
+        self.videos = list(videos)
+        self.drained = asyncio.Event()
+
+    async def get(self) -> ProbedVideo | None:
+        await asyncio.sleep(0)
+        if not self.videos:
+            self.drained.set()
+            return None
+        return self.videos.pop(0)
+
+
+def probed(  # noqa: PLR0913 - video parameters
+    name: str,
+    *,
+    size_mb: int,
+    duration: float,
+    bitrate_kbits: int,
+    height: int = 720,
+    should_compress: bool = True,
+) -> ProbedVideo:
+    return ProbedVideo(
+        file=VideoFile(
+            path=Path(name),
+            size_bytes=size_mb * 1024**2,
+            mtime_ns=0,
+            inode=0,
+        ),
+        properties=VideoProperties(
+            resolution=VideoResolution(width=height * 16 // 9, height=height),
+            frame_rate=30,
+            bitrate_kbytes=bitrate_kbits,
+            duration_seconds=duration,
+        ),
+        should_compress=should_compress,
+    )
+
+
+VIDEOS = [
+    # A long video with a low bitrate, there is almost nothing to save
+    probed('long_lean.mp4', size_mb=500, duration=3600, bitrate_kbits=1100),
+    # A short video with a high bitrate
+    probed('short_fat.mp4', size_mb=300, duration=300, bitrate_kbits=8000),
+    probed('tiny.mp4', size_mb=10, duration=60, bitrate_kbits=1300),
+    probed(
+        'filtered.mp4',
+        size_mb=900,
+        duration=60,
+        bitrate_kbits=1,
+        should_compress=False,
+    ),
+]
+
+
+async def collect(order: JobOrder) -> list[str]:
+    pipeline = ListPipeline(VIDEOS)
+    scheduler = JobScheduler(pipeline, order)  # type: ignore[arg-type]
+    scheduler.start()
+    try:
+        # The scheduler has taken every probed video
+        await pipeline.drained.wait()
+        result = []
+        while (video := await scheduler.get()) is not None:
+            result.append(video.path.name)
+        return result
+    finally:
+        await scheduler.close()
+
+
+@pytest.mark.parametrize(
+    ('order', 'expected'),
+    [
+        (
+            JobOrder.largest_first,
+            ['filtered.mp4', 'long_lean.mp4', 'short_fat.mp4', 'tiny.mp4'],
+        ),
+        (
+            JobOrder.shortest_first,
+            ['filtered.mp4', 'tiny.mp4', 'short_fat.mp4', 'long_lean.mp4'],
+        ),
+        (
+            JobOrder.best_savings_rate,
+            ['filtered.mp4', 'short_fat.mp4', 'tiny.mp4', 'long_lean.mp4'],
+        ),
+    ],
+)
+def test_order(order: JobOrder, expected: list[str]):
+    assert asyncio.run(collect(order)) == expected
+
+
+def test_discovery_order_is_kept_by_pipeline():
+    with pytest.raises(ValueError, match='discovery order'):
+        JobScheduler(ListPipeline([]), JobOrder.discovery)  # type: ignore[arg-type]
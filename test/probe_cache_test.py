@@ -0,0 +1,91 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from handbrake_batch_compressor.src.utils.ffmpeg_helpers import (
+    VideoProperties,
+    VideoResolution,
+)
+from handbrake_batch_compressor.src.utils.files import VideoFile
+from handbrake_batch_compressor.src.utils.probe_cache import ProbeCache
+
+PROPERTIES = VideoProperties(
+    resolution=VideoResolution(width=1280, height=720),
+    frame_rate=25.0,
+    bitrate_kbytes=1219,
+)
+
+
+class CountingProbe:
+    def __init__(self, result: VideoProperties | None = PROPERTIES) -> None:
+        self.result = result
+        self.calls = 0
+
+    def __call__(self, _: Path) -> VideoProperties | None:
+        self.calls += 1
+        return self.result
+
+
+@pytest.fixture
+def cache(tmp_path: Path):
+    cache = ProbeCache(tmp_path / 'cache' / 'probe_cache.sqlite')
+    yield cache
+    cache.close()
+
+
+def test_unchanged_file_is_probed_once(tmp_path: Path, cache: ProbeCache):
+    video = tmp_path / 'video.mp4'
+    video.write_bytes(b'video')
+    probe = CountingProbe()
+
+    assert cache.get_or_probe(VideoFile.from_path(video), probe) == PROPERTIES
+    assert cache.get_or_probe(VideoFile.from_path(video), probe) == PROPERTIES
+    assert probe.calls == 1
+
+
+def test_changed_file_is_probed_again(tmp_path: Path, cache: ProbeCache):
+    video = tmp_path / 'video.mp4'
+    video.write_bytes(b'video')
+    probe = CountingProbe()
+
+    cache.get_or_probe(VideoFile.from_path(video), probe)
+    video.write_bytes(b'another video')
+    cache.get_or_probe(VideoFile.from_path(video), probe)
+
+    stat = video.stat()
+    os.utime(video, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    cache.get_or_probe(VideoFile.from_path(video), probe)
+
+    assert probe.calls == 3
+
+
+def test_unreadable_file_is_cached(tmp_path: Path, cache: ProbeCache):
+    video = tmp_path / 'corrupted.mp4'
+    video.write_bytes(b'corrupted')
+    probe = CountingProbe(result=None)
+
+    assert cache.get_or_probe(VideoFile.from_path(video), probe) is None
+    assert cache.get_or_probe(VideoFile.from_path(video), probe) is None
+    assert probe.calls == 1
+
+
+def test_cache_persists_and_evicts(tmp_path: Path):
+    db_path = tmp_path / 'probe_cache.sqlite'
+    videos = []
+    for i in range(5):
+        video = tmp_path / f'video_{i}.mp4'
+        video.write_bytes(b'video')
+        videos.append(video)
+
+    cache = ProbeCache(db_path, max_entries=3)
+    probe = CountingProbe()
+    for video in videos:
+        cache.get_or_probe(VideoFile.from_path(video), probe)
+    cache.close()
+
+    cache = ProbeCache(db_path, max_entries=3)
+    assert len(cache) == 3
+    cache.clear()
+    assert len(cache) == 0
+    cache.close()
@@ -0,0 +1,87 @@
+import asyncio
+import shutil
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
+from handbrake_batch_compressor.src.compression.probe_pipeline import (
+    ProbedVideo,
+    ProbePipeline,
+)
+from handbrake_batch_compressor.src.utils.ffmpeg_helpers import VideoResolution
+from handbrake_batch_compressor.src.utils.files import VideoFile
+from handbrake_batch_compressor.src.utils.smart_filters import SmartFilter
+
+
+async def collect(pipeline: ProbePipeline) -> list[ProbedVideo]:
+    pipeline.start()
+    try:
+        result: list[ProbedVideo] = []
+        while (probed := await pipeline.get()) is not None:
+            result.append(probed)
+        # The end marker is kept for every consumer
+        assert await pipeline.get() is None
+        return result
+    finally:
+        await pipeline.close()
+
+
+def test_pipeline_keeps_order_and_filters(tmp_path: Path, video_720p_2mb_mp4: Path):
+    videos = []
+    for i in range(5):
+        video = tmp_path / f'video_{i}.mp4'
+        shutil.copy(video_720p_2mb_mp4, video)
+        videos.append(video)
+
+    corrupted = tmp_path / 'corrupted.mp4'
+    corrupted.write_bytes(b'not a video')
+    videos.insert(2, corrupted)
+
+    pipeline = ProbePipeline(
+        [VideoFile.from_path(video) for video in videos],
+        SmartFilter(),
+        lookahead=2,
+    )
+    probed = asyncio.run(collect(pipeline))
+
+    assert [x.path for x in probed] == videos
+    assert probed[2].properties is None
+    assert not probed[2].should_compress
+    assert all(x.should_compress for x in probed if x.path != corrupted)
+
+
+def test_pipeline_applies_smart_filter(video_720p_2mb_mp4: Path):
+    pipeline = ProbePipeline(
+        [VideoFile.from_path(video_720p_2mb_mp4)],
+        SmartFilter(minimal_resolution=VideoResolution(width=1920, height=1080)),
+        lookahead=4,
+    )
+    probed = asyncio.run(collect(pipeline))
+
+    assert len(probed) == 1
+    assert probed[0].properties is not None
+    assert not probed[0].should_compress
+
+
+def test_pipeline_gives_out_probed_videos_while_next_is_awaited(tmp_path: Path):
+    video = tmp_path / 'video.mp4'
+    video.write_bytes(b'not a video')
+    more_videos = threading.Event()
+
+    def slow_discovery() -> Iterator[VideoFile]:
+        yield VideoFile.from_path(video)
+        # e.g. the watch mode waits for new videos
+        more_videos.wait(timeout=10)
+
+    async def run() -> ProbedVideo | None:
+        pipeline = ProbePipeline(slow_discovery(), SmartFilter(), lookahead=4)
+        pipeline.start()
+        try:
+            return await asyncio.wait_for(pipeline.get(), timeout=5)
+        finally:
+            more_videos.set()
+            await pipeline.close()
+
+    probed = asyncio.run(run())
+    assert probed is not None
+    assert probed.path == video
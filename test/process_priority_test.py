@@ -0,0 +1,133 @@
+import pytest
+
+from handbrake_batch_compressor.src.cli.option_types import IoPriorityClass
+from handbrake_batch_compressor.src.compression import process_priority
+from handbrake_batch_compressor.src.compression.process_priority import (
+    CpuPartitions,
+    InvalidCpuListError,
+    ProcessPriority,
+    parse_cpu_list,
+)
+
+
+class TestParseCpuList:
+    @pytest.mark.parametrize(
+        ('cpus', 'expected'),
+        [
+            ('0', [0]),
+            ('0-3', [0, 1, 2, 3]),
+            ('0-3,6', [0, 1, 2, 3, 6]),
+            ('6, 2-3, 2', [2, 3, 6]),
+        ],
+    )
+    def test_valid(self, cpus: str, expected: list[int]) -> None:
+        assert parse_cpu_list(cpus) == expected
+
+    @pytest.mark.parametrize('cpus', ['', 'a', '0-', '-1', '3-1', '0,,1'])
+    def test_invalid(self, cpus: str) -> None:
+        with pytest.raises(InvalidCpuListError):
+            parse_cpu_list(cpus)
+
+
+class TestPartitionCpus:
+    def test_cores_are_split_evenly(self) -> None:
+        priority = ProcessPriority(cpus=[0, 1, 2, 3, 4], partitions=2)
+
+        assert priority.partition_cpus(0) == [0, 1, 2]
+        assert priority.partition_cpus(1) == [3, 4]
+        assert priority.partition_cpus(None) == [0, 1, 2, 3, 4]
+
+    def test_cores_are_shared_if_there_are_fewer_than_partitions(self) -> None:
+        priority = ProcessPriority(cpus=[0, 1], partitions=4)
+
+        assert [priority.partition_cpus(i) for i in range(4)] == [[0], [1], [0], [1]]
+
+    def test_without_cores(self) -> None:
+        assert ProcessPriority(partitions=2).partition_cpus(0) is None
+
+
+class TestCommandPrefix:
+    def test_all_priorities(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(process_priority.os, 'name', 'posix')
+        monkeypatch.setattr(process_priority, '_has_tool', lambda _: True)
+
+        priority = ProcessPriority(
+            nice=10,
+            io_class=IoPriorityClass.best_effort,
+            io_level=7,
+        )
+
+        assert priority.command_prefix([0, 2]) == [
+            *('nice', '-n', '10'),
+            *('ionice', '-c', '2', '-n', '7'),
+            *('taskset', '-c', '0,2'),
+        ]
+
+    def test_missing_tools_are_skipped(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(process_priority.os, 'name', 'posix')
+        monkeypatch.setattr(process_priority, '_has_tool', lambda tool: tool == 'nice')
+
+        priority = ProcessPriority(nice=5, io_class=IoPriorityClass.idle)
+
+        assert priority.command_prefix([0]) == ['nice', '-n', '5']
+
+    def test_no_priorities(self) -> None:
+        assert ProcessPriority().command_prefix(None) == []
+
+
+class TestEncoderOptions:
+    def test_x264(self) -> None:
+        priority = ProcessPriority(encoder_threads=2)
+
+        assert priority.encoder_options(['-e', 'x264', '-q', '20']) == [
+            *('-e', 'x264', '-q', '20'),
+            *('--encopts', 'threads=2'),
+        ]
+
+    def test_encoder_of_preset_is_left_as_it_is(self) -> None:
+        priority = ProcessPriority(encoder_threads=2)
+
+        # The preset may use any encoder (e.g. x265), so no limit is assumed
+        assert priority.encoder_options(['-Z', 'H.265 MKV 1080p30']) == [
+            *('-Z', 'H.265 MKV 1080p30'),
+        ]
+
+    def test_x265(self) -> None:
+        priority = ProcessPriority(encoder_threads=4)
+
+        assert priority.encoder_options(['--encoder=x265_10bit']) == [
+            '--encoder=x265_10bit',
+            *('--encopts', 'pools=4'),
+        ]
+
+    def test_appended_to_user_encopts(self) -> None:
+        priority = ProcessPriority(encoder_threads=2)
+
+        assert priority.encoder_options(['-e', 'x264', '-x', 'ref=4']) == [
+            *('-e', 'x264'),
+            *('-x', 'ref=4:threads=2'),
+        ]
+        assert priority.encoder_options(['--encoder=x264', '--encopts=ref=4']) == [
+            '--encoder=x264',
+            '--encopts=ref=4:threads=2',
+        ]
+
+    def test_hardware_encoders_are_left_as_they_are(self) -> None:
+        priority = ProcessPriority(encoder_threads=2)
+
+        assert priority.encoder_options(['-e', 'nvenc_h265']) == ['-e', 'nvenc_h265']
+
+    def test_without_limit(self) -> None:
+        assert ProcessPriority().encoder_options(['-q', '20']) == ['-q', '20']
+
+
+def test_cpu_partitions() -> None:
+    partitions = CpuPartitions(2)
+
+    first, second = partitions.acquire(), partitions.acquire()
+    assert (first, second) == (0, 1)
+    assert partitions.acquire() is None
+
+    partitions.release(first)
+    partitions.release(None)
+    assert partitions.acquire() == 0
@@ -0,0 +1,41 @@
+from pathlib import PurePosixPath, PureWindowsPath
+
+import pytest
+
+from handbrake_batch_compressor.src.utils.sharding import (
+    InvalidShardError,
+    Shard,
+    shard_of,
+)
+
+
+def test_parse_shard():
+    assert Shard.parse_shard('2/3') == Shard(index=2, count=3)
+    assert str(Shard.parse_shard('1/1')) == '1/1'
+
+
+@pytest.mark.parametrize('shard', ['0/3', '4/3', '1/0', '3', '1/', 'a/b', '-1/2'])
+def test_parse_invalid_shard(shard: str):
+    with pytest.raises(InvalidShardError):
+        Shard.parse_shard(shard)
+
+
+def test_shards_are_disjoint_and_cover_all_files():
+    paths = [PurePosixPath(f'movies/{i}/video {i}.mp4') for i in range(300)]
+    shards = [Shard(index=index, count=3) for index in range(1, 4)]
+
+    owners = [[shard for shard in shards if shard.owns(path)] for path in paths]
+
+    assert all(len(owner) == 1 for owner in owners)
+    # Every host gets a fair part of the files
+    for shard in shards:
+        assert sum(owner == [shard] for owner in owners) > 50
+
+
+def test_shard_is_stable_across_platforms():
+    assert shard_of(PurePosixPath('movies/a.mp4'), 7) == shard_of(
+        PureWindowsPath(r'movies\a.mp4'),
+        7,
+    )
+    # The digest doesn't depend on the process (unlike the built-in hash())
+    assert shard_of(PurePosixPath('movies/a.mp4'), 1000) == 468
@@ -0,0 +1,43 @@
+import gzip
+from pathlib import Path
+
+from handbrake_batch_compressor.src.compression.stderr_ring_buffer import (
+    StderrRingBuffer,
+)
+
+
+class TestStderrRingBuffer:
+    def test_keeps_everything_below_max_size(self):
+        buffer = StderrRingBuffer(max_size=10)
+        buffer.write('abc')
+        buffer.write('def')
+
+        assert buffer.getvalue() == 'abcdef'
+        assert not buffer.truncated
+
+    def test_keeps_only_the_tail(self):
+        buffer = StderrRingBuffer(max_size=5)
+        for chunk in ['first\n', 'second\n', 'x', 'third\n']:
+            buffer.write(chunk)
+
+        assert buffer.getvalue() == 'hird\n'
+        assert buffer.truncated
+
+    def test_spills_full_output(self, tmp_path: Path):
+        buffer = StderrRingBuffer(max_size=3, spill_dir=tmp_path, spill_prefix='video')
+        buffer.write('full ')
+        buffer.write('output')
+        buffer.close()
+
+        assert buffer.spill_path is not None
+        assert buffer.spill_path.name.startswith('video.')
+        with gzip.open(buffer.spill_path, 'rt', encoding='utf-8') as f:
+            assert f.read() == 'full output'
+
+    def test_discard_removes_spill_file(self, tmp_path: Path):
+        buffer = StderrRingBuffer(max_size=3, spill_dir=tmp_path)
+        buffer.write('output')
+        buffer.discard()
+
+        assert buffer.spill_path is None
+        assert list(tmp_path.iterdir()) == []
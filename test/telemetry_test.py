@@ -0,0 +1,77 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from handbrake_batch_compressor.src.compression.telemetry import (
+    InvalidEventsTargetError,
+    JobEvent,
+    JsonLinesWriter,
+    PrometheusTextfile,
+    Telemetry,
+    open_events_target,
+)
+
+
+def test_events_are_written_as_json_lines(tmp_path: Path):
+    events_file = tmp_path / 'events.jsonl'
+    telemetry = Telemetry([JsonLinesWriter(open_events_target(str(events_file)))])
+
+    telemetry.emit(JobEvent.started, Path('a.mp4'), size_bytes=100)
+    telemetry.emit(JobEvent.finished, Path('a.mp4'), output_size_bytes=50)
+    telemetry.close()
+
+    events = [json.loads(line) for line in events_file.read_text().splitlines()]
+    assert [event['event'] for event in events] == ['started', 'finished']
+    assert events[0]['path'] == 'a.mp4'
+    assert events[0]['size_bytes'] == 100
+    assert events[1]['output_size_bytes'] == 50
+    assert events[0]['timestamp'] <= events[1]['timestamp']
+
+
+def test_events_to_file_descriptor():
+    read_fd, write_fd = os.pipe()
+    writer = JsonLinesWriter(open_events_target(f'fd:{write_fd}'))
+
+    writer.handle({'event': 'queued', 'path': 'a.mp4'})
+    writer.close()
+    os.close(write_fd)
+
+    with os.fdopen(read_fd) as pipe:
+        assert json.loads(pipe.read()) == {'event': 'queued', 'path': 'a.mp4'}
+
+
+def test_invalid_events_target():
+    with pytest.raises(InvalidEventsTargetError):
+        open_events_target('fd:stdout')
+
+
+def test_prometheus_metrics(tmp_path: Path):
+    metrics_file = tmp_path / 'handbrake.prom'
+    metrics = PrometheusTextfile(metrics_file, interval_seconds=3600)
+    telemetry = Telemetry([metrics])
+
+    for name in ('a.mp4', 'b.mp4', 'c.mp4'):
+        telemetry.emit(JobEvent.queued, Path(name))
+    telemetry.emit(JobEvent.started, Path('a.mp4'))
+    telemetry.emit(JobEvent.progress, Path('a.mp4'), fps_current=120.5)
+    telemetry.emit(JobEvent.started, Path('b.mp4'))
+    telemetry.emit(
+        JobEvent.finished,
+        Path('b.mp4'),
+        input_size_bytes=1000,
+        output_size_bytes=300,
+    )
+
+    rendered = metrics.render()
+    assert 'handbrake_batch_compressor_jobs_in_flight 1\n' in rendered
+    assert 'handbrake_batch_compressor_queue_depth 1\n' in rendered
+    assert 'handbrake_batch_compressor_encode_fps 120.5\n' in rendered
+    assert 'handbrake_batch_compressor_bytes_saved 700\n' in rendered
+    assert 'handbrake_batch_compressor_files_total{outcome="finished"} 1\n' in rendered
+
+    telemetry.close()
+
+    assert metrics_file.read_text() == rendered
+    assert list(tmp_path.iterdir()) == [metrics_file]
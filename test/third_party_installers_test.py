@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from handbrake_batch_compressor.src.utils.third_party_installers import (
+    InstallCommand,
+    Software,
+    ToolsCache,
+)
+
+
+def make_software(cache: ToolsCache, command: str | None = None) -> Software:
+    # The interpreter stands in for the software
+    return Software(
+        install_cmd=InstallCommand(win='', linux='', mac=''),
+        check_cmd=f'{command or Path(sys.executable).name} --version',
+        cache=cache,
+    )
+
+
+def test_checked_binary_is_cached(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    cache_path = tmp_path / 'cache' / 'tools.json'
+    assert make_software(ToolsCache(cache_path)).is_installed()
+    assert cache_path.exists()
+
+    def fail(*_: object, **__: object) -> None:
+        raise subprocess.CalledProcessError(1, 'check')
+
+    # The next runs don't check the software again
+    monkeypatch.setattr(subprocess, 'run', fail)
+    assert make_software(ToolsCache(cache_path)).is_installed()
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='the stand-in is a shell script')
+def test_changed_binary_is_checked_again(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    binary = tmp_path / 'bin' / 'tool'
+    binary.parent.mkdir()
+    binary.write_text(f'#!/bin/sh\nexec {sys.executable} "$@"\n')
+    binary.chmod(0o755)
+    monkeypatch.setenv('PATH', str(binary.parent))
+
+    cache = ToolsCache(tmp_path / 'tools.json')
+    assert make_software(cache, 'tool').is_installed()
+
+    # e.g. the software is updated, but the new version is broken
+    modified_ns = binary.stat().st_mtime_ns
+    binary.write_text('#!/bin/sh\nexit 1\n')
+    os.utime(binary, ns=(modified_ns + 10**9, modified_ns + 10**9))
+    assert not make_software(ToolsCache(tmp_path / 'tools.json'), 'tool').is_installed()
+
+
+def test_missing_software_is_not_installed(tmp_path: Path):
+    cache = ToolsCache(tmp_path / 'tools.json')
+    assert not make_software(cache, 'no-such-software-here').is_installed()
+
+
+def test_corrupted_cache_is_ignored(tmp_path: Path):
+    cache_path = tmp_path / 'tools.json'
+    cache_path.write_text('{not json')
+
+    assert make_software(ToolsCache(cache_path)).is_installed()
+    assert 'binaries' in cache_path.read_text()
@@ -0,0 +1,89 @@
+import asyncio
+from collections.abc import Sequence
+from pathlib import Path
+
+import pytest
+
+from handbrake_batch_compressor.src.compression.trial_encoder import (
+    TrialEncoder,
+    TrialOptions,
+)
+from handbrake_batch_compressor.src.utils.ffmpeg_helpers import (
+    VideoProperties,
+    VideoResolution,
+)
+
+
+class SampleCompressor:
+    """Writes 100 bytes per second of the requested sample."""
+
+    def __init__(self) -> None:
+        self.samples: list[tuple[float, float]] = []
+        self.input_sizes: list[int | None] = []
+
+    async def compress(
+        self,
+        input_video: Path,  # noqa: ARG002
+        output_video: Path,
+        extra_options: Sequence[str] = (),
+        input_size_bytes: int | None = None,
+        **_: object,
+    ) -> None:
+        self.input_sizes.append(input_size_bytes)
+        start = float(extra_options[1].removeprefix('seconds:'))
+        duration = float(extra_options[3].removeprefix('seconds:'))
+        self.samples.append((start, duration))
+        output_video.write_bytes(b'\0' * int(duration * 100))
+
+
+def make_properties(duration_seconds: float | None) -> VideoProperties:
+    return VideoProperties(
+        resolution=VideoResolution(width=1280, height=720),
+        frame_rate=25,
+        bitrate_kbytes=1000,
+        duration_seconds=duration_seconds,
+    )
+
+
+def test_sample_windows_are_spread_over_the_video():
+    encoder = TrialEncoder(
+        SampleCompressor(),  # type: ignore[arg-type]
+        TrialOptions(segments=3, segment_seconds=10),
+    )
+
+    assert encoder.sample_windows(400) == [(95, 10), (195, 10), (295, 10)]
+    assert encoder.sample_windows(59) == []
+
+
+def test_predict_extrapolates_samples():
+    compressor = SampleCompressor()
+    encoder = TrialEncoder(
+        compressor,  # type: ignore[arg-type]
+        TrialOptions(segments=2, segment_seconds=5, min_predicted_saving_percent=50),
+    )
+
+    # The size of the video is known from the discovery, 1000 seconds * 100 bytes/s = 100% ratio
+    prediction = asyncio.run(
+        encoder.predict(Path('video.mp4'), make_properties(500), size_bytes=100_000),
+    )
+
+    assert len(compressor.samples) == 2
+    # The source isn't stat()ed for the early abort of the samples
+    assert compressor.input_sizes == [100_000, 100_000]
+    assert prediction is not None
+    assert prediction.predicted_size_bytes == 50_000
+    assert prediction.predicted_ratio == pytest.approx(0.5)
+    assert prediction.predicted_saving_percent == pytest.approx(50)
+    assert encoder.is_worth_compressing(prediction)
+
+
+def test_no_prediction_without_duration(tmp_path: Path):
+    encoder = TrialEncoder(
+        SampleCompressor(),  # type: ignore[arg-type]
+        TrialOptions(),
+    )
+
+    assert (
+        asyncio.run(encoder.predict(tmp_path, make_properties(None), size_bytes=0))
+        is None
+    )
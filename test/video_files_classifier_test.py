@@ -0,0 +1,140 @@
+from pathlib import Path, PurePosixPath
+
+import pytest
+
+from handbrake_batch_compressor.src.compression.job_lease import JobLeases
+from handbrake_batch_compressor.src.utils.files import (
+    VideoFile,
+    get_video_files_by_directory,
+)
+from handbrake_batch_compressor.src.utils.sharding import Shard
+from handbrake_batch_compressor.src.utils.video_files_classifier import (
+    VideoFilesClassifier,
+)
+
+
+def test_classify_video_files(tmp_path: Path):
+    files = [
+        tmp_path / 'done.mp4',
+        tmp_path / 'done.compressed.mp4',
+        tmp_path / 'interrupted.mp4',
+        tmp_path / 'interrupted.compressing.mp4',
+        tmp_path / 'new.mkv',
+    ]
+    for file in files:
+        file.touch()
+
+    classifier = VideoFilesClassifier('compressing', 'compressed')
+    unprocessed = list(
+        classifier.unprocessed_files([[VideoFile.from_path(file) for file in files]]),
+    )
+
+    assert [file.path for file in unprocessed] == [
+        tmp_path / 'interrupted.mp4',
+        tmp_path / 'new.mkv',
+    ]
+    assert not (tmp_path / 'interrupted.compressing.mp4').exists()
+
+    assert classifier.complete_count == 1
+    assert classifier.incomplete_count == 1
+    assert classifier.unprocessed_count == 2
+    assert classifier.found_count == 5
+
+
+def test_classify_only_files_of_the_shard(tmp_path: Path):
+    shard = Shard(index=1, count=2)
+    names = [f'video{i}' for i in range(20)]
+    own = [name for name in names if shard.owns(PurePosixPath(f'{name}.mp4'))]
+    other = [name for name in names if name not in own]
+    assert own
+    assert other
+
+    files = []
+    for name in names:
+        files += [tmp_path / f'{name}.mp4', tmp_path / f'{name}.compressing.mp4']
+    for file in files:
+        file.touch()
+
+    classifier = VideoFilesClassifier('compressing', 'compressed', shard, tmp_path)
+    unprocessed = list(
+        classifier.unprocessed_files([[VideoFile.from_path(file) for file in files]]),
+    )
+
+    assert [file.path for file in unprocessed] == sorted(
+        tmp_path / f'{name}.mp4' for name in own
+    )
+    # Incomplete files of the other shard are being compressed by another host
+    for name in own:
+        assert not (tmp_path / f'{name}.compressing.mp4').exists()
+    for name in other:
+        assert (tmp_path / f'{name}.compressing.mp4').exists()
+
+    assert classifier.found_count == len(own) * 2
+    assert classifier.incomplete_count == len(own)
+
+
+def test_shard_of_files_under_relative_target_path(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    shard = Shard(index=1, count=2)
+    (tmp_path / 'videos').mkdir()
+    names = [f'video{i}.mp4' for i in range(20)]
+    for name in names:
+        (tmp_path / 'videos' / name).touch()
+    monkeypatch.chdir(tmp_path)
+
+    classifier = VideoFilesClassifier(
+        'compressing',
+        'compressed',
+        shard,
+        Path('videos'),
+    )
+    unprocessed = classifier.unprocessed_files(
+        get_video_files_by_directory(Path('videos')),
+    )
+
+    # The same files as on a host with the library mounted elsewhere
+    assert sorted(file.path.name for file in unprocessed) == sorted(
+        name for name in names if shard.owns(PurePosixPath(name))
+    )
+
+
+def test_keep_incomplete_files_with_alive_leases(tmp_path: Path):
+    files = [
+        tmp_path / 'busy.mp4',
+        tmp_path / 'busy.compressing.mp4',
+        tmp_path / 'crashed.mp4',
+        tmp_path / 'crashed.compressing.mp4',
+    ]
+    for file in files:
+        file.touch()
+    other_instance = JobLeases(host='other-host', pid=1)
+    other_instance.acquire(tmp_path / 'busy.compressing.mp4')
+
+    leases = JobLeases()
+    classifier = VideoFilesClassifier('compressing', 'compressed', leases=leases)
+    unprocessed = list(
+        classifier.unprocessed_files([[VideoFile.from_path(file) for file in files]]),
+    )
+
+    assert [file.path for file in unprocessed] == [tmp_path / 'crashed.mp4']
+    assert (tmp_path / 'busy.compressing.mp4').exists()
+    assert not (tmp_path / 'crashed.compressing.mp4').exists()
+    assert not JobLeases.lease_path(tmp_path / 'crashed.compressing.mp4').exists()
+    assert classifier.incomplete_count == 2
+    assert classifier.leased_count == 1
+
+    leases.close()
+    other_instance.close()
+
+
+def test_new_file_is_unprocessed(tmp_path: Path):
+    classifier = VideoFilesClassifier('compressing', 'compressed')
+    for name in ('new.mp4', 'done.mp4', 'done.compressed.mp4', 'new.compressing.mkv'):
+        (tmp_path / name).write_bytes(b'video')
+
+    assert classifier.is_unprocessed(tmp_path / 'new.mp4')
+    assert not classifier.is_unprocessed(tmp_path / 'done.mp4')
+    assert not classifier.is_unprocessed(tmp_path / 'done.compressed.mp4')
+    assert not classifier.is_unprocessed(tmp_path / 'new.compressing.mkv')